@@ -0,0 +1,332 @@
+import argparse
+import json
+import logging
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+from app.chatbot import Chatbot
+from llm.loader import LLMWrapper, load_llm
+from llm.pipeline import parse_component_adapters
+from utils.settings import LORA_ADAPTERS
+
+
+logger = logging.getLogger(__name__)
+
+
+class LockstepLLM(LLMWrapper):
+    """
+    Wraps an LLMService shared by many chatbot sessions, each running in its own thread.
+
+    Session threads run their non-LLM code one at a time under a shared lock, and block
+    on every generate call. Once all active sessions are blocked, the pending calls are
+    served together with generate_batch, so the Router calls of all conversations form
+    one batch, then their NLU segments, then the DM payloads, then the NLG responses.
+    Sessions also wait for each other at the end of every turn to stay aligned by stage.
+    Calls from other threads (e.g. the history summarizer) go straight to the model.
+    """
+
+    def __init__(self, llm, max_batch_size: int = 16) -> None:
+        super().__init__(llm)
+        self.model_name = llm.model_name
+        self.adapters = getattr(llm, "adapters", {})
+        self.max_batch_size = max_batch_size
+        self.condition = threading.Condition()
+        self.batch_sizes: list[int] = []
+        self._warned_assisted = False
+
+        self._sessions: set[int] = set()
+        self._active = 0
+        self._blocked = 0
+        self._at_barrier = 0
+        self._turn = 0
+        self._pending: list[dict[str, Any]] = []
+
+    # ===================
+    #    SESSIONS
+    # ===================
+    def expect_sessions(self, count: int) -> None:
+        """Count sessions before their threads start, so no round is served until all of them have joined."""
+        with self.condition:
+            self._active += count
+
+    def join(self) -> None:
+        """Register the calling thread as one of the expected sessions. Must be called with the condition held."""
+        self._sessions.add(threading.get_ident())
+
+    def leave(self) -> None:
+        self._sessions.discard(threading.get_ident())
+        self._active -= 1
+        self._advance()
+
+    def end_turn(self) -> None:
+        """Wait until every active session has finished its current turn."""
+        turn = self._turn
+        self._at_barrier += 1
+        self._blocked += 1
+        self._advance()
+
+        while self._turn == turn:
+            self.condition.wait()
+
+    # ===================
+    #    SCHEDULING
+    # ===================
+    def _advance(self) -> None:
+        """Serve the pending calls, or release the turn barrier, once no session can make progress."""
+        if self._blocked < self._active:
+            return
+
+        if self._pending:
+            self._flush()
+        elif self._at_barrier:
+            self._blocked -= self._at_barrier
+            self._at_barrier = 0
+            self._turn += 1
+
+        self.condition.notify_all()
+
+    def _flush(self) -> None:
+        requests, self._pending = self._pending, []
+        groups: dict[int, list[tuple[dict[str, Any], int]]] = {}
+
+        for request in requests:
+            for index in range(len(request["messages_batch"])):
+                groups.setdefault(request["max_new_tokens"], []).append((request, index))
+
+        for max_new_tokens, prompts in groups.items():
+            for start in range(0, len(prompts), self.max_batch_size):
+                chunk = prompts[start:start + self.max_batch_size]
+                adapter_kwargs = {}
+                self.batch_sizes.append(len(chunk))
+
+                # The LLMService groups the prompts of a mixed batch by LoRA adapter.
+                if any(request["adapter"] is not None for request, _ in chunk):
+                    adapter_kwargs["adapter"] = [request["adapter"] for request, _ in chunk]
+
+                try:
+                    outputs = self.llm.generate_batch(
+                        messages_batch=[request["messages_batch"][index] for request, index in chunk],
+                        max_new_tokens=max_new_tokens,
+                        **adapter_kwargs,
+                    )
+                except Exception as exc:
+                    outputs = [exc] * len(chunk)
+
+                for (request, index), output in zip(chunk, outputs):
+                    request["outputs"][index] = output
+
+        self._blocked -= len(requests)
+
+    def _submit(self, messages_batch: list[list[dict[str, str]]], max_new_tokens: int, adapter: str | None) -> list[str]:
+        if not messages_batch:
+            return []
+
+        request = {
+            "messages_batch": messages_batch,
+            "max_new_tokens": max_new_tokens,
+            "adapter": adapter,
+            "outputs": [None] * len(messages_batch),
+        }
+        self._pending.append(request)
+        self._blocked += 1
+        self._advance()
+
+        while any(output is None for output in request["outputs"]):
+            self.condition.wait()
+
+        for output in request["outputs"]:
+            if isinstance(output, Exception):
+                raise output
+
+        return request["outputs"]
+
+    # ===================
+    #    LLM INTERFACE
+    # ===================
+    def _direct_options(self, adapter: str | None, speculative: bool, prompt_lookup: bool) -> dict[str, Any]:
+        options = {"adapter": adapter} if adapter is not None else {}
+
+        if speculative:
+            options["speculative"] = True
+        if prompt_lookup:
+            options["prompt_lookup"] = True
+
+        return options
+
+    def _warn_assisted_ignored(self, speculative: bool, prompt_lookup: bool) -> None:
+        if (speculative or prompt_lookup) and not self._warned_assisted:
+            self._warned_assisted = True
+            logger.warning("Session calls are batched across conversations: speculative and prompt-lookup decoding are ignored.")
+
+    def generate(self, messages: list[dict[str, str]], max_new_tokens: int = 128, adapter: str | None = None,
+                 speculative: bool = False, prompt_lookup: bool = False) -> str:
+        if threading.get_ident() not in self._sessions:
+            options = self._direct_options(adapter, speculative, prompt_lookup)
+            return self.llm.generate(messages=messages, max_new_tokens=max_new_tokens, **options)
+
+        # Session calls are batched, which rules out speculative and prompt-lookup decoding.
+        self._warn_assisted_ignored(speculative, prompt_lookup)
+        return self._submit([messages], max_new_tokens, adapter)[0]
+
+    def generate_batch(self, messages_batch: list[list[dict[str, str]]], max_new_tokens: int = 128,
+                       adapter: str | None = None, prompt_lookup: bool = False) -> list[str]:
+        if threading.get_ident() not in self._sessions:
+            options = self._direct_options(adapter, False, prompt_lookup)
+            return self.llm.generate_batch(messages_batch=messages_batch, max_new_tokens=max_new_tokens, **options)
+
+        self._warn_assisted_ignored(False, prompt_lookup)
+        return self._submit(messages_batch, max_new_tokens, adapter)
+
+
+def load_conversations(path: Path) -> list[dict[str, Any]]:
+    """
+    Read one conversation per JSONL line, either as {"id", "turns": [user utterances]} or as
+    {"id", "messages": [{"role", "content"}]}, whose user messages are replayed and whose
+    assistant messages are kept as references.
+    """
+    conversations = []
+
+    with open(path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+
+            record = json.loads(line)
+
+            if "turns" in record:
+                turns = list(record["turns"])
+                references = list(record.get("references", []))
+            else:
+                messages = record.get("messages", [])
+                turns = [message["content"] for message in messages if message["role"] == "user"]
+                references = [message["content"] for message in messages if message["role"] == "assistant"]
+
+            conversations.append({"id": record.get("id", str(line_number)), "turns": turns, "references": references})
+
+    return conversations
+
+
+class BatchRunner:
+    """
+    Replays recorded conversations through Chatbot.reply, advancing up to `concurrency` of them in lockstep.
+
+    Every conversation starts from a fresh dialogue state, history and task queue. The
+    database is shared, as it is between live users.
+    """
+
+    def __init__(self, llm, concurrency: int = 16, max_batch_size: int = 16) -> None:
+        self.llm = LockstepLLM(llm, max_batch_size=max_batch_size)
+        self.concurrency = concurrency
+
+    def _run_conversation(self, chatbot: Chatbot, conversation: dict[str, Any]) -> dict[str, Any]:
+        chatbot.reset_state()
+        result = {"id": conversation["id"], "turns": []}
+
+        for index, user_input in enumerate(conversation["turns"]):
+            turn = {"user": user_input}
+
+            try:
+                turn["assistant"] = chatbot.reply(user_input)
+            except Exception as exc:
+                logger.exception("Conversation %s failed at turn %s.", conversation["id"], index)
+                turn["error"] = repr(exc)
+
+            if index < len(conversation["references"]):
+                turn["reference"] = conversation["references"][index]
+
+            result["turns"].append(turn)
+            self.llm.end_turn()
+
+            if "error" in turn:
+                break
+
+        return result
+
+    def _worker(self, queue: deque, on_result) -> None:
+        with self.llm.condition:
+            self.llm.join()
+
+            try:
+                # Each worker reuses one chatbot, whose state is reset for every conversation.
+                chatbot = Chatbot(self.llm.model_name, llm=self.llm)
+
+                try:
+                    while queue:
+                        on_result(self._run_conversation(chatbot, queue.popleft()))
+                finally:
+                    chatbot.close()
+            finally:
+                self.llm.leave()
+
+    def run(self, conversations: list[dict[str, Any]], on_result=None) -> dict[str, Any]:
+        """Run every conversation and return the results (in completion order) and batching stats."""
+        queue = deque(conversations)
+        results = []
+
+        def collect(result: dict[str, Any]) -> None:
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+
+        workers = [
+            threading.Thread(target=self._worker, args=(queue, collect), name=f"conversation-{index}")
+            for index in range(min(self.concurrency, len(conversations)))
+        ]
+
+        start = time.perf_counter()
+        self.llm.expect_sessions(len(workers))
+
+        for worker in workers:
+            worker.start()
+
+        for worker in workers:
+            worker.join()
+
+        elapsed = time.perf_counter() - start
+        batch_sizes = self.llm.batch_sizes
+        turns = sum(len(result["turns"]) for result in results)
+
+        return {
+            "results": results,
+            "stats": {
+                "conversations": len(results),
+                "turns": turns,
+                "llm_batches": len(batch_sizes),
+                "llm_prompts": sum(batch_sizes),
+                "mean_batch_size": round(sum(batch_sizes) / len(batch_sizes), 2) if batch_sizes else 0.0,
+                "elapsed_s": round(elapsed, 2),
+                "turns_per_s": round(turns / elapsed, 2) if elapsed else 0.0,
+            },
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded conversations through the full chatbot pipeline with cross-conversation batching.")
+    parser.add_argument("-i", "--input", type=Path, required=True, help="JSONL file with one conversation per line.")
+    parser.add_argument("-o", "--output", type=Path, default=Path("evaluation/results/batch_run.jsonl"), help="Where to write one result per conversation.")
+    parser.add_argument("-m", "--model", default="qwen3_4b", help="Model name defined in llm/config.py.")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="Conversations advanced in lockstep.")
+    parser.add_argument("-b", "--batch-size", type=int, default=16, help="Maximum prompts per generate_batch call.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    conversations = load_conversations(args.input)
+    runner = BatchRunner(load_llm(args.model, adapters=parse_component_adapters(LORA_ADAPTERS)), concurrency=args.concurrency, max_batch_size=args.batch_size)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        def write_result(result: dict[str, Any]) -> None:
+            file.write(json.dumps(result, ensure_ascii=False) + "\n")
+            file.flush()
+
+        output = runner.run(conversations, on_result=write_result)
+
+    print(json.dumps(output["stats"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
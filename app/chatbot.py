@@ -1,15 +1,29 @@
 import logging
+import time
 from typing import Any
 
 from components.router import Router
 from components.NLU import NLU
 from components.DM import DM
 from components.NLG import NLG
+from database.async_db_controller import AsyncDBController, DatabaseTimeoutError
+from database.db_backends import create_backend
 from database.db_controller import DBController
-from llm.loader import load_llm
+from database.mock_database import start_static_data_watcher
+from llm.loader import ComponentLLM
+from llm.pipeline import (
+    PIPELINE_COMPONENTS, LatencyTracker, TimedLLM, load_component_llms, parse_component_adapters, parse_component_models,
+    parse_components,
+)
 from state.dialogue_state_tracker import StateTracker
 from state.history import History
+from state.summarizer import HistorySummarizer, window_keep_messages
 from state.task_queue import TaskQueue
+from utils.settings import (
+    DB_BACKEND, DB_POOL_SIZE, DB_TIMEOUT, HISTORY_SUMMARY, LORA_ADAPTERS, NLG_HISTORY_MESSAGES, NLU_HISTORY_MESSAGES,
+    PIPELINE_MODELS, PROMPT_LOOKUP_COMPONENTS, ROUTER_HISTORY_MESSAGES, SPECULATIVE_COMPONENTS, SUMMARY_KEEP_MESSAGES,
+    SUMMARY_MAX_TOKENS,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -22,24 +36,98 @@ class Chatbot:
 
     DONE_STATUSES = ("INFORM", "CONFIRMED", "ABORTED")
 
-    def __init__(self, model_name: str) -> None:
-        self.llm = load_llm(model_name)
+    def __init__(self, model_name: str, db_backend: str | None = DB_BACKEND, llm=None,
+                 component_models: dict[str, str] | None = None) -> None:
+        # Component name -> LoRA adapter, applied on top of the component model.
+        self.adapters = parse_component_adapters(LORA_ADAPTERS)
+        # Components whose single-response calls use speculative decoding with a draft model.
+        self.speculative_components = parse_components(SPECULATIVE_COMPONENTS)
+        # Components whose single-prompt calls draft candidate tokens from n-grams of their own prompt.
+        self.prompt_lookup_components = parse_components(PROMPT_LOOKUP_COMPONENTS)
+
+        # A preloaded LLM can be shared between several chatbots, e.g. by the batch runner.
+        if llm is not None:
+            self.llms = {component: llm for component in PIPELINE_COMPONENTS}
+            self._drop_unknown_adapters(getattr(llm, "adapters", None))
+        else:
+            if component_models is None:
+                component_models = parse_component_models(PIPELINE_MODELS)
+            self.llms = load_component_llms(
+                model_name, component_models, adapters=self.adapters, speculative_components=self.speculative_components)
+
+        # History token budgets and the summarizer follow the NLG model.
+        self.llm = self.llms["nlg"]
+        self.latency = LatencyTracker()
 
-        self.router = Router(self.llm)
-        self.NLU = NLU(self.llm)
-        self.DM = DM(self.llm)
-        self.NLG = NLG(self.llm)
+        self.router = Router(self._component_llm("router"))
+        self.NLU = NLU(self._component_llm("nlu"))
+        self.DM = DM(self._component_llm("dm"))
+        self.NLG = NLG(self._component_llm("nlg"))
 
         self.dst = StateTracker()
-        self.db_controller = DBController(self.dst)
-        self.history = History()
+        self.async_db_controller = None
+        start_static_data_watcher()
+
+        if db_backend:
+            self.async_db_controller = AsyncDBController(
+                self.dst, create_backend(db_backend, pool_size=DB_POOL_SIZE), timeout=DB_TIMEOUT)
+
+        self.db_controller = self._create_db_controller()
+        self.history = History(token_counter=self.llm.count_tokens)
         self.task_queue = TaskQueue()
 
+        self.summarizer = None
+
+        if HISTORY_SUMMARY:
+            self.summarizer = HistorySummarizer(self.llm, keep_messages=self._summary_keep_messages(), max_tokens=SUMMARY_MAX_TOKENS)
+
+    @staticmethod
+    def _summary_keep_messages() -> int:
+        """Fold every message older than the smallest component window into the summary."""
+        keep_messages = window_keep_messages([ROUTER_HISTORY_MESSAGES + 1, NLU_HISTORY_MESSAGES + 1, NLG_HISTORY_MESSAGES])
+
+        if SUMMARY_KEEP_MESSAGES > keep_messages:
+            logger.warning("SUMMARY_KEEP_MESSAGES=%s would leave turns out of both the summary and the NLG window, using %s.",
+                           SUMMARY_KEEP_MESSAGES, keep_messages)
+
+        return min(SUMMARY_KEEP_MESSAGES, keep_messages) if SUMMARY_KEEP_MESSAGES > 0 else keep_messages
+
+    def _drop_unknown_adapters(self, known: dict[str, str] | None) -> None:
+        """Skip the configured adapters a preloaded LLM was not created with, instead of failing on first use."""
+        if known is None:
+            return
+
+        # Adapters are registered on the LLM under their component name.
+        unknown = sorted(component for component in self.adapters if component not in known)
+
+        if unknown:
+            logger.warning("The shared LLM has no LoRA adapter for %s, these components use the base model.", ", ".join(unknown))
+            self.adapters = {component: path for component, path in self.adapters.items() if component in known}
+
+    def _component_llm(self, component: str) -> TimedLLM:
+        """The LLM of a component with its adapter and decoding options, timed under its name."""
+        llm = ComponentLLM(
+            self.llms[component],
+            adapter=component if component in self.adapters else None,
+            speculative=component in self.speculative_components,
+            prompt_lookup=component in self.prompt_lookup_components,
+        )
+
+        return TimedLLM(llm, component, self.latency)
+
+    def _create_db_controller(self) -> DBController | AsyncDBController:
+        """Use the async controller when a backend is configured, keeping its loop and connection pool."""
+        if self.async_db_controller is None:
+            return DBController(self.dst)
+
+        self.async_db_controller.dst = self.dst
+        return self.async_db_controller
+
     def reset_state(self) -> None:
         """Reset the dialogue state while keeping the database unchanged."""
         self.dst = StateTracker()
-        self.db_controller = DBController(self.dst)
-        self.history = History()
+        self.db_controller = self._create_db_controller()
+        self.history = History(token_counter=self.llm.count_tokens)
         self.task_queue = TaskQueue()
 
     def reset_all(self) -> None:
@@ -47,6 +135,14 @@ class Chatbot:
         self.reset_state()
         self.db_controller.reset_database()
 
+    def close(self) -> None:
+        """Stop the history summarizer and the async database loop thread and connection pool."""
+        if self.summarizer is not None:
+            self.summarizer.close()
+
+        if self.async_db_controller is not None:
+            self.async_db_controller.close()
+
     def _prepare_pipeline(self, nlu_result: dict[str, Any], target_dst: StateTracker, lenient: bool = False) -> tuple[dict[str, Any], dict[str, Any] | None, bool]:
         """Update the target DST and resolve the resulting state through the database."""
         dialogue_state = target_dst.update(nlu_result)
@@ -54,6 +150,24 @@ class Chatbot:
 
         db_result = self.db_controller.resolve_state(
             dialogue_state, user_profile, lenient=lenient, target_dst=target_dst)
+
+        return self._finish_pipeline(dialogue_state, db_result)
+
+    def _prepare_pipelines_concurrently(self, main_nlu: dict[str, Any], secondary_nlu: dict[str, Any], secondary_dst: StateTracker) -> list[tuple[dict[str, Any], dict[str, Any] | None, bool]]:
+        """Update the main and secondary DSTs, then resolve both states concurrently through the async database."""
+        main_state = self.dst.update(main_nlu)
+        secondary_dst.user_profile = self.dst.user_profile.copy()
+        secondary_state = secondary_dst.update(secondary_nlu)
+        user_profile = self.dst.get_user_profile()
+
+        db_results = self.async_db_controller.resolve_states([
+            {"dialogue_state": main_state, "user_profile": user_profile, "lenient": False, "target_dst": self.dst},
+            {"dialogue_state": secondary_state, "user_profile": user_profile, "lenient": True, "target_dst": secondary_dst},
+        ])
+
+        return [self._finish_pipeline(main_state, db_results[0]), self._finish_pipeline(secondary_state, db_results[1])]
+
+    def _finish_pipeline(self, dialogue_state: dict[str, Any], db_result: dict[str, Any] | None) -> tuple[dict[str, Any], dict[str, Any] | None, bool]:
         is_done = bool(db_result and db_result.get("status") in self.DONE_STATUSES)
 
         logger.debug("DST after update: %s", dialogue_state)
@@ -135,13 +249,20 @@ class Chatbot:
         main_task = {"nlu": main_nlu, "segment": main_segment}
         secondary_task = {"nlu": secondary_nlu, "segment": secondary_segment}
 
-        main_task["ds"], main_task["db_res"], main_task["is_done"] = self._prepare_pipeline(
-            main_task["nlu"], self.dst, lenient=False)
-
         secondary_dst = StateTracker()
-        secondary_dst.user_profile = self.dst.user_profile.copy()
-        secondary_task["ds"], secondary_task["db_res"], secondary_task["is_done"] = self._prepare_pipeline(
-            secondary_task["nlu"], secondary_dst, lenient=True)
+
+        if self.async_db_controller is not None:
+            main_pipeline, secondary_pipeline = self._prepare_pipelines_concurrently(
+                main_task["nlu"], secondary_task["nlu"], secondary_dst)
+            main_task["ds"], main_task["db_res"], main_task["is_done"] = main_pipeline
+            secondary_task["ds"], secondary_task["db_res"], secondary_task["is_done"] = secondary_pipeline
+        else:
+            main_task["ds"], main_task["db_res"], main_task["is_done"] = self._prepare_pipeline(
+                main_task["nlu"], self.dst, lenient=False)
+
+            secondary_dst.user_profile = self.dst.user_profile.copy()
+            secondary_task["ds"], secondary_task["db_res"], secondary_task["is_done"] = self._prepare_pipeline(
+                secondary_task["nlu"], secondary_dst, lenient=True)
 
         self.dst.user_profile.update(secondary_dst.user_profile)
 
@@ -207,8 +328,26 @@ class Chatbot:
             logger.debug("Preserving unfinished secondary intent after main completion.")
             self.dst.ds = secondary_dialogue_state.copy()
 
+    def latency_report(self) -> dict[str, dict[str, float]]:
+        """Per-component LLM latency and whole-turn latency since the chatbot was created, plus assisted decoding stats."""
+        report = self.latency.report()
+
+        for llm in {id(llm): llm for llm in self.llms.values()}.values():
+            for mode, stats in getattr(llm, "decoding_report", dict)().items():
+                report[f"{mode}:{llm.model_name}"] = stats
+
+        return report
+
     def reply(self, user_input: str) -> str:
         """Generate a chatbot response for a single user turn."""
+        start = time.perf_counter()
+
+        try:
+            return self._reply(user_input)
+        finally:
+            self.latency.record("turn", time.perf_counter() - start)
+
+    def _reply(self, user_input: str) -> str:
         command = user_input.strip().lower()
 
         if command in ["exit", "quit", "stop"]:
@@ -248,14 +387,21 @@ class Chatbot:
 
         logger.debug("====== Intent processing ======")
 
-        if len(nlu_results) == 1:
-            tasks_to_execute, main_is_done, secondary_is_done, main_intent_name, secondary_dialogue_state, should_recover = self._process_single_intent(
-                nlu_results[0], segments[0]["segment"])
-        elif len(nlu_results) == 2:
-            tasks_to_execute, main_is_done, secondary_is_done, main_intent_name, secondary_dialogue_state, should_recover = self._process_double_intent(
-                nlu_results, segments)
-        else:
-            return "I could not understand the request."
+        try:
+            if len(nlu_results) == 1:
+                tasks_to_execute, main_is_done, secondary_is_done, main_intent_name, secondary_dialogue_state, should_recover = self._process_single_intent(
+                    nlu_results[0], segments[0]["segment"])
+            elif len(nlu_results) == 2:
+                tasks_to_execute, main_is_done, secondary_is_done, main_intent_name, secondary_dialogue_state, should_recover = self._process_double_intent(
+                    nlu_results, segments)
+            else:
+                return "I could not understand the request."
+        except DatabaseTimeoutError:
+            logger.warning("Database did not answer in time.")
+            # The DST keeps the slots of this turn, so the retry only needs the backend to answer.
+            response = "The booking system is not responding right now. Please try again in a moment."
+            self.history.add_message("assistant", response)
+            return response
 
         nba_list = [task["nba"] for task in tasks_to_execute]
         dialogue_state_list = [task["ds"] for task in tasks_to_execute]
@@ -282,6 +428,9 @@ class Chatbot:
 
         self.history.add_message("assistant", combined_response)
 
+        if self.summarizer is not None:
+            self.summarizer.schedule(self.history)
+
         return combined_response
 
     def chat_loop(self) -> None:
@@ -298,4 +447,6 @@ class Chatbot:
             print(f"Bot: {response}")
 
             if command in ["exit", "quit", "stop"]:
+                logger.info("Latency by component: %s", self.latency_report())
+                self.close()
                 break
@@ -3,13 +3,17 @@ import re
 from typing import Any
 
 from prompts.dm_prompt import DM_SYSTEM_PROMPT
+from utils.serialization import check_payload_format, serialize_payload
+from utils.settings import PAYLOAD_FORMAT
 
 
 class DM:
     """Predicts the next best action from the current dialogue state."""
 
-    def __init__(self, llm) -> None:
+    def __init__(self, llm, payload_format: str = PAYLOAD_FORMAT) -> None:
         self.llm = llm
+        # Fail at startup on a mistyped PAYLOAD_FORMAT, not on the first prompt.
+        self.payload_format = check_payload_format(payload_format)
 
     def parse_llm_json(self, text: str) -> dict[str, Any]:
         """Parse the LLM output and return a safe fallback when parsing fails."""
@@ -31,7 +35,7 @@ class DM:
         messages_batch = []
 
         for payload in payloads:
-            payload_str = json.dumps(payload, indent=2)
+            payload_str = serialize_payload(payload, self.payload_format)
 
             messages = [
                 {"role": "system", "content": DM_SYSTEM_PROMPT},
@@ -1,5 +1,3 @@
-import copy
-import json
 import logging
 from typing import Any
 
@@ -9,6 +7,9 @@ from prompts.nlg_prompt import (
     NLG_COMPATIBLE_BASE_PROMPT,
     NLG_QWEN_BASE_PROMPT,
 )
+from state.history import MaskedHistoryView
+from utils.serialization import check_payload_format, serialize_payload
+from utils.settings import NLG_HISTORY_MESSAGES, NLG_HISTORY_TOKENS, PAYLOAD_FORMAT
 
 
 logger = logging.getLogger(__name__)
@@ -29,8 +30,10 @@ INTENT_TRANSLATIONS = {
 class NLG:
     """Generates final natural-language responses from DM actions and dialogue states."""
 
-    def __init__(self, llm) -> None:
+    def __init__(self, llm, payload_format: str = PAYLOAD_FORMAT) -> None:
         self.llm = llm
+        # Fail at startup on a mistyped PAYLOAD_FORMAT, not on the first prompt.
+        self.payload_format = check_payload_format(payload_format)
 
     def _get_active_flags(self, dm_action_data: dict[str, Any]) -> list[str]:
         flags = []
@@ -105,10 +108,10 @@ class NLG:
 
         command_parts = [
             "CURRENT DIALOGUE STATE:",
-            json.dumps(dialogue_state, indent=2),
+            serialize_payload(dialogue_state, self.payload_format),
             "",
             "CURRENT DM INSTRUCTION:",
-            json.dumps(dm_action_data, indent=2),
+            serialize_payload(dm_action_data, self.payload_format),
         ]
 
         if flag_instructions:
@@ -186,7 +189,11 @@ class NLG:
     def predict(self, dm_action_data: dict[str, Any], dialogue_state: dict[str, Any], history) -> str:
         system_content = self._build_system_content(dialogue_state)
         final_command = self._build_final_command(dm_action_data, dialogue_state)
-        history_messages = history.get_last_n_messages(4)
+        history_messages = history.get_last_n_messages(NLG_HISTORY_MESSAGES, max_tokens=NLG_HISTORY_TOKENS)
+
+        summary = history.get_summary()
+        if summary:
+            final_command = f"EARLIER CONVERSATION SUMMARY:\n{summary}\n\n{final_command}"
 
         messages = self._build_messages(system_content, final_command, history_messages)
 
@@ -204,26 +211,22 @@ class NLG:
             for nba in nba_list:
                 nba["is_multitask"] = True
 
-    def _build_masked_history(self, global_history, active_segments: list[str], current_index: int, final_responses: list[str]):
+    def _build_masked_history(self, global_history, active_segments: list[str], current_index: int, final_responses: list[str]) -> MaskedHistoryView:
         """Hide unrelated target segments while generating each partial response."""
-        from state.history import History
-
-        temp_history = History()
-        temp_history.messages = copy.deepcopy(global_history.messages)
+        masked_last_message = None
 
-        if active_segments and len(active_segments) > 1:
-            last_message = temp_history.messages[-1]["content"]
+        if active_segments and len(active_segments) > 1 and global_history.messages:
+            last_message = global_history.messages[-1]["content"]
             other_segments = [segment for index, segment in enumerate(active_segments) if index != current_index]
 
             for segment in other_segments:
                 last_message = last_message.replace(segment, "").strip()
 
-            temp_history.messages[-1]["content"] = last_message
+            masked_last_message = last_message
 
-        if final_responses:
-            temp_history.add_message("assistant", " ".join(final_responses))
+        appended_messages = [{"role": "assistant", "content": " ".join(final_responses)}] if final_responses else []
 
-        return temp_history
+        return MaskedHistoryView(global_history, masked_last_message, appended_messages)
 
     def generate_multi_response(self, nba_list: list[dict[str, Any]], ds_list: list[dict[str, Any]], active_segments: list[str], global_history, step_by_step_mode: bool = False) -> str:
         final_responses = []
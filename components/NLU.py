@@ -3,17 +3,90 @@ import logging
 import re
 from typing import Any
 
+from prompts.nlu_examples import EXAMPLES_HEADER, NLU_EXAMPLE_BANK, NLU_SCHEMA_HEADERS, example_search_text
 from prompts.nlu_prompt import INTENT_SCHEMAS_PROMPTS, NLU_BASE_CONTEXT
+from utils.bm25 import BM25Index
+from utils.serialization import INPUT_PAYLOAD_HEADER, check_payload_format, serialize_payload
+from utils.settings import NLU_FEW_SHOT_K, NLU_FEW_SHOT_TOKENS, NLU_HISTORY_MESSAGES, NLU_HISTORY_TOKENS, PAYLOAD_FORMAT
 
 
 logger = logging.getLogger(__name__)
 
 
+class ExampleSelector:
+    """
+    Picks the few-shot examples of an intent schema that are most similar (BM25) to the NLU
+    payload, up to k examples and max_tokens tokens. The examples go in the user turn, so the
+    system prompt stays static per intent. With k=0 the full schema is used.
+    """
+
+    def __init__(self, count_tokens, k: int = NLU_FEW_SHOT_K, max_tokens: int = NLU_FEW_SHOT_TOKENS) -> None:
+        self.count_tokens = count_tokens
+        self.k = k
+        self.max_tokens = max_tokens
+        self.indexes = {
+            intent: BM25Index([example_search_text(example["input"]) for example in examples])
+            for intent, examples in NLU_EXAMPLE_BANK.items()
+        }
+        self._example_tokens: dict[tuple[str, int], int] = {}
+
+    def _tokens(self, intent: str, index: int) -> int:
+        key = (intent, index)
+
+        if key not in self._example_tokens:
+            self._example_tokens[key] = self.count_tokens(NLU_EXAMPLE_BANK[intent][index]["text"])
+
+        return self._example_tokens[key]
+
+    def select(self, intent: str, payload: dict[str, Any]) -> list[dict[str, Any]]:
+        """The selected examples, in the order of the schema."""
+        selected = []
+        used_tokens = 0
+
+        for index in self.indexes[intent].rank(example_search_text(payload)):
+            if len(selected) == self.k:
+                break
+
+            # Examples that do not fit are skipped, a shorter one may still fit.
+            tokens = self._tokens(intent, index)
+            if used_tokens + tokens > self.max_tokens:
+                continue
+
+            selected.append(index)
+            used_tokens += tokens
+
+        return [NLU_EXAMPLE_BANK[intent][index] for index in sorted(selected)]
+
+    def system_prompt(self, target_intent: str) -> str:
+        """
+        Static system prompt of an intent: the base context and the slot definitions, so it
+        tokenizes once per intent. With k=0 the full schema, examples included, is used.
+        """
+        intent = target_intent if target_intent in INTENT_SCHEMAS_PROMPTS else "out_of_scope"
+        schema = INTENT_SCHEMAS_PROMPTS[intent] if not self.k else NLU_SCHEMA_HEADERS[intent]
+        return f"{NLU_BASE_CONTEXT}\n\n{schema}".strip()
+
+    def user_prompt(self, target_intent: str, payload: dict[str, Any], payload_format: str = PAYLOAD_FORMAT) -> str:
+        """The serialized payload, preceded by the examples selected for it."""
+        intent = target_intent if target_intent in INTENT_SCHEMAS_PROMPTS else "out_of_scope"
+        content = serialize_payload(payload, payload_format)
+        examples = self.select(intent, payload) if self.k else []
+
+        if not examples:
+            return content
+
+        examples_text = "\n\n".join(example["text"] for example in examples)
+        return f"{EXAMPLES_HEADER}\n{examples_text}\n\n{INPUT_PAYLOAD_HEADER}\n{content}"
+
+
 class NLU:
     """Extracts intent-specific slots from router segments."""
 
-    def __init__(self, llm) -> None:
+    def __init__(self, llm, payload_format: str = PAYLOAD_FORMAT) -> None:
         self.llm = llm
+        # Fail at startup on a mistyped PAYLOAD_FORMAT, not on the first prompt.
+        self.payload_format = check_payload_format(payload_format)
+        self.examples = ExampleSelector(llm.count_tokens)
 
     def parse_llm_json(self, text: str, fallback_intent: str) -> dict[str, Any]:
         """Parse the LLM JSON output and preserve the expected intent on failure."""
@@ -35,10 +108,7 @@ class NLU:
         target_intent = segment.get("intent", "out_of_scope")
         segment_text = segment.get("segment", "")
 
-        schema_and_examples = INTENT_SCHEMAS_PROMPTS.get(target_intent, INTENT_SCHEMAS_PROMPTS["out_of_scope"])
-        system_prompt = f"{NLU_BASE_CONTEXT}\n\n{schema_and_examples}"
-
-        conv_history, last_utterance = history.get_json_history_and_last_utterance(n=4)
+        conv_history, last_utterance = history.get_json_history_and_last_utterance(n=NLU_HISTORY_MESSAGES, max_tokens=NLU_HISTORY_TOKENS)
 
         payload = {
             "conversation_history": conv_history,
@@ -47,9 +117,13 @@ class NLU:
             "target_segment": segment_text,
         }
 
+        summary = history.get_summary()
+        if summary:
+            payload["conversation_summary"] = summary
+
         return [
-            {"role": "system", "content": system_prompt.strip()},
-            {"role": "user", "content": json.dumps(payload, indent=2)},
+            {"role": "system", "content": self.examples.system_prompt(target_intent)},
+            {"role": "user", "content": self.examples.user_prompt(target_intent, payload, self.payload_format)},
         ]
 
     def predict_batch(self, segments: list[dict[str, Any]], history) -> list[dict[str, Any]]:
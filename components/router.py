@@ -4,6 +4,8 @@ import re
 from typing import Any
 
 from prompts.router_prompt import ROUTER_SYSTEM_PROMPT
+from utils.serialization import check_payload_format, serialize_payload
+from utils.settings import PAYLOAD_FORMAT, ROUTER_HISTORY_MESSAGES, ROUTER_HISTORY_TOKENS
 
 
 logger = logging.getLogger(__name__)
@@ -22,8 +24,10 @@ TARGET_MERGE_INTENTS = {
 class Router:
     """Splits the latest user message into intent-specific segments."""
 
-    def __init__(self, llm) -> None:
+    def __init__(self, llm, payload_format: str = PAYLOAD_FORMAT) -> None:
         self.llm = llm
+        # Fail at startup on a mistyped PAYLOAD_FORMAT, not on the first prompt.
+        self.payload_format = check_payload_format(payload_format)
 
     def _parse_json(self, text: str) -> dict[str, Any] | None:
         try:
@@ -99,16 +103,20 @@ class Router:
 
     def predict(self, history, excluded_segments: list[str] | None = None, active_intent: str | None = None) -> dict[str, Any]:
         conv_history, last_utterance = history.get_json_history_and_last_utterance_filtered(
-            n=6, excluded_segments=excluded_segments)
+            n=ROUTER_HISTORY_MESSAGES, excluded_segments=excluded_segments, max_tokens=ROUTER_HISTORY_TOKENS)
 
         payload = {
             "conversation_history": conv_history,
             "last_user_utterance": last_utterance,
         }
 
+        summary = history.get_summary()
+        if summary:
+            payload["conversation_summary"] = summary
+
         messages = [
             {"role": "system", "content": ROUTER_SYSTEM_PROMPT},
-            {"role": "user", "content": json.dumps(payload, indent=2)},
+            {"role": "user", "content": serialize_payload(payload, self.payload_format)},
         ]
 
         router_output = self.llm.generate(messages=messages, max_new_tokens=256)
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import threading
+from copy import deepcopy
+from typing import Any
+
+from database.db_backends import DatabaseBackend
+from database.db_controller import CACHEABLE_INTENTS, INTENT_TO_METHOD_NAME, NEEDS_USER_PROFILE, RESERVATION_INTENTS, RESULT_CACHE, SIDE_EFFECT_INTENTS, ResultCache
+
+
+logger = logging.getLogger(__name__)
+
+
+# Backend methods that are never abandoned on timeout, see SIDE_EFFECT_INTENTS.
+SIDE_EFFECT_METHODS = {INTENT_TO_METHOD_NAME[intent] for intent in SIDE_EFFECT_INTENTS}
+
+
+class DatabaseTimeoutError(TimeoutError):
+    """Raised when the database backend does not answer a read within the per-call timeout."""
+
+
+class AsyncDBController:
+    """
+    Async counterpart of DBController on top of a pluggable DatabaseBackend.
+
+    Backends only return results and predicted slots; the DST updates and the invalid
+    slot cleaning stay here, so several states can be resolved concurrently. The
+    controller owns an event loop thread, which keeps pooled connections on one loop
+    and lets synchronous callers (e.g. a notebook with a running loop) block on it.
+    """
+
+    def __init__(self, dst, backend: DatabaseBackend, timeout: float = 5.0, cache: ResultCache | None = RESULT_CACHE) -> None:
+        self.dst = dst
+        self.backend = backend
+        self.timeout = timeout
+        self.cache = cache
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="db-event-loop", daemon=True)
+        self._thread.start()
+
+    def run(self, coroutine):
+        """Run a coroutine on the controller loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def close(self) -> None:
+        """Close the connection pool and stop the loop thread. Safe to call more than once."""
+        if not self._thread.is_alive():
+            return
+
+        self.run(self.backend.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _call_backend(self, method_name: str, kwargs: dict[str, Any]) -> tuple[dict[str, Any] | None, dict[str, Any]]:
+        # A write cancelled on timeout may still be committed by the backend, and the user
+        # retrying it would book or buy twice: wait for its outcome instead.
+        if method_name in SIDE_EFFECT_METHODS:
+            return await self.backend.call(method_name, kwargs)
+
+        try:
+            return await asyncio.wait_for(self.backend.call(method_name, kwargs), self.timeout)
+        except asyncio.TimeoutError as exc:
+            logger.warning("Database call %s timed out after %.1fs.", method_name, self.timeout)
+            raise DatabaseTimeoutError(f"Database call {method_name} timed out.") from exc
+
+    async def reset_database_async(self) -> None:
+        await self._call_backend("reset_database", {})
+
+    def reset_database(self) -> None:
+        self.run(self.reset_database_async())
+
+    async def resolve_state_async(self, dialogue_state: dict[str, Any], user_profile: dict[str, Any], lenient: bool = False, target_dst=None) -> dict[str, Any] | None:
+        """Resolve a dialogue state through the backend and clean invalid slots when needed."""
+        target_dst = target_dst if target_dst is not None else self.dst
+        intent = dialogue_state.get("intent")
+        slots = dialogue_state.get("slots", {})
+        method_name = INTENT_TO_METHOD_NAME.get(intent)
+
+        if not method_name:
+            return {"status": "UNKNOWN_INTENT"}
+
+        kwargs = {**slots, "lenient": lenient}
+        if intent in NEEDS_USER_PROFILE:
+            kwargs["user"] = user_profile
+        if intent in RESERVATION_INTENTS:
+            kwargs["reservation_id"] = target_dst.get_reservation_id()
+
+        cache_key = None
+        generation = None
+        entry = None
+
+        if intent in CACHEABLE_INTENTS and self.cache is not None:
+            cache_key = self.cache.make_key(intent, slots, lenient)
+            generation = self.cache.generation
+            entry = self.cache.get(cache_key)
+
+        if entry is not None:
+            db_result, slot_updates = deepcopy(entry[0]), entry[1]
+        else:
+            db_result, slot_updates = await self._call_backend(method_name, kwargs)
+
+            if cache_key is not None:
+                self.cache.put(cache_key, db_result, slot_updates, generation=generation)
+
+        if slot_updates:
+            target_dst.update_predicted_slots(slot_updates)
+
+        if db_result and db_result.get("status") == "INVALID_VALUE":
+            violating_slot = db_result.get("violating_slot")
+            if violating_slot:
+                target_dst.clean_invalid_slots(violating_slot)
+
+        return db_result
+
+    async def resolve_states_async(self, requests: list[dict[str, Any]]) -> list[dict[str, Any] | None]:
+        """Resolve several states concurrently. Each request holds the resolve_state_async arguments."""
+        return list(await asyncio.gather(*(self.resolve_state_async(**request) for request in requests)))
+
+    def resolve_state(self, dialogue_state: dict[str, Any], user_profile: dict[str, Any], lenient: bool = False, target_dst=None) -> dict[str, Any] | None:
+        return self.run(self.resolve_state_async(dialogue_state, user_profile, lenient=lenient, target_dst=target_dst))
+
+    def resolve_states(self, requests: list[dict[str, Any]]) -> list[dict[str, Any] | None]:
+        return self.run(self.resolve_states_async(requests))
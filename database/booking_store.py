@@ -0,0 +1,238 @@
+import json
+import logging
+import os
+import threading
+from copy import deepcopy
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+
+logger = logging.getLogger(__name__)
+
+BOOKED = "BOOKED"
+MODIFIED = "MODIFIED"
+CANCELLED = "CANCELLED"
+LOST_ITEM_REPORTED = "LOST_ITEM_REPORTED"
+RESET = "RESET"
+
+USER_COLLECTIONS = ("booked_courses", "booked_spa", "lost_items")
+
+SNAPSHOT_FILENAME = "snapshot.json"
+EVENTS_FILENAME = "events.jsonl"
+
+
+class BookingStore:
+    """
+    Event-sourced store for user bookings and lost item reports.
+
+    Every mutation is recorded as an append-only event. User records are copy-on-write:
+    the active snapshot is never modified, changed users live in a small overlay until
+    the next compaction. Restoring a snapshot only swaps references.
+    """
+
+    def __init__(self, initial_users: dict[str, Any], log_dir: str | None = None, snapshot_every: int = 200) -> None:
+        self._initial_snapshot = {"sequence": 0, "users": deepcopy(initial_users)}
+        self._snapshot = self._initial_snapshot
+        self._overlay: dict[str, dict[str, list[dict[str, Any]]]] = {}
+        self._lock = threading.RLock()
+        self._listeners: list = []
+
+        self.sequence = 0
+        self.events: list[dict[str, Any]] = []
+        self.snapshot_every = snapshot_every
+        self.log_dir = Path(log_dir) if log_dir else None
+
+        if self.log_dir is not None:
+            self._recover()
+
+    # ===================
+    #    READ ACCESS
+    # ===================
+    def has_user(self, user_id: str) -> bool:
+        return user_id in self._overlay or user_id in self._snapshot["users"]
+
+    def get_user(self, user_id: str) -> dict[str, Any] | None:
+        """Return the current user record. The returned data must be treated as read-only."""
+        user = self._overlay.get(user_id)
+        if user is None:
+            user = self._snapshot["users"].get(user_id)
+        return user
+
+    def get_collection(self, user_id: str, collection: str) -> list[dict[str, Any]]:
+        """Return one user collection (bookings or lost items) without copying it."""
+        user = self.get_user(user_id) or {}
+        return user.get(collection, [])
+
+    def iter_users(self) -> Iterator[tuple[str, dict[str, Any]]]:
+        for user_id, user in self._snapshot["users"].items():
+            if user_id not in self._overlay:
+                yield user_id, user
+        yield from self._overlay.items()
+
+    def add_listener(self, listener) -> None:
+        """Register a callable notified with every applied event, e.g. to maintain secondary indexes."""
+        self._listeners.append(listener)
+
+    # ===================
+    #    MUTATIONS
+    # ===================
+    def record_event(self, event_type: str, user_id: str, collection: str, record: dict[str, Any] | None = None, previous: dict[str, Any] | None = None) -> dict[str, Any]:
+        """Append an event to the log and apply it to the in-memory state."""
+        with self._lock:
+            event = {
+                "sequence": self.sequence + 1,
+                "type": event_type,
+                "user_id": user_id,
+                "collection": collection,
+                "record": record,
+                "previous": previous,
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+            }
+
+            self._apply(event)
+            self.events.append(event)
+            self._append_to_log(event)
+
+            if self.log_dir is not None and len(self.events) >= self.snapshot_every:
+                self.snapshot()
+
+            return event
+
+    def reset(self) -> None:
+        """Restore the initial snapshot without copying any user data."""
+        with self._lock:
+            event = {
+                "sequence": self.sequence + 1,
+                "type": RESET,
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+            }
+
+            self._apply(event)
+            self.events.append(event)
+            self._append_to_log(event)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Compact the overlay into a new snapshot and start a new log segment."""
+        with self._lock:
+            users = dict(self._snapshot["users"])
+            users.update(self._overlay)
+
+            self._snapshot = {"sequence": self.sequence, "users": users}
+            self._overlay = {}
+            self.events = []
+
+            if self.log_dir is not None:
+                self._write_snapshot()
+
+            return self._snapshot
+
+    def _writable_user(self, user_id: str) -> dict[str, list[dict[str, Any]]]:
+        """Copy a user record into the overlay before its first change."""
+        user = self._overlay.get(user_id)
+
+        if user is None:
+            base_user = self._snapshot["users"].get(user_id, {})
+            # Records are replaced rather than edited, so copying the lists is enough.
+            user = {key: list(value) for key, value in base_user.items()}
+            self._overlay[user_id] = user
+
+        for collection in USER_COLLECTIONS:
+            user.setdefault(collection, [])
+
+        return user
+
+    def _apply(self, event: dict[str, Any]) -> None:
+        event_type = event["type"]
+        self.sequence = event["sequence"]
+
+        if event_type == RESET:
+            self._snapshot = self._initial_snapshot
+            self._overlay = {}
+        else:
+            records = self._writable_user(event["user_id"])[event["collection"]]
+
+            if event_type in (BOOKED, LOST_ITEM_REPORTED):
+                records.append(event["record"])
+            elif event_type == MODIFIED:
+                # The updated booking moves to the end of the list, as the original in-place update did.
+                self._remove_record(records, event["previous"])
+                records.append(event["record"])
+            elif event_type == CANCELLED:
+                self._remove_record(records, event["previous"])
+            else:
+                raise ValueError(f"Unknown booking event type: {event_type}")
+
+        for listener in self._listeners:
+            listener(event)
+
+    def _remove_record(self, records: list[dict[str, Any]], target: dict[str, Any] | None) -> None:
+        for index, record in enumerate(records):
+            if record == target:
+                records.pop(index)
+                return
+
+        logger.warning("Booking event references a record that does not exist: %s", target)
+
+    # ===================
+    #    PERSISTENCE
+    # ===================
+    def _append_to_log(self, event: dict[str, Any]) -> None:
+        if self.log_dir is None:
+            return
+
+        try:
+            with open(self.log_dir / EVENTS_FILENAME, "a", encoding="utf-8") as file:
+                file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        except OSError as error:
+            logger.warning("Failed to append booking event: %s", error)
+
+    def _write_snapshot(self) -> None:
+        snapshot_path = self.log_dir / SNAPSHOT_FILENAME
+        tmp_path = snapshot_path.with_suffix(".json.tmp")
+        events_path = self.log_dir / EVENTS_FILENAME
+
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(self._snapshot, file, ensure_ascii=False)
+            os.replace(tmp_path, snapshot_path)
+
+            # Keep the full audit trail: the compacted segment is archived, not deleted.
+            if events_path.exists():
+                os.replace(events_path, self.log_dir / f"events-{self._snapshot['sequence']:08d}.jsonl")
+        except OSError as error:
+            logger.warning("Failed to write booking snapshot: %s", error)
+
+    def _recover(self) -> None:
+        """Load the latest snapshot and replay only the events recorded after it."""
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        snapshot_path = self.log_dir / SNAPSHOT_FILENAME
+        events_path = self.log_dir / EVENTS_FILENAME
+
+        if snapshot_path.exists():
+            with open(snapshot_path, "r", encoding="utf-8") as file:
+                self._snapshot = json.load(file)
+            self.sequence = self._snapshot["sequence"]
+
+        if not events_path.exists():
+            return
+
+        with open(events_path, "r", encoding="utf-8") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a truncated last line behind.
+                    logger.warning("Skipping unreadable booking event line.")
+                    continue
+
+                if event["sequence"] <= self.sequence:
+                    continue
+
+                self._apply(event)
+                self.events.append(event)
+
+        logger.debug("Recovered booking store at sequence %s (%s events replayed).", self.sequence, len(self.events))
@@ -0,0 +1,78 @@
+from typing import Any
+
+
+# Course filter slots and the COURSES_DB attribute they refer to.
+FILTER_ATTRIBUTES = {
+    "target_age": "ages",
+    "level": "levels",
+    "day_preference": "days",
+}
+
+# When a filter combination is impossible, the most flexible filter is relaxed first.
+RELAXATION_ORDER = ["day_preference", "level", "target_age"]
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+class CourseIndex:
+    """Bitset index over the course catalog, built once from COURSES_DB."""
+
+    def __init__(self, courses: dict[str, dict[str, list[str]]]) -> None:
+        self.course_names = list(courses.keys())
+        self.all_courses_mask = (1 << len(self.course_names)) - 1
+        self.value_masks: dict[str, dict[str, int]] = {slot: {} for slot in FILTER_ATTRIBUTES}
+        self.value_order: dict[str, list[str]] = {slot: [] for slot in FILTER_ATTRIBUTES}
+
+        for bit, course_rules in enumerate(courses.values()):
+            for slot, attribute in FILTER_ATTRIBUTES.items():
+                for value in course_rules.get(attribute, []):
+                    if value not in self.value_masks[slot]:
+                        self.value_order[slot].append(value)
+                    self.value_masks[slot][value] = self.value_masks[slot].get(value, 0) | (1 << bit)
+
+        # Suggested days are listed in calendar order, not in catalog order.
+        self.value_order["day_preference"].sort(key=lambda day: WEEKDAYS.index(day) if day in WEEKDAYS else len(WEEKDAYS))
+
+    def _mask(self, filters: dict[str, Any]) -> int:
+        mask = self.all_courses_mask
+
+        for slot, value in filters.items():
+            if value:
+                mask &= self.value_masks[slot].get(value, 0)
+
+        return mask
+
+    def _names(self, mask: int) -> list[str]:
+        return [name for bit, name in enumerate(self.course_names) if mask & (1 << bit)]
+
+    def _values_compatible_with(self, slot: str, mask: int) -> list[str]:
+        return [value for value in self.value_order[slot] if self.value_masks[slot][value] & mask]
+
+    def compatible_courses(self, target_age: str | None = None, level: str | None = None, day_preference: str | None = None) -> list[str]:
+        """Return the courses that satisfy every provided filter, in catalog order."""
+        return self._names(self._mask({"target_age": target_age, "level": level, "day_preference": day_preference}))
+
+    def find_blocking_filter(self, target_age: str | None = None, level: str | None = None, day_preference: str | None = None) -> tuple[str, list[str]] | None:
+        """
+        Return the filter that makes the combination impossible and the values it could take instead.
+        None means that at least one course is compatible with the filters.
+        """
+        filters = {"target_age": target_age, "level": level, "day_preference": day_preference}
+
+        if self._mask(filters):
+            return None
+
+        provided = [slot for slot in RELAXATION_ORDER if filters[slot]]
+        # A value that no course offers is wrong on its own, so it is reported first.
+        unknown = [slot for slot in provided if not self.value_masks[slot].get(filters[slot], 0)]
+
+        for slot in unknown + [slot for slot in provided if slot not in unknown]:
+            other_mask = self._mask({key: value for key, value in filters.items() if key != slot})
+
+            if other_mask:
+                return slot, self._values_compatible_with(slot, other_mask)
+
+        # No single change fixes the combination: ask for the least flexible filter again,
+        # with every value it can take, and check the remaining filters on the next turn.
+        slot = unknown[0] if unknown else provided[-1]
+        return slot, self._values_compatible_with(slot, self.all_courses_mask)
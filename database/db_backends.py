@@ -0,0 +1,136 @@
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from database.db_controller import INTENT_TO_METHOD_NAME, SlotUpdateRecorder
+from database.mock_database import MockDatabase, reset_users_db
+
+
+logger = logging.getLogger(__name__)
+
+# Methods that no user intent maps to, called by staff tools through a backend.
+STAFF_METHODS = {"find_lost_item_reports"}
+
+# Methods a backend may run: the MockDatabase contract, the staff lookups and the database reset.
+ALLOWED_METHODS = set(INTENT_TO_METHOD_NAME.values()) | STAFF_METHODS | {"reset_database"}
+
+
+def call_database_method(method_name: str, kwargs: dict[str, Any]) -> tuple[dict[str, Any] | None, dict[str, Any]]:
+    """
+    Run one MockDatabase method without a DST.
+    Returns the result and the slots the database predicted, to be applied by the caller.
+    """
+    if method_name not in ALLOWED_METHODS:
+        raise ValueError(f"Unknown database method: {method_name}")
+
+    if method_name == "reset_database":
+        reset_users_db()
+        return None, {}
+
+    recorder = SlotUpdateRecorder()
+    db_result = getattr(MockDatabase(recorder), method_name)(**kwargs)
+    return db_result, recorder.updates
+
+
+class DatabaseBackend:
+    """Async contract of the database: run a MockDatabase method by name."""
+
+    async def call(self, method_name: str, kwargs: dict[str, Any]) -> tuple[dict[str, Any] | None, dict[str, Any]]:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalBackend(DatabaseBackend):
+    """Runs the in-process MockDatabase on a bounded pool of worker threads."""
+
+    def __init__(self, pool_size: int = 4) -> None:
+        self.pool_size = pool_size
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="db-worker")
+
+    async def call(self, method_name: str, kwargs: dict[str, Any]) -> tuple[dict[str, Any] | None, dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, call_database_method, method_name, kwargs)
+
+    async def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+class RemoteBackend(DatabaseBackend):
+    """
+    Talks JSON lines over TCP to a database server (see database/stub_server.py).
+
+    Connections are opened lazily up to pool_size and reused between calls. A connection
+    whose call fails or is cancelled (e.g. by a timeout) is closed instead of returned to
+    the pool, since a late response would otherwise be read by the next call.
+    """
+
+    def __init__(self, host: str, port: int, pool_size: int = 4) -> None:
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self._idle: asyncio.Queue | None = None
+        self._open_connections = 0
+        self._request_id = 0
+
+    async def _acquire(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+
+        if self._idle.empty() and self._open_connections < self.pool_size:
+            self._open_connections += 1
+            try:
+                return await asyncio.open_connection(self.host, self.port)
+            except BaseException:
+                self._open_connections -= 1
+                raise
+
+        return await self._idle.get()
+
+    def _discard(self, writer: asyncio.StreamWriter) -> None:
+        self._open_connections -= 1
+        writer.close()
+
+    async def call(self, method_name: str, kwargs: dict[str, Any]) -> tuple[dict[str, Any] | None, dict[str, Any]]:
+        self._request_id += 1
+        request = {"id": self._request_id, "method": method_name, "kwargs": kwargs}
+        reader, writer = await self._acquire()
+
+        try:
+            writer.write(json.dumps(request, default=str).encode() + b"\n")
+            await writer.drain()
+            line = await reader.readline()
+
+            if not line:
+                raise ConnectionError("Database server closed the connection.")
+        except BaseException:
+            self._discard(writer)
+            raise
+
+        self._idle.put_nowait((reader, writer))
+        response = json.loads(line)
+
+        if response.get("error"):
+            raise RuntimeError(f"Database server error: {response['error']}")
+
+        return response.get("result"), response.get("slot_updates", {})
+
+    async def close(self) -> None:
+        while self._idle is not None and not self._idle.empty():
+            _, writer = self._idle.get_nowait()
+            self._discard(writer)
+
+
+def create_backend(spec: str, pool_size: int = 4) -> DatabaseBackend:
+    """Build a backend from 'local' or 'tcp://host:port'."""
+    if spec == "local":
+        return LocalBackend(pool_size=pool_size)
+
+    if spec.startswith("tcp://"):
+        host, _, port = spec[len("tcp://"):].rpartition(":")
+        return RemoteBackend(host or "127.0.0.1", int(port), pool_size=pool_size)
+
+    raise ValueError(f"Unknown database backend: {spec}")
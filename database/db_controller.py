@@ -1,39 +1,171 @@
+import json
+import threading
+from copy import deepcopy
 from typing import Any
 
-from database.mock_database import MockDatabase, reset_users_db
+from database.mock_database import MockDatabase, add_static_data_listener, reset_users_db
+
+
+INTENT_TO_METHOD_NAME = {
+    "ask_opening_hours": "get_opening_hours",
+    "ask_pricing": "get_pricing",
+    "ask_rules": "get_rules",
+    "book_course": "get_book_course",
+    "book_spa": "get_book_spa",
+    "modify_booked_course": "get_modify_booked_course",
+    "modify_booked_spa": "get_modify_booked_spa",
+    "cancel_booked_course": "get_cancel_booked_course",
+    "cancel_booked_spa": "get_cancel_booked_spa",
+    "buy_equipment": "get_buy_equipment",
+    "report_lost_item": "get_report_lost_item",
+    "user_identification": "get_user_identification",
+    "greeting_closing": "get_greeting_closing",
+    "out_of_scope": "get_out_of_scope",
+}
+
+NEEDS_USER_PROFILE = {
+    "book_course", "book_spa", "modify_booked_course", "modify_booked_spa",
+    "cancel_booked_course", "cancel_booked_spa", "report_lost_item",
+}
+
+# Intents answered only from static tables and slot values, without side effects on bookings.
+CACHEABLE_INTENTS = {"ask_opening_hours", "ask_pricing", "ask_rules"}
+
+# Intents that write bookings or purchases. A call abandoned on timeout may still be applied,
+# so a retry by the user could book twice.
+SIDE_EFFECT_INTENTS = {
+    "book_course", "book_spa", "modify_booked_course", "modify_booked_spa",
+    "cancel_booked_course", "cancel_booked_spa", "buy_equipment",
+}
+
+# Intents that hold stock between turns. The reservation id lives in the DST, outside the slots.
+RESERVATION_INTENTS = {"buy_equipment"}
+
+
+class SlotUpdateRecorder:
+    """
+    Stands in for the DST during a database call and records the slots predicted by the database.
+    Without a DST, the updates are only recorded, e.g. when the call runs in another process.
+    """
+
+    def __init__(self, dst=None) -> None:
+        self.dst = dst
+        self.updates: dict[str, Any] = {}
+
+    def update_predicted_slots(self, db_slots: dict[str, Any]) -> None:
+        self.updates.update({key: value for key, value in (db_slots or {}).items() if value is not None})
+
+        if self.dst is not None:
+            self.dst.update_predicted_slots(db_slots)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.dst, name)
+
+
+class ResultCache:
+    """
+    Read-through cache of database results for read-only intents.
+
+    Every invalidation starts a new generation. Callers read the generation before
+    querying the database and pass it to put, so a result computed from the data of
+    before an invalidation is not stored after it.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries: dict[tuple[str, str, bool], tuple[dict[str, Any] | None, dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def make_key(self, intent: str, slots: dict[str, Any], lenient: bool) -> tuple[str, str, bool]:
+        # Slot order and value types (e.g. lists of services) do not change the canonical key.
+        return intent, json.dumps(slots, sort_keys=True, default=str), bool(lenient)
+
+    def get(self, key: tuple[str, str, bool]):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+            return entry
+
+    def put(self, key: tuple[str, str, bool], db_result: dict[str, Any] | None, slot_updates: dict[str, Any],
+            generation: int | None = None) -> None:
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+
+            if len(self._entries) >= self.max_entries:
+                # Evict the oldest entry.
+                self._entries.pop(next(iter(self._entries)))
+
+            self._entries[key] = (deepcopy(db_result), dict(slot_updates))
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+# Shared by every controller: the cached data is static and does not depend on the session.
+RESULT_CACHE = ResultCache()
+add_static_data_listener(RESULT_CACHE.invalidate)
 
 
 class DBController:
     """Routes resolved dialogue states to the corresponding database operation."""
 
-    def __init__(self, dst) -> None:
+    def __init__(self, dst, cache: ResultCache | None = RESULT_CACHE) -> None:
         self.db = MockDatabase(dst)
+        self.cache = cache
 
         self.intent_to_method = {
-            "ask_opening_hours": self.db.get_opening_hours,
-            "ask_pricing": self.db.get_pricing,
-            "ask_rules": self.db.get_rules,
-            "book_course": self.db.get_book_course,
-            "book_spa": self.db.get_book_spa,
-            "modify_booked_course": self.db.get_modify_booked_course,
-            "modify_booked_spa": self.db.get_modify_booked_spa,
-            "cancel_booked_course": self.db.get_cancel_booked_course,
-            "cancel_booked_spa": self.db.get_cancel_booked_spa,
-            "buy_equipment": self.db.get_buy_equipment,
-            "report_lost_item": self.db.get_report_lost_item,
-            "user_identification": self.db.get_user_identification,
-            "greeting_closing": self.db.get_greeting_closing,
-            "out_of_scope": self.db.get_out_of_scope,
-        }
-
-        self.needs_user_profile = {
-            "book_course", "book_spa", "modify_booked_course", "modify_booked_spa",
-            "cancel_booked_course", "cancel_booked_spa", "report_lost_item",
+            intent: getattr(self.db, method_name) for intent, method_name in INTENT_TO_METHOD_NAME.items()
         }
+        self.needs_user_profile = NEEDS_USER_PROFILE
 
     def reset_database(self) -> None:
         reset_users_db()
 
+    def invalidate_cache(self) -> None:
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    def cache_stats(self) -> dict[str, int]:
+        return self.cache.stats() if self.cache is not None else {"hits": 0, "misses": 0, "entries": 0}
+
+    def _call_cached(self, intent: str, db_method, slots: dict[str, Any], lenient: bool) -> dict[str, Any] | None:
+        """Serve read-only intents from the cache, replaying the slots the database would predict."""
+        key = self.cache.make_key(intent, slots, lenient)
+        generation = self.cache.generation
+        entry = self.cache.get(key)
+
+        if entry is not None:
+            db_result, slot_updates = entry
+            if slot_updates:
+                self.db.dst.update_predicted_slots(slot_updates)
+            return deepcopy(db_result)
+
+        recorder = SlotUpdateRecorder(self.db.dst)
+        self.db.dst = recorder
+
+        try:
+            db_result = db_method(**slots, lenient=lenient)
+        finally:
+            self.db.dst = recorder.dst
+
+        self.cache.put(key, db_result, recorder.updates, generation=generation)
+        return db_result
+
     def resolve_state(self, dialogue_state: dict[str, Any], user_profile: dict[str, Any], lenient: bool = False, target_dst=None) -> dict[str, Any] | None:
         """Resolve a dialogue state through the database and clean invalid slots when needed."""
         intent = dialogue_state.get("intent")
@@ -51,6 +183,10 @@ class DBController:
 
             if intent in self.needs_user_profile:
                 db_result = db_method(**slots, user=user_profile, lenient=lenient)
+            elif intent in CACHEABLE_INTENTS and self.cache is not None:
+                db_result = self._call_cached(intent, db_method, slots, lenient)
+            elif intent in RESERVATION_INTENTS:
+                db_result = db_method(**slots, reservation_id=self.db.dst.get_reservation_id(), lenient=lenient)
             else:
                 db_result = db_method(**slots, lenient=lenient)
 
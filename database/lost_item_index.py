@@ -0,0 +1,123 @@
+import difflib
+import re
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from database.booking_store import CANCELLED, LOST_ITEM_REPORTED, RESET
+from database.opening_hours import parse_date
+
+
+ITEM_SIMILARITY_THRESHOLD = 0.75
+
+
+def normalize_key(value: Any) -> str:
+    return re.sub(r"[\s_]+", "_", str(value or "").strip().lower())
+
+
+def is_same_item(first: str, second: str) -> bool:
+    """Treat substrings ('cap' / 'swimming cap') and small typos ('gogles') as the same item."""
+    first = str(first).lower()
+    second = str(second).lower()
+
+    if first in second or second in first:
+        return True
+
+    return difflib.SequenceMatcher(None, first, second).ratio() >= ITEM_SIMILARITY_THRESHOLD
+
+
+class LostItemIndex:
+    """
+    Lost item reports of all users indexed by (color, location, date).
+
+    The index follows the booking store through its event listener, so it never needs
+    a scan over all users after the initial build. Item names are compared fuzzily only
+    inside the few buckets selected by the date window.
+    """
+
+    def __init__(self, store) -> None:
+        self.store = store
+        self._buckets: dict[tuple[str, str, str], list[tuple[str, dict[str, Any]]]] = {}
+        self._keys_by_date: dict[str, set[tuple[str, str, str]]] = {}
+
+        self._rebuild()
+        store.add_listener(self._on_event)
+
+    def _rebuild(self) -> None:
+        self._buckets = {}
+        self._keys_by_date = {}
+
+        for user_id, user in self.store.iter_users():
+            for record in user.get("lost_items", []):
+                self._add(user_id, record)
+
+    def _key(self, record: dict[str, Any]) -> tuple[str, str, str]:
+        return (normalize_key(record.get("item_color")), normalize_key(record.get("location")), str(record.get("date_lost")))
+
+    def _add(self, user_id: str, record: dict[str, Any]) -> None:
+        key = self._key(record)
+        self._buckets.setdefault(key, []).append((user_id, record))
+        self._keys_by_date.setdefault(key[2], set()).add(key)
+
+    def _remove(self, user_id: str, record: dict[str, Any]) -> None:
+        key = self._key(record)
+        bucket = self._buckets.get(key, [])
+
+        if (user_id, record) in bucket:
+            bucket.remove((user_id, record))
+
+        if not bucket:
+            self._buckets.pop(key, None)
+            self._keys_by_date.get(key[2], set()).discard(key)
+
+    def _on_event(self, event: dict[str, Any]) -> None:
+        if event["type"] == RESET:
+            self._rebuild()
+            return
+
+        if event.get("collection") != "lost_items":
+            return
+
+        if event["type"] == LOST_ITEM_REPORTED:
+            self._add(event["user_id"], event["record"])
+        elif event["type"] == CANCELLED:
+            self._remove(event["user_id"], event["previous"])
+
+    def _dates_in_window(self, date_from: date, date_to: date) -> list[str]:
+        days = (date_to - date_from).days
+        return [(date_from + timedelta(days=offset)).isoformat() for offset in range(max(days, 0) + 1)]
+
+    def find(self, item: str | None = None, color: str | None = None, location: str | None = None,
+             date_to: str | None = None, window_days: int = 7, user_id: str | None = None) -> list[dict[str, Any]]:
+        """
+        Return the reports lost in the window_days days up to date_to that match the given values.
+        Missing color or location act as wildcards; the date window always bounds the lookup.
+        A date_to that is not a valid YYYY-MM-DD date matches nothing.
+        """
+        end_date = parse_date(date_to) if date_to else datetime.now().date()
+
+        if end_date is None:
+            return []
+
+        start_date = end_date - timedelta(days=max(window_days - 1, 0))
+
+        color_key = normalize_key(color) if color else None
+        location_key = normalize_key(location) if location else None
+        results = []
+
+        for day in self._dates_in_window(start_date, end_date):
+            if color_key and location_key:
+                keys = [(color_key, location_key, day)]
+            else:
+                keys = [key for key in self._keys_by_date.get(day, ())
+                        if (not color_key or key[0] == color_key) and (not location_key or key[1] == location_key)]
+
+            for key in keys:
+                for owner_id, record in self._buckets.get(key, []):
+                    if user_id and owner_id != user_id:
+                        continue
+                    if item and not is_same_item(item, record.get("item", "")):
+                        continue
+
+                    results.append({"user_id": owner_id, **record})
+
+        return results
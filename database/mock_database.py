@@ -1,230 +1,22 @@
-import difflib
+from collections import Counter
 from datetime import datetime
-from copy import deepcopy
 
-# ===================
-#    STATIC DATA
-# ===================
-FACILITY_NOTES = {
-    "spa": "Reservation required",
-    "lido": "Summer season only"
-}
-OPENING_HOURS = {
-    "swimming_pool": {
-        "Mon-Fri": "06:00-22:00",
-        "Sat": "08:00-20:00",
-        "Sun": "09:00-14:00"
-    },
-    "gym": {
-        "Mon-Fri": "06:00-23:00",
-        "Sat-Sun": "08:00-20:00"
-    },
-    "spa": {
-        "Mon-Sun": "10:00-21:00"
-    },
-    "lido": {
-        "Mon-Sun": "09:00-19:00"
-    },
-    "reception": {
-        "Mon-Sun": "08:00-20:00"
-    }
-}
-
-DETAILED_OPENING_HOURS = {
-    "swimming_pool": {
-        "monday": "06:00-22:00",
-        "tuesday": "06:00-22:00",
-        "wednesday": "06:00-22:00",
-        "thursday": "06:00-22:00",
-        "friday": "06:00-22:00",
-        "saturday": "08:00-20:00",
-        "sunday": "09:00-14:00"
-    },
-    "gym": {
-        "monday": "06:00-23:00",
-        "tuesday": "06:00-23:00",
-        "wednesday": "06:00-23:00",
-        "thursday": "06:00-23:00",
-        "friday": "06:00-23:00",
-        "saturday": "08:00-20:00",
-        "sunday": "08:00-20:00"
-    },
-    "spa": {
-        "monday": "10:00-21:00",
-        "tuesday": "10:00-21:00",
-        "wednesday": "10:00-21:00",
-        "thursday": "10:00-21:00",
-        "friday": "10:00-21:00",
-        "saturday": "10:00-21:00",
-        "sunday": "10:00-21:00"
-    },
-    "lido": {
-        "monday": "09:00-19:00",
-        "tuesday": "09:00-19:00",
-        "wednesday": "09:00-19:00",
-        "thursday": "09:00-19:00",
-        "friday": "09:00-19:00",
-        "saturday": "09:00-19:00",
-        "sunday": "09:00-19:00"
-    },
-    "reception": {
-        "monday": "08:00-20:00",
-        "tuesday": "08:00-20:00",
-        "wednesday": "08:00-20:00",
-        "thursday": "08:00-20:00",
-        "friday": "08:00-20:00",
-        "saturday": "08:00-20:00",
-        "sunday": "08:00-20:00"
-    }
-}
-
-TIME_RANGES = {
-    "morning": ("06:00", "12:00"),
-    "afternoon": ("12:00", "18:00"),
-    "evening": ("18:00", "23:00")
-}
-
-PRICING = {
-    "public_swim": {
-        "day_pass": 8.50,
-        "10_entry_pass": 75.00,
-        "monthly_pass": 60.00,
-        "annual_pass": 550.00
-    },
-    "gym": {
-        "day_pass": 10.00,
-        "10_entry_pass": 90.00,
-        "monthly_pass": 45.00,
-        "annual_pass": 450.00
-    },
-    "spa": {
-        "day_pass": 25.00,
-        "10_entry_pass": 220.00
-    },
-    "course": {
-        "monthly_pass": 80.00,
-        "annual_pass": 700.00
-    },
-    "lido": {
-        "day_pass": 10.00,
-        "monthly_pass": 70.00,
-        "annual_pass": 200.00
-    }
-}
-
-DISCOUNTS = {
-    "child": 0.50,    # 50% discount
-    "student": 0.80,  # 20% discount
-    "senior": 0.70,   # 30% discount
-    "adult": 1.0      # Full price
-}
+from database.booking_store import BOOKED, CANCELLED, LOST_ITEM_REPORTED, MODIFIED, BookingStore
+from database.lost_item_index import LostItemIndex
+from database.opening_hours import parse_date, parse_time
+from database.static_data import StaticDataRegistry
+from database.stock_store import ANY_VALUE, ONE_SIZE, StockStore
+from utils.settings import BOOKING_LOG_DIR, BOOKING_SNAPSHOT_EVERY, STATIC_DATA_DIR, STATIC_DATA_WATCH_INTERVAL
 
 # ===================
 #    STATIC DATA
 # ===================
+# Facility tables (opening hours, pricing, rules, courses, shop) live in versioned data files.
+# Methods read STATIC_DATA.current once per call, so a reload never changes data mid-call.
+STATIC_DATA = StaticDataRegistry(STATIC_DATA_DIR)
 
-RULES_DB = {
-    "swimming_pool": {
-        "swimming_cap": {
-            "rule": "Mandatory in the main pool at all times.",
-            "keywords": ["cap", "hair", "head", "hat"]
-        },
-        "medical_certificate": {
-            "rule": "Required for competitive courses and annual_pass subscriptions.",
-            "keywords": ["certificate", "medical", "doctor", "health"]
-        },
-        "shower": {
-            "rule": "You must take a shower before entering the pool.",
-            "keywords": ["shower", "wash", "clean", "hygiene"]
-        },
-        "lane_etiquette": {
-            "rule": "Always swim on the right side of the lane.",
-            "keywords": ["lane", "direction", "right side", "fast", "slow"]
-        }
-    },
-    "gym": {
-        "towel": {
-            "rule": "Mandatory to use on all machines and benches.",
-            "keywords": ["towel", "cloth", "sweat", "wipe"]
-        },
-        "shoes": {
-            "rule": "Clean indoor shoes are required. No street shoes allowed.",
-            "keywords": ["shoes", "sneakers", "footwear", "indoor", "boots"]
-        },
-        "weights": {
-            "rule": "Please return all dumbbells and weights to their racks after use.",
-            "keywords": ["weights", "dumbbells", "rack", "return", "equipment"]
-        }
-    },
-    "changing_room": {
-        "padlock": {
-            "rule": "Required for lockers. Bring your own or buy one at the shop.",
-            "keywords": ["padlock", "lock", "locker", "key", "safe"]
-        },
-        "slippers": {
-            "rule": "Mandatory in the changing rooms and showers.",
-            "keywords": ["slippers", "flip flops", "shoes", "barefoot", "sandals"]
-        }
-    },
-    "spa": {
-        "swimsuit": {
-            "rule": "Swimsuits are mandatory. Nudity is not allowed.",
-            "keywords": ["swimsuit", "naked", "nudity", "bikini", "clothes"]
-        },
-        "silence": {
-            "rule": "Please maintain a quiet environment. Whispering only.",
-            "keywords": ["silence", "quiet", "noise", "talk", "speak", "loud"]
-        },
-        "age_restriction": {
-            "rule": "Children under 14 are not allowed in the spa area.",
-            "keywords": ["age", "children", "kids", "under 14", "restriction"]
-        }
-    },
-    "lido": {
-        "food": {
-            "rule": "Picnics are allowed only in designated lawn areas.",
-            "keywords": ["food", "eat", "picnic", "snack", "drink"]
-        },
-        "glass": {
-            "rule": "Glass bottles and containers are strictly forbidden.",
-            "keywords": ["glass", "bottle", "container", "shatter"]
-        }
-    }
-}
-
-COURSES_DB = {
-    "aquagym": {
-        "days": ["monday", "wednesday", "friday"],
-        "ages": ["teen", "adult"],
-        "levels": ["beginner", "intermediate", "advanced"]
-    },
-    "hydrobike": {
-        "days": ["tuesday", "thursday"],
-        "ages": ["teen", "adult"],
-        "levels": ["intermediate", "advanced"]
-    },
-    "swimming_school": {
-        "days": ["monday", "tuesday", "wednesday", "thursday", "friday"],
-        "ages": ["child", "teen", "adult"],
-        "levels": ["beginner", "intermediate", "advanced"]
-    },
-    "newborn_swimming": {
-        "days": ["saturday", "sunday"],
-        "ages": ["child"],
-        "levels": ["beginner"]
-    }
-}
-
-SHOP_INVENTORY = {
-    "goggles": {"colors": ["blue", "black", "red", "clear"], "brands": {"speedo": 15.00, "arena": 18.00}},
-    "swimsuit": {"colors": ["purple", "black", "red", "white"], "sizes": ["s", "m", "l", "xl"], "brands": {"arena": 35.00, "speedo": 40.00}},
-    "towel": {"colors": ["white", "blue"], "sizes": ["m", "l"], "brands": {"decathlon": 12.00, "arena": 15.00}},
-    "slippers": {"colors": ["blue", "black", "red"], "sizes": ["xs", "s", "m", "l", "xl"], "brands": {"adidas": 10.00, "nike": 12.00}},
-    "swimming_cap": {"colors": ["red", "blue", "black", "yellow"], "brands": {"arena": 5.00, "speedo": 6.00}},
-}
-
-# Mock user data.
-USERS_DB = {
+# Mock user data. It seeds the booking store and is never modified at runtime.
+INITIAL_USERS_DB = {
     "mario_rossi": {
         "booked_courses": [
             {
@@ -277,12 +69,38 @@ USERS_DB = {
     }
 }
 
-INITIAL_USERS_DB = deepcopy(USERS_DB)
+# Callbacks run after the static tables are reloaded, e.g. to drop cached results.
+STATIC_DATA_LISTENERS = []
+
+
+def add_static_data_listener(listener) -> None:
+    STATIC_DATA_LISTENERS.append(listener)
+
+
+def notify_static_data_reloaded() -> None:
+    for listener in STATIC_DATA_LISTENERS:
+        listener()
+
+
+STATIC_DATA.add_listener(notify_static_data_reloaded)
+
+
+def start_static_data_watcher(interval: float = STATIC_DATA_WATCH_INTERVAL) -> None:
+    """Poll the data files for changes every `interval` seconds. Called by the app, never at import."""
+    if interval > 0:
+        STATIC_DATA.start_watching(interval)
+
+
+BOOKING_STORE = BookingStore(INITIAL_USERS_DB, log_dir=BOOKING_LOG_DIR, snapshot_every=BOOKING_SNAPSHOT_EVERY)
+LOST_ITEM_INDEX = LostItemIndex(BOOKING_STORE)
+
+STOCK_STORE = StockStore(STATIC_DATA.current.shop_inventory)
+STATIC_DATA.add_listener(lambda: STOCK_STORE.sync(STATIC_DATA.current.shop_inventory))
 
 
 def reset_users_db() -> None:
-    USERS_DB.clear()
-    USERS_DB.update(deepcopy(INITIAL_USERS_DB))
+    BOOKING_STORE.reset()
+    STOCK_STORE.reset()
 
 
 class MockDatabase:
@@ -293,71 +111,50 @@ class MockDatabase:
     def __init__(self, dst):
         self.dst = dst
 
-    def _ensure_user_exists(self, user_id):
-        if user_id not in USERS_DB:
-            USERS_DB[user_id] = {
-                "booked_courses": [],
-                "booked_spa": [],
-                "lost_items": []
-            }
-        else:
-            if "booked_courses" not in USERS_DB[user_id]:
-                USERS_DB[user_id]["booked_courses"] = []
-            if "booked_spa" not in USERS_DB[user_id]:
-                USERS_DB[user_id]["booked_spa"] = []
-            if "lost_items" not in USERS_DB[user_id]:
-                USERS_DB[user_id]["lost_items"] = []
-
     def get_opening_hours(self, facility_type=None, date=None, time=None, lenient=False, **kwargs):
+        data = STATIC_DATA.current
         if lenient and not facility_type:
             facility_type = "swimming_pool"
             # Store the selected default in the dialogue state.
             self.dst.update_predicted_slots({"facility_type": facility_type})
 
         # VALIDATE values if present
-        if date:
-            try:
-                datetime.strptime(date, "%Y-%m-%d")
-            except ValueError:
-                return {
-                    "status": "INVALID_VALUE",
-                    "violating_slot": "date",
-                    "options": []
-                }
+        day = parse_date(date) if date else None
+        if date and day is None:
+            return {
+                "status": "INVALID_VALUE",
+                "violating_slot": "date",
+                "options": []
+            }
 
-        if time:
-            try:
-                datetime.strptime(time, "%H:%M")
-            except ValueError:
-                return {
-                    "status": "INVALID_VALUE",
-                    "violating_slot": "time",
-                    "options": []
-                }
+        minute = parse_time(time) if time else None
+        if time and minute is None:
+            return {
+                "status": "INVALID_VALUE",
+                "violating_slot": "time",
+                "options": []
+            }
 
         # CHECK completeness
         if not facility_type:
             return {
                 "status": "MISSING_SLOT",
                 "violating_slot": "facility_type",
-                "options": list(OPENING_HOURS.keys())
+                "options": list(data.opening_hours.keys())
             }
 
-        detailed_schedule = DETAILED_OPENING_HOURS[facility_type]
-        schedule = OPENING_HOURS[facility_type]
-        notes = FACILITY_NOTES.get(facility_type, "")
-
-        if time and not date:
+        if facility_type not in data.opening_hours:
             return {
-                "status": "INFORM",
-                "enriched_data": {
-                    "schedule": schedule,
-                    "notes": notes
-                }
+                "status": "INVALID_VALUE",
+                "violating_slot": "facility_type",
+                "options": list(data.opening_hours.keys())
             }
 
+        schedule = data.opening_hours[facility_type]
+        notes = data.facility_notes.get(facility_type, "")
+
         # ENRICH data
-        if not date and not time:
+        if not date:
             return {
                 "status": "INFORM",
                 "enriched_data": {
@@ -366,11 +163,9 @@ class MockDatabase:
                 }
             }
 
-        dt_obj = datetime.strptime(date, "%Y-%m-%d")
-        day_name = dt_obj.strftime("%A").lower()
-        day_hours = detailed_schedule.get(day_name)
+        day_hours = data.opening_hours_engine.hours_on(facility_type, day)
 
-        if date and not time:
+        if not time:
             return {
                 "status": "INFORM",
                 "enriched_data": {
@@ -379,21 +174,21 @@ class MockDatabase:
                 }
             }
 
-        open_str, close_str = day_hours.split("-")
-        open_time = datetime.strptime(open_str, "%H:%M").time()
-        close_time = datetime.strptime(close_str, "%H:%M").time()
-        check_time = datetime.strptime(time, "%H:%M").time()
-
         return {
             "status": "INFORM",
             "enriched_data": {
-                "is_open": open_time <= check_time <= close_time,
+                "is_open": data.opening_hours_engine.is_open(facility_type, day, minute),
                 "schedule": day_hours,
                 "notes": notes
             }
         }
 
-    def get_pricing(self, service_type=None, sub_type=None, user_category=None, lenient=False, **kwargs):
+    def get_pricing(self, service_type=None, sub_type=None, user_category=None, head_counts=None, lenient=False, **kwargs):
+        data = STATIC_DATA.current
+        # Group quotes price several services and people in a single call.
+        if head_counts or isinstance(service_type, list):
+            return self._get_group_quote(service_type, sub_type, user_category, head_counts, lenient)
+
         if lenient:
             updates = {}
             if service_type and not sub_type:
@@ -413,7 +208,14 @@ class MockDatabase:
 
         # VALIDATE values if present
         if service_type:
-            service_pricing = PRICING[service_type]
+            if service_type not in data.pricing:
+                return {
+                    "status": "INVALID_VALUE",
+                    "violating_slot": "service_type",
+                    "options": list(data.pricing.keys())
+                }
+
+            service_pricing = data.pricing[service_type]
             if sub_type and sub_type not in service_pricing:
                 return {
                     "status": "INVALID_VALUE",
@@ -426,10 +228,10 @@ class MockDatabase:
             return {
                 "status": "MISSING_SLOT",
                 "violating_slot": "service_type",
-                "options": list(PRICING.keys())
+                "options": list(data.pricing.keys())
             }
 
-        service_pricing = PRICING[service_type]
+        service_pricing = data.pricing[service_type]
 
         if not sub_type:
             return {
@@ -439,9 +241,7 @@ class MockDatabase:
             }
 
         if not user_category:
-            valid_categories = list(DISCOUNTS.keys())
-            if service_type in ["spa", "gym"] and "child" in valid_categories:
-                valid_categories.remove("child")    # Children cannot access gym or spa
+            valid_categories = [category for category in data.discounts if category not in data.restricted_categories.get(service_type, [])]
 
             return {
                 "status": "MISSING_SLOT",
@@ -453,22 +253,107 @@ class MockDatabase:
         return {
             "status": "INFORM",
             "enriched_data": {
-                "price": service_pricing[sub_type] * DISCOUNTS.get(user_category, 1.0)
+                "price": data.price_matrix.price(service_type, sub_type, user_category)
+            }
+        }
+
+    def _get_group_quote(self, service_type, sub_type, user_category, head_counts, lenient=False):
+        data = STATIC_DATA.current
+        services = service_type if isinstance(service_type, list) else [service_type] if service_type else []
+
+        if not head_counts and user_category:
+            head_counts = {user_category: 1}
+
+        offered_sub_types = data.price_matrix.common_sub_types(services) if services else []
+
+        if lenient and services and not sub_type and offered_sub_types:
+            sub_type = "day_pass" if "day_pass" in offered_sub_types else offered_sub_types[0]
+            # Store the selected default in the dialogue state.
+            self.dst.update_predicted_slots({"sub_type": sub_type})
+
+        # VALIDATE values if present
+        unknown_categories = [category for category in (head_counts or {}) if category not in data.discounts]
+        if unknown_categories:
+            return {
+                "status": "INVALID_VALUE",
+                "violating_slot": "head_counts",
+                "options": list(data.discounts.keys())
+            }
+
+        if services and not offered_sub_types:
+            # The requested services do not share any pass type.
+            return {
+                "status": "INVALID_VALUE",
+                "violating_slot": "service_type",
+                "options": list(data.pricing.keys())
+            }
+
+        if sub_type and services and sub_type not in offered_sub_types:
+            return {
+                "status": "INVALID_VALUE",
+                "violating_slot": "sub_type",
+                "options": offered_sub_types
+            }
+
+        # CHECK completeness
+        if not services:
+            return {
+                "status": "MISSING_SLOT",
+                "violating_slot": "service_type",
+                "options": list(data.pricing.keys())
+            }
+
+        if not sub_type:
+            return {
+                "status": "MISSING_SLOT",
+                "violating_slot": "sub_type",
+                "options": offered_sub_types
+            }
+
+        if not head_counts:
+            return {
+                "status": "MISSING_SLOT",
+                "violating_slot": "user_category",
+                "options": list(data.discounts.keys())
+            }
+
+        # ENRICH data
+        return {
+            "status": "INFORM",
+            "enriched_data": {
+                "quote": data.price_matrix.quote([(service, sub_type) for service in services], head_counts)
             }
         }
 
     def get_rules(self, topic=None, specific_inquiry=None, lenient=False, **kwargs):
+        data = STATIC_DATA.current
+        # Without a topic, the inquiry is matched against the rules of every topic.
+        if not topic and specific_inquiry:
+            matches = data.rule_matcher.match(specific_inquiry)
+
+            if matches:
+                topic = Counter(match_topic for match_topic, _, _ in matches).most_common(1)[0][0]
+                # Store the inferred topic in the dialogue state.
+                self.dst.update_predicted_slots({"topic": topic})
+
+                return {
+                    "status": "INFORM",
+                    "enriched_data": {
+                        "matched_rules": {rule_key: rule for _, rule_key, rule in matches}
+                    }
+                }
+
         if lenient and not topic:
             topic = "swimming_pool"
             # Store the selected default in the dialogue state.
             self.dst.update_predicted_slots({"topic": topic})
 
         # VALIDATE values if present
-        if topic and topic not in RULES_DB:
+        if topic and topic not in data.rules_db:
             return {
                 "status": "INVALID_VALUE",
                 "violating_slot": "topic",
-                "options": list(RULES_DB.keys())
+                "options": list(data.rules_db.keys())
             }
 
         # CHECK completeness
@@ -476,11 +361,11 @@ class MockDatabase:
             return {
                 "status": "MISSING_SLOT",
                 "violating_slot": "topic",
-                "options": list(RULES_DB.keys())
+                "options": list(data.rules_db.keys())
             }
 
         # ENRICH data
-        topic_rules = RULES_DB[topic]
+        topic_rules = data.rules_db[topic]
 
         if not specific_inquiry:
             all_rules_text = {k: v["rule"] for k, v in topic_rules.items()}
@@ -491,14 +376,7 @@ class MockDatabase:
                 }
             }
 
-        inquiry_lower = specific_inquiry.lower()
-        matched_rules = {}
-
-        for rule_key, rule_data in topic_rules.items():
-            for keyword in rule_data["keywords"]:
-                if keyword in inquiry_lower:
-                    matched_rules[rule_key] = rule_data["rule"]
-                    break
+        matched_rules = {rule_key: rule for _, rule_key, rule in data.rule_matcher.match(specific_inquiry, topic=topic)}
 
         if matched_rules:
             return {
@@ -517,10 +395,18 @@ class MockDatabase:
             }
 
     def get_book_course(self, course_activity=None, target_age=None, level=None, day_preference=None, user=None, confirmation=None, **kwargs):
+        data = STATIC_DATA.current
         user = user or {}
         # VALIDATE values if present
         if course_activity:
-            course_rules = COURSES_DB[course_activity]
+            if course_activity not in data.courses_db:
+                return {
+                    "status": "INVALID_VALUE",
+                    "violating_slot": "course_activity",
+                    "options": list(data.courses_db.keys())
+                }
+
+            course_rules = data.courses_db[course_activity]
 
             if target_age and target_age not in course_rules["ages"]:
                 return {
@@ -546,27 +432,16 @@ class MockDatabase:
         # CHECK completeness
         if not course_activity:
             # Suggest only courses that match the provided filters (if any)
-            valid_courses = []
-
-            for course_name, rules in COURSES_DB.items():
-                if target_age and target_age not in rules["ages"]:
-                    continue
-                if level and level not in rules["levels"]:
-                    continue
-                if day_preference and day_preference not in rules["days"]:
-                    continue
-
-                # If we are here (constraints are met or None), the course is valid for all provided filters
-                valid_courses.append(course_name)
+            valid_courses = data.course_index.compatible_courses(target_age, level, day_preference)
 
             # Edge Case: User provided impossible combination of filters
-            # (es. advance newborn course)
-            # TODO there is no opt, but the return doesn't not specify what's wrong (it's result difficult for the DM understand thatsome filter must be removed)
+            # (es. advance newborn course). Report only the filter that has to change.
             if not valid_courses:
+                violating_slot, options = data.course_index.find_blocking_filter(target_age, level, day_preference)
                 return {
                     "status": "INVALID_VALUE",
-                    "violating_slot": "target_age, level, day_preference",
-                    "options": list(COURSES_DB.keys()),
+                    "violating_slot": violating_slot,
+                    "options": options,
                 }
 
             return {
@@ -575,7 +450,7 @@ class MockDatabase:
                 "options": valid_courses
             }
 
-        course_rules = COURSES_DB[course_activity]
+        course_rules = data.courses_db[course_activity]
 
         if not target_age:
             return {
@@ -622,8 +497,8 @@ class MockDatabase:
         # VALIDATE overlaps
         user_id = f"{user.get('name')}_{user.get('surname')}".lower()
 
-        if user_id in USERS_DB:
-            user_bookings = USERS_DB[user_id].get("booked_courses", [])
+        if BOOKING_STORE.has_user(user_id):
+            user_bookings = BOOKING_STORE.get_collection(user_id, "booked_courses")
 
             for booking in user_bookings:
                 if booking["course_activity"] == course_activity:
@@ -668,9 +543,8 @@ class MockDatabase:
             }
 
         user_id = f"{user.get('name')}_{user.get('surname')}".lower()
-        self._ensure_user_exists(user_id)
 
-        USERS_DB[user_id]["booked_courses"].append({
+        BOOKING_STORE.record_event(BOOKED, user_id, "booked_courses", record={
             "course_activity": course_activity,
             "target_age": target_age,
             "level": level,
@@ -750,8 +624,8 @@ class MockDatabase:
         # VALIDATE overlaps
         user_id = f"{user_data.get('name')}_{user_data.get('surname')}".lower()
 
-        if user_id in USERS_DB:
-            user_spa_bookings = USERS_DB[user_id].get("booked_spa", [])
+        if BOOKING_STORE.has_user(user_id):
+            user_spa_bookings = BOOKING_STORE.get_collection(user_id, "booked_spa")
 
             for booking in user_spa_bookings:
                 if booking["date"] == date:
@@ -777,9 +651,8 @@ class MockDatabase:
             }
 
         user_id = f"{user_data.get('name')}_{user_data.get('surname')}".lower()
-        self._ensure_user_exists(user_id)
 
-        USERS_DB[user_id]["booked_spa"].append({
+        BOOKING_STORE.record_event(BOOKED, user_id, "booked_spa", record={
             "date": date,
             "time": time,
             "people_count": int(people_count)
@@ -791,6 +664,7 @@ class MockDatabase:
                                  course_activity_old=None, target_age_old=None, level_old=None, day_preference_old=None,
                                  course_activity_new=None, target_age_new=None, level_new=None, day_preference_new=None,
                                  user=None, confirmation=None, **kwargs):
+        data = STATIC_DATA.current
 
         user_data = user or {}
 
@@ -803,7 +677,7 @@ class MockDatabase:
             return {"status": "MISSING_SLOT", "violating_slot": "surname", "options": []}
         user_id = f"{user_data.get('name')}_{user_data.get('surname')}".lower()
 
-        if user_id not in USERS_DB:
+        if not BOOKING_STORE.has_user(user_id):
             return {
                 "status": "INVALID_VALUE",
                 "violating_slot": "name_surname",
@@ -811,7 +685,7 @@ class MockDatabase:
             }
 
         # Step 2: find the matching existing booking.
-        user_bookings = USERS_DB.get(user_id, {}).get("booked_courses", [])
+        user_bookings = BOOKING_STORE.get_collection(user_id, "booked_courses")
 
         if not user_bookings:
             # The user exists but has no previous course bookings.
@@ -865,7 +739,8 @@ class MockDatabase:
         target_age_old = old_booking["target_age"]
         level_old = old_booking["level"]
         day_preference_old = old_booking["day_preference"]
-        course_rules_old = COURSES_DB[course_activity_old]
+        # The booked course may no longer be offered after a data reload.
+        course_rules_old = data.courses_db.get(course_activity_old, {"days": []})
 
         self.dst.update_predicted_slots({
             "course_activity_old": course_activity_old,
@@ -890,7 +765,10 @@ class MockDatabase:
         eval_day = day_preference_new or day_preference_old
 
         # Step 4: validate the updated course booking.
-        new_course_rules = COURSES_DB[eval_course]
+        if eval_course not in data.courses_db:
+            return {"status": "INVALID_VALUE", "violating_slot": "course_activity_new", "options": list(data.courses_db.keys())}
+
+        new_course_rules = data.courses_db[eval_course]
 
         if eval_age not in new_course_rules["ages"]:
             return {"status": "INVALID_VALUE", "violating_slot": "target_age_new", "options": new_course_rules["ages"]}
@@ -991,25 +869,12 @@ class MockDatabase:
             }
 
         # Apply the confirmed change to the mock database.
-        user_id = f"{user_data.get('name')}_{user_data.get('surname')}".lower()
-        user_courses = USERS_DB.get(user_id, {}).get("booked_courses", [])
-
-        for i, booking in enumerate(user_courses):
-            if (booking["course_activity"] == course_activity_old and
-                booking["target_age"] == target_age_old and
-                booking["level"] == level_old and
-                    booking["day_preference"] == day_preference_old):
-
-                # Remove the old booking.
-                user_courses.pop(i)
-                # Add the updated booking.
-                user_courses.append({
-                    "course_activity": eval_course,
-                    "target_age": eval_age,
-                    "level": eval_level,
-                    "day_preference": eval_day
-                })
-                break
+        BOOKING_STORE.record_event(MODIFIED, user_id, "booked_courses", previous=old_booking, record={
+            "course_activity": eval_course,
+            "target_age": eval_age,
+            "level": eval_level,
+            "day_preference": eval_day
+        })
 
         return {"status": "CONFIRMED"}
 
@@ -1027,7 +892,7 @@ class MockDatabase:
             return {"status": "MISSING_SLOT", "violating_slot": "surname", "options": []}
         user_id = f"{user_data.get('name')}_{user_data.get('surname')}".lower()
 
-        if user_id not in USERS_DB:
+        if not BOOKING_STORE.has_user(user_id):
             return {
                 "status": "INVALID_VALUE",
                 "violating_slot": "name",
@@ -1035,7 +900,7 @@ class MockDatabase:
             }
 
         # Step 2: find the matching existing booking.
-        user_bookings = USERS_DB.get(user_id, {}).get("booked_spa", [])
+        user_bookings = BOOKING_STORE.get_collection(user_id, "booked_spa")
 
         if not user_bookings:
             return {
@@ -1202,23 +1067,11 @@ class MockDatabase:
             }
 
         # Apply the confirmed change to the mock database.
-        user_id = f"{user_data.get('name')}_{user_data.get('surname')}".lower()
-        user_spas = USERS_DB.get(user_id, {}).get("booked_spa", [])
-
-        for i, booking in enumerate(user_spas):
-            if (booking["date"] == date_old and
-                booking["time"] == time_old and
-                    str(booking["people_count"]) == str(people_count_old)):
-
-                # Remove the old booking.
-                user_spas.pop(i)
-                # Add the updated booking.
-                user_spas.append({
-                    "date": eval_date,
-                    "time": eval_time,
-                    "people_count": int(eval_count)
-                })
-                break
+        BOOKING_STORE.record_event(MODIFIED, user_id, "booked_spa", previous=old_booking, record={
+            "date": eval_date,
+            "time": eval_time,
+            "people_count": int(eval_count)
+        })
 
         return {"status": "CONFIRMED"}
 
@@ -1235,7 +1088,7 @@ class MockDatabase:
 
         user_id = f"{user_data.get('name')}_{user_data.get('surname')}".lower()
 
-        if user_id not in USERS_DB:
+        if not BOOKING_STORE.has_user(user_id):
             return {
                 "status": "INVALID_VALUE",
                 "violating_slot": "name_surname",
@@ -1243,7 +1096,7 @@ class MockDatabase:
             }
 
         # Step 2: find the matching existing booking.
-        user_bookings = USERS_DB.get(user_id, {}).get("booked_courses", [])
+        user_bookings = BOOKING_STORE.get_collection(user_id, "booked_courses")
 
         if not user_bookings:
             return {
@@ -1321,14 +1174,7 @@ class MockDatabase:
             }
 
         # Step 4: remove the booking from the mock database.
-        for i, booking in enumerate(user_bookings):
-            if (booking["course_activity"] == matched_booking["course_activity"] and
-                booking["target_age"] == matched_booking["target_age"] and
-                booking["level"] == matched_booking["level"] and
-                    booking["day_preference"] == matched_booking["day_preference"]):
-
-                user_bookings.pop(i)
-                break
+        BOOKING_STORE.record_event(CANCELLED, user_id, "booked_courses", previous=matched_booking)
 
         # CONFIRMED tells the DM that the cancellation was completed.
         return {"status": "CONFIRMED"}
@@ -1346,7 +1192,7 @@ class MockDatabase:
 
         user_id = f"{user_data.get('name')}_{user_data.get('surname')}".lower()
 
-        if user_id not in USERS_DB:
+        if not BOOKING_STORE.has_user(user_id):
             return {
                 "status": "INVALID_VALUE",
                 "violating_slot": "name_surname",
@@ -1354,7 +1200,7 @@ class MockDatabase:
             }
 
         # Step 2: find the matching existing booking.
-        user_spas = USERS_DB.get(user_id, {}).get("booked_spa", [])
+        user_spas = BOOKING_STORE.get_collection(user_id, "booked_spa")
 
         if not user_spas:
             return {
@@ -1422,22 +1268,35 @@ class MockDatabase:
             }
 
         # Step 4: remove the booking from the mock database.
-        for i, booking in enumerate(user_spas):
-            if (booking["date"] == matched_booking["date"] and
-                booking["time"] == matched_booking["time"] and
-                    str(booking["people_count"]) == str(matched_booking["people_count"])):
-
-                user_spas.pop(i)
-                break
+        BOOKING_STORE.record_event(CANCELLED, user_id, "booked_spa", previous=matched_booking)
 
         return {"status": "CONFIRMED"}
 
-    def get_buy_equipment(self, item=None, color=None, size=None, brand=None, confirmation=None, **kwargs):
+    def _out_of_stock(self, item, color, size, brand):
+        violating_slot, options = STOCK_STORE.find_blocking_slot(item, color, size, brand) or ("color", [])
+        return {
+            "status": "INVALID_VALUE",
+            "violating_slot": violating_slot,
+            "options": options,
+            "enriched_data": {
+                "out_of_stock": True
+            }
+        }
+
+    def get_buy_equipment(self, item=None, color=None, size=None, brand=None, confirmation=None, reservation_id=None, **kwargs):
+        data = STATIC_DATA.current
         # VALIDATE values if present
         if item:
-            item_data = SHOP_INVENTORY[item]
+            if item not in data.shop_inventory:
+                return {
+                    "status": "INVALID_VALUE",
+                    "violating_slot": "item",
+                    "options": STOCK_STORE.in_stock_items()
+                }
+
+            item_data = data.shop_inventory[item]
 
-            if color and color != "(any)" and color not in item_data["colors"]:
+            if color and color != ANY_VALUE and color not in item_data["colors"]:
                 return {
                     "status": "INVALID_VALUE",
                     "violating_slot": "color",
@@ -1452,7 +1311,8 @@ class MockDatabase:
                         "options": item_data["sizes"]
                     }
             else:
-                if size:
+                # ONE_SIZE is predicted by this method for items without sizes.
+                if size and size != ONE_SIZE:
                     return {
                         "status": "INVALID_VALUE",
                         "violating_slot": "size",
@@ -1469,50 +1329,81 @@ class MockDatabase:
                     }
                 }
 
+            # VALIDATE stock: report the single value to change when nothing matching is in stock.
+            blocking = STOCK_STORE.find_blocking_slot(item, color, size, brand, reservation_id=reservation_id)
+
+            if blocking:
+                STOCK_STORE.release(reservation_id)
+                violating_slot, options = blocking
+                return {
+                    "status": "INVALID_VALUE",
+                    "violating_slot": violating_slot,
+                    "options": options,
+                    "enriched_data": {
+                        "out_of_stock": True
+                    }
+                }
+
         # CHECK completeness
         if not item:
             return {
                 "status": "MISSING_SLOT",
                 "violating_slot": "item",
-                "options": list(SHOP_INVENTORY.keys())
+                "options": STOCK_STORE.in_stock_items()
             }
 
-        item_data = SHOP_INVENTORY[item]
+        item_data = data.shop_inventory[item]
 
         if not color:
             return {
                 "status": "MISSING_SLOT",
                 "violating_slot": "color",
-                "options": item_data["colors"]
+                "options": STOCK_STORE.available_values(item, "color", size=size, brand=brand, reservation_id=reservation_id)
             }
 
         if "sizes" in item_data and not size:
             return {
                 "status": "MISSING_SLOT",
                 "violating_slot": "size",
-                "options": item_data["sizes"]
+                "options": STOCK_STORE.available_values(item, "size", color=color, brand=brand, reservation_id=reservation_id)
             }
 
-        if not brand and len(item_data["brands"]) > 1:
+        available_brands = STOCK_STORE.available_values(item, "brand", color=color, size=size, reservation_id=reservation_id)
+
+        if not brand and len(available_brands) > 1:
             return {
                 "status": "MISSING_SLOT",
                 "violating_slot": "brand",
-                "options": list(item_data["brands"].keys()),
+                "options": available_brands,
                 "enriched_data": {
-                    "brand_prices": item_data["brands"]
+                    "brand_prices": {name: item_data["brands"][name] for name in available_brands}
                 }
             }
 
-        # VALIDATE overlaps
-        final_brand = brand or list(item_data["brands"].keys())[0]
+        if confirmation == "deny":
+            STOCK_STORE.release(reservation_id)
+            return {
+                "status": "ABORTED"
+            }
+
+        # Pick the variant and hold one unit in a single locked step, so a unit sold by another
+        # session since the checks above is reported as out of stock. The hold follows later
+        # changes of the variant while the user confirms.
+        final_size = size if "sizes" in item_data else ONE_SIZE
+        held = STOCK_STORE.hold(item, color, final_size, brand, reservation_id=reservation_id)
+
+        if held is None:
+            return self._out_of_stock(item, color, final_size, brand)
+
+        held_reservation_id, (_, final_color, final_size, final_brand) = held
         price = item_data["brands"][final_brand]
-        final_size = size if "sizes" in item_data else "one_size"
 
         full_slots_to_save = {
             "item": item,
-            "color": color,
+            "color": final_color,
             "size": final_size,
-            "brand": final_brand
+            "brand": final_brand,
+            "reservation_id": held_reservation_id
         }
         self.dst.update_predicted_slots(full_slots_to_save)
 
@@ -1526,10 +1417,9 @@ class MockDatabase:
                 }
             }
 
-        if confirmation == "deny":
-            return {
-                "status": "ABORTED"
-            }
+        if not STOCK_STORE.commit(held_reservation_id):
+            # The hold was dropped in the meantime, e.g. by a stock reset.
+            return self._out_of_stock(item, final_color, final_size, final_brand)
 
         return {
             "status": "CONFIRMED",
@@ -1551,20 +1441,21 @@ class MockDatabase:
         user_id = f"{user_data.get('name')}_{user_data.get('surname')}".lower()
 
         if last_seen_date:
-            try:
-                date_obj = datetime.strptime(last_seen_date, "%Y-%m-%d")
-                if date_obj.date() > datetime.now().date():
-                    return {
-                        "status": "INVALID_VALUE",
-                        "violating_slot": "last_seen_date",
-                        "options": ["today or earlier"]
-                    }
-            except ValueError:
+            # Parsed like the index parses it, so a stored report can always be found again.
+            seen_day = parse_date(last_seen_date)
+
+            if seen_day is None:
                 return {
                     "status": "INVALID_VALUE",
                     "violating_slot": "last_seen_date",
                     "options": []
                 }
+            if seen_day > datetime.now().date():
+                return {
+                    "status": "INVALID_VALUE",
+                    "violating_slot": "last_seen_date",
+                    "options": ["today or earlier"]
+                }
 
         if not lost_item:
             return {"status": "MISSING_SLOT", "violating_slot": "lost_item", "options": []}
@@ -1575,31 +1466,19 @@ class MockDatabase:
         if not last_seen_date:
             return {"status": "MISSING_SLOT", "violating_slot": "last_seen_date", "options": []}
 
-        user_lost_items = USERS_DB.get(user_id, {}).get("lost_items", [])
-
-        for lost in user_lost_items:
-            db_item = str(lost.get("item", "")).lower()
-            current_item = str(lost_item).lower()
-
-            is_substring = (current_item in db_item) or (db_item in current_item)
-            similarity = difflib.SequenceMatcher(None, current_item, db_item).ratio()
-            is_typo = similarity >= 0.75
+        # The same user already reported this item (fuzzy name, same color, place and day).
+        duplicates = LOST_ITEM_INDEX.find(lost_item, item_color, last_seen_location,
+                                          date_to=last_seen_date, window_days=1, user_id=user_id)
 
-            if ((is_substring or is_typo) and
-                lost.get("item_color") == item_color and
-                lost.get("location") == last_seen_location and
-                    lost.get("date_lost") == last_seen_date):
-
-                return {
-                    "status": "OVERLAP",
-                    "violating_slot": "lost_item",
-                    "options": [],
-                    "blacklist": [lost_item]
-                }
-
-        self._ensure_user_exists(user_id)
+        if duplicates:
+            return {
+                "status": "OVERLAP",
+                "violating_slot": "lost_item",
+                "options": [],
+                "blacklist": [lost_item]
+            }
 
-        USERS_DB[user_id]["lost_items"].append({
+        BOOKING_STORE.record_event(LOST_ITEM_REPORTED, user_id, "lost_items", record={
             "item": lost_item,
             "item_color": item_color,
             "location": last_seen_location,
@@ -1608,6 +1487,18 @@ class MockDatabase:
 
         return {"status": "CONFIRMED"}
 
+    def find_lost_item_reports(self, item=None, color=None, location=None, date_to=None, window_days=7, **kwargs):
+        """Staff lookup: reports from any user that match a found item, e.g. a red towel near the changing room this week."""
+        if date_to and parse_date(date_to) is None:
+            return {"status": "INVALID_VALUE", "violating_slot": "date_to", "options": []}
+
+        return {
+            "status": "INFORM",
+            "enriched_data": {
+                "reports": LOST_ITEM_INDEX.find(item, color, location, date_to=date_to, window_days=window_days)
+            }
+        }
+
     def get_user_identification(self, name=None, surname=None, **kwargs):
         if name or surname:
             return {"status": "CONFIRMED"}
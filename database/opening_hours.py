@@ -0,0 +1,188 @@
+import re
+from bisect import bisect_right
+from datetime import date, timedelta
+
+
+DAY_ABBREVIATIONS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+DAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MINUTES_PER_DAY = 24 * 60
+
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+TIME_PATTERN = re.compile(r"^(\d{1,2}):(\d{2})$")
+
+# Returned by the exception layer when the weekly schedule applies unchanged.
+NO_EXCEPTION = object()
+
+
+def parse_date(value: str) -> date | None:
+    """Parse a YYYY-MM-DD date, returning None when it is not valid."""
+    if not isinstance(value, str) or not DATE_PATTERN.match(value):
+        return None
+
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def parse_time(value: str) -> int | None:
+    """Parse an HH:MM time into minutes after midnight, returning None when it is not valid."""
+    match = TIME_PATTERN.match(value) if isinstance(value, str) else None
+
+    if not match:
+        return None
+
+    hours, minutes = int(match.group(1)), int(match.group(2))
+
+    if hours > 23 or minutes > 59:
+        return None
+
+    return hours * 60 + minutes
+
+
+def format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _parse_day_range(day_range: str) -> list[int]:
+    first, _, last = day_range.partition("-")
+    start = DAY_ABBREVIATIONS.index(first)
+    end = DAY_ABBREVIATIONS.index(last) if last else start
+    return list(range(start, end + 1))
+
+
+def _parse_hours(hours: str) -> tuple[int, int]:
+    open_str, close_str = hours.split("-")
+    return parse_time(open_str), parse_time(close_str)
+
+
+class OpeningHoursEngine:
+    """
+    Weekly facility schedules compiled once into sorted minute-of-week intervals.
+
+    Date exceptions (holidays, seasonal facilities) are an optional layer checked with
+    two dictionary lookups, so dates without exceptions only pay for the weekly lookup.
+    """
+
+    def __init__(self, schedules: dict[str, dict[str, str]], exceptions: dict[str, dict[str, str | None]] | None = None,
+                 seasons: dict[str, tuple[str, str]] | None = None) -> None:
+        self.exceptions = exceptions or {}
+        self.seasons = seasons or {}
+        self.daily_hours: dict[str, list[tuple[int, int] | None]] = {}
+        self.intervals: dict[str, list[tuple[int, int]]] = {}
+
+        for facility, facility_schedule in schedules.items():
+            daily = [None] * 7
+
+            for day_range, hours in facility_schedule.items():
+                for day_index in _parse_day_range(day_range):
+                    daily[day_index] = _parse_hours(hours)
+
+            self.daily_hours[facility] = daily
+            self.intervals[facility] = [
+                (day_index * MINUTES_PER_DAY + hours[0], day_index * MINUTES_PER_DAY + hours[1])
+                for day_index, hours in enumerate(daily) if hours
+            ]
+
+        self._interval_starts = {facility: [start for start, _ in intervals] for facility, intervals in self.intervals.items()}
+
+    # ===================
+    #    DERIVED VIEWS
+    # ===================
+    def facilities(self) -> list[str]:
+        return list(self.daily_hours.keys())
+
+    def _format_hours(self, hours: tuple[int, int] | None) -> str | None:
+        if hours is None:
+            return None
+        return f"{format_minutes(hours[0])}-{format_minutes(hours[1])}"
+
+    def summary(self) -> dict[str, dict[str, str]]:
+        """Group consecutive days with the same hours, e.g. {'Mon-Fri': '06:00-22:00', 'Sat': ...}."""
+        summary = {}
+
+        for facility, daily in self.daily_hours.items():
+            facility_summary = {}
+            start = 0
+
+            while start < 7:
+                end = start
+                while end + 1 < 7 and daily[end + 1] == daily[start]:
+                    end += 1
+
+                if daily[start] is not None:
+                    label = DAY_ABBREVIATIONS[start] if start == end else f"{DAY_ABBREVIATIONS[start]}-{DAY_ABBREVIATIONS[end]}"
+                    facility_summary[label] = self._format_hours(daily[start])
+
+                start = end + 1
+
+            summary[facility] = facility_summary
+
+        return summary
+
+    def detailed(self) -> dict[str, dict[str, str]]:
+        """Return the hours of every weekday, e.g. {'monday': '06:00-22:00', ...}."""
+        return {
+            facility: {DAY_NAMES[index]: self._format_hours(hours) for index, hours in enumerate(daily) if hours}
+            for facility, daily in self.daily_hours.items()
+        }
+
+    # ===================
+    #    QUERIES
+    # ===================
+    def _exception_hours(self, facility: str, day: date):
+        """Return the hours set by a date exception, None when closed, or NO_EXCEPTION."""
+        if self.exceptions:
+            day_exceptions = self.exceptions.get(day.isoformat())
+
+            if day_exceptions is not None:
+                for key in (facility, "*"):
+                    if key in day_exceptions:
+                        return _parse_hours(day_exceptions[key]) if day_exceptions[key] else None
+
+        if facility in self.seasons:
+            season_start, season_end = self.seasons[facility]
+            if not season_start <= day.strftime("%m-%d") <= season_end:
+                return None
+
+        return NO_EXCEPTION
+
+    def _hours_on(self, facility: str, day: date) -> tuple[int, int] | None:
+        hours = self._exception_hours(facility, day)
+        return self.daily_hours[facility][day.weekday()] if hours is NO_EXCEPTION else hours
+
+    def hours_on(self, facility: str, day: date) -> str:
+        """Return the opening hours of one date as 'HH:MM-HH:MM', or 'closed'."""
+        return self._format_hours(self._hours_on(facility, day)) or "closed"
+
+    def is_open(self, facility: str, day: date, minute: int) -> bool:
+        hours = self._exception_hours(facility, day)
+
+        if hours is NO_EXCEPTION:
+            return self.is_open_weekly(facility, day.weekday() * MINUTES_PER_DAY + minute)
+
+        return hours is not None and hours[0] <= minute <= hours[1]
+
+    def is_open_weekly(self, facility: str, minute_of_week: int) -> bool:
+        """Weekly-schedule lookup that ignores date exceptions."""
+        index = bisect_right(self._interval_starts[facility], minute_of_week) - 1
+        return index >= 0 and minute_of_week <= self.intervals[facility][index][1]
+
+    def next_opening(self, facility: str, day: date, minute: int, max_days: int = 14) -> tuple[date, int] | None:
+        """Return the (date, minute) when the facility is next open at or after the given moment."""
+        for offset in range(max_days + 1):
+            current_day = day + timedelta(days=offset)
+            hours = self._hours_on(facility, current_day)
+
+            if hours is None:
+                continue
+
+            if offset == 0 and minute > hours[1]:
+                continue
+
+            return current_day, (max(hours[0], minute) if offset == 0 else hours[0])
+
+        return None
+
+    def open_facilities(self, day: date, minute: int) -> list[str]:
+        return [facility for facility in self.daily_hours if self.is_open(facility, day, minute)]
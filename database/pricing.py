@@ -0,0 +1,117 @@
+from typing import Any
+
+import numpy as np
+
+
+class PriceMatrix:
+    """
+    PRICING x DISCOUNTS compiled into one dense (service, sub_type, user_category) price array.
+
+    A group quote is a single fancy-indexing operation over the matrix, whatever the number
+    of services and people involved.
+    """
+
+    def __init__(self, pricing: dict[str, dict[str, float]], discounts: dict[str, float],
+                 restricted_categories: dict[str, list[str]] | None = None) -> None:
+        self.services = list(pricing.keys())
+        self.sub_types = []
+        self.categories = list(discounts.keys())
+
+        for service_pricing in pricing.values():
+            for sub_type in service_pricing:
+                if sub_type not in self.sub_types:
+                    self.sub_types.append(sub_type)
+
+        self._service_index = {name: index for index, name in enumerate(self.services)}
+        self._sub_type_index = {name: index for index, name in enumerate(self.sub_types)}
+        self._category_index = {name: index for index, name in enumerate(self.categories)}
+
+        base_prices = np.full((len(self.services), len(self.sub_types)), np.nan)
+
+        for service, service_pricing in pricing.items():
+            for sub_type, price in service_pricing.items():
+                base_prices[self._service_index[service], self._sub_type_index[sub_type]] = price
+
+        self.base_prices = base_prices
+        discount_factors = np.array([discounts[category] for category in self.categories])
+        self.prices = base_prices[:, :, np.newaxis] * discount_factors
+
+        # Combinations that have a price but cannot be sold, e.g. gym passes for children.
+        self.allowed = ~np.isnan(self.prices)
+        for service, categories in (restricted_categories or {}).items():
+            for category in categories:
+                self.allowed[self._service_index[service], :, self._category_index[category]] = False
+
+    def price(self, service_type: str, sub_type: str, user_category: str) -> float | None:
+        """Return the unit price of one pass, or None if the service does not offer it."""
+        service_index = self._service_index.get(service_type)
+        sub_type_index = self._sub_type_index.get(sub_type)
+
+        if service_index is None or sub_type_index is None:
+            return None
+
+        category_index = self._category_index.get(user_category)
+
+        if category_index is None:
+            value = self.base_prices[service_index, sub_type_index]
+        else:
+            value = self.prices[service_index, sub_type_index, category_index]
+
+        return None if np.isnan(value) else float(value)
+
+    def common_sub_types(self, services: list[str]) -> list[str]:
+        """Return the sub types offered by every given service."""
+        if any(service not in self._service_index for service in services):
+            return []
+
+        rows = self.base_prices[[self._service_index[service] for service in services]]
+        offered = ~np.isnan(rows).any(axis=0)
+        return [sub_type for sub_type, is_offered in zip(self.sub_types, offered) if is_offered]
+
+    def quote(self, items: list[tuple[str, str]], head_counts: dict[str, int]) -> dict[str, Any]:
+        """
+        Price every (service_type, sub_type) item for every user category head count.
+        Returns an itemized breakdown, the total, and the combinations that cannot be sold.
+        Services and sub types missing from the tables (e.g. after a reload) cannot be sold.
+        """
+        service_indexes = np.array([self._service_index.get(service, -1) for service, _ in items])
+        sub_type_indexes = np.array([self._sub_type_index.get(sub_type, -1) for _, sub_type in items])
+
+        counts = np.zeros(len(self.categories))
+        for category, count in head_counts.items():
+            counts[self._category_index[category]] = count
+
+        known = (service_indexes >= 0) & (sub_type_indexes >= 0)
+        safe_services = np.where(known, service_indexes, 0)
+        safe_sub_types = np.where(known, sub_type_indexes, 0)
+        unit_prices = self.prices[safe_services, safe_sub_types, :]
+        requested = (counts > 0) & known[:, np.newaxis]
+        sellable = requested & self.allowed[safe_services, safe_sub_types, :]
+        subtotals = np.where(sellable, unit_prices * counts, 0.0)
+
+        lines = [
+            {
+                "service_type": items[item][0],
+                "sub_type": items[item][1],
+                "user_category": self.categories[category],
+                "quantity": int(counts[category]),
+                "unit_price": round(float(unit_prices[item, category]), 2),
+                "subtotal": round(float(subtotals[item, category]), 2),
+            }
+            for item, category in zip(*np.nonzero(sellable))
+        ]
+
+        unavailable = [
+            {
+                "service_type": items[item][0],
+                "sub_type": items[item][1],
+                "user_category": self.categories[category],
+            }
+            for item, category in zip(*np.nonzero((counts > 0) & ~sellable))
+        ]
+
+        return {
+            "lines": lines,
+            "total": round(float(subtotals.sum()), 2),
+            "unavailable": unavailable,
+        }
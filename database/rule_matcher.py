@@ -0,0 +1,102 @@
+import re
+from collections import deque
+from typing import Any
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def stem_token(token: str) -> str:
+    """Reduce simple English plurals so that 'towels' matches 'towel' and 'glasses' matches 'glass'."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("sses", "ches", "shes", "xes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    return [stem_token(token) for token in TOKEN_PATTERN.findall(str(text).lower())]
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over word tokens, compiled once from all RULES_DB keywords.
+
+    Matching works on whole (stemmed) words, so 'cap' does not match inside 'capacity',
+    and multi-word keywords such as 'flip flops' match as phrases. One pass over the
+    inquiry finds every keyword of every topic.
+    """
+
+    def __init__(self, rules_db: dict[str, dict[str, dict[str, Any]]]) -> None:
+        self.rules: list[tuple[str, str, str]] = []
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[list[int]] = [[]]
+
+        for topic, topic_rules in rules_db.items():
+            for rule_key, rule_data in topic_rules.items():
+                rule_index = len(self.rules)
+                self.rules.append((topic, rule_key, rule_data["rule"]))
+
+                for keyword in rule_data.get("keywords", []):
+                    self._add_pattern(tokenize(keyword), rule_index)
+
+        self._build_failure_links()
+
+    def _add_pattern(self, tokens: list[str], rule_index: int) -> None:
+        if not tokens:
+            return
+
+        state = 0
+
+        for token in tokens:
+            next_state = self._goto[state].get(token)
+
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][token] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+
+            state = next_state
+
+        if rule_index not in self._output[state]:
+            self._output[state].append(rule_index)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+
+                target = self._goto[fallback].get(token, 0)
+                self._fail[next_state] = target if target != next_state else 0
+
+                for rule_index in self._output[self._fail[next_state]]:
+                    if rule_index not in self._output[next_state]:
+                        self._output[next_state].append(rule_index)
+
+    def match(self, text: str, topic: str | None = None) -> list[tuple[str, str, str]]:
+        """Return the (topic, rule_key, rule) entries whose keywords occur in the text, in RULES_DB order."""
+        state = 0
+        matched: set[int] = set()
+
+        for token in tokenize(text):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+
+            state = self._goto[state].get(token, 0)
+            matched.update(self._output[state])
+
+        return [self.rules[index] for index in sorted(matched) if topic is None or self.rules[index][0] == topic]
@@ -0,0 +1,317 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+import jsonschema
+
+from database.course_index import CourseIndex
+from database.opening_hours import OpeningHoursEngine
+from database.pricing import PriceMatrix
+from database.rule_matcher import KeywordMatcher
+
+
+logger = logging.getLogger(__name__)
+
+DATA_FILE_EXTENSIONS = (".json", ".yaml", ".yml")
+
+HOURS_PATTERN = r"^\d{2}:\d{2}-\d{2}:\d{2}$"
+
+# ===================
+#    SCHEMAS
+# ===================
+OPENING_HOURS_SCHEMA = {
+    "type": "object",
+    "required": ["version", "weekly"],
+    "properties": {
+        "version": {"type": "string"},
+        "facility_notes": {"type": "object", "additionalProperties": {"type": "string"}},
+        "weekly": {
+            "type": "object",
+            "minProperties": 1,
+            "additionalProperties": {
+                "type": "object",
+                "propertyNames": {"pattern": r"^(Mon|Tue|Wed|Thu|Fri|Sat|Sun)(-(Mon|Tue|Wed|Thu|Fri|Sat|Sun))?$"},
+                "additionalProperties": {"type": "string", "pattern": HOURS_PATTERN},
+            },
+        },
+        # e.g. {"2026-12-25": {"*": null, "reception": "09:00-12:00"}}, where null means closed.
+        "date_exceptions": {
+            "type": "object",
+            "propertyNames": {"pattern": r"^\d{4}-\d{2}-\d{2}$"},
+            "additionalProperties": {
+                "type": "object",
+                "additionalProperties": {"type": ["string", "null"], "pattern": HOURS_PATTERN},
+            },
+        },
+        # Facilities open only between two month-day dates, e.g. {"lido": ["06-01", "09-15"]}.
+        "seasonal_openings": {
+            "type": "object",
+            "additionalProperties": {
+                "type": "array",
+                "items": {"type": "string", "pattern": r"^\d{2}-\d{2}$"},
+                "minItems": 2,
+                "maxItems": 2,
+            },
+        },
+        "time_ranges": {
+            "type": "object",
+            "additionalProperties": {"type": "array", "items": {"type": "string"}, "minItems": 2, "maxItems": 2},
+        },
+    },
+}
+
+PRICING_SCHEMA = {
+    "type": "object",
+    "required": ["version", "pricing", "discounts"],
+    "properties": {
+        "version": {"type": "string"},
+        "pricing": {
+            "type": "object",
+            "minProperties": 1,
+            "additionalProperties": {
+                "type": "object",
+                "minProperties": 1,
+                "additionalProperties": {"type": "number", "minimum": 0},
+            },
+        },
+        "discounts": {"type": "object", "minProperties": 1, "additionalProperties": {"type": "number", "minimum": 0}},
+        "restricted_categories": {"type": "object", "additionalProperties": {"type": "array", "items": {"type": "string"}}},
+    },
+}
+
+RULES_SCHEMA = {
+    "type": "object",
+    "required": ["version", "rules"],
+    "properties": {
+        "version": {"type": "string"},
+        "rules": {
+            "type": "object",
+            "additionalProperties": {
+                "type": "object",
+                "additionalProperties": {
+                    "type": "object",
+                    "required": ["rule"],
+                    "properties": {
+                        "rule": {"type": "string"},
+                        "keywords": {"type": "array", "items": {"type": "string"}},
+                    },
+                },
+            },
+        },
+    },
+}
+
+COURSES_SCHEMA = {
+    "type": "object",
+    "required": ["version", "courses"],
+    "properties": {
+        "version": {"type": "string"},
+        "courses": {
+            "type": "object",
+            "additionalProperties": {
+                "type": "object",
+                "required": ["days", "ages", "levels"],
+                "properties": {
+                    "days": {"type": "array", "items": {"type": "string"}, "minItems": 1},
+                    "ages": {"type": "array", "items": {"type": "string"}, "minItems": 1},
+                    "levels": {"type": "array", "items": {"type": "string"}, "minItems": 1},
+                },
+            },
+        },
+    },
+}
+
+SHOP_INVENTORY_SCHEMA = {
+    "type": "object",
+    "required": ["version", "items"],
+    "properties": {
+        "version": {"type": "string"},
+        "items": {
+            "type": "object",
+            "additionalProperties": {
+                "type": "object",
+                "required": ["colors", "brands"],
+                "properties": {
+                    "colors": {"type": "array", "items": {"type": "string"}, "minItems": 1},
+                    "sizes": {"type": "array", "items": {"type": "string"}, "minItems": 1},
+                    "brands": {"type": "object", "minProperties": 1, "additionalProperties": {"type": "number", "minimum": 0}},
+                    # Units of every variant unless listed in "stock".
+                    "default_stock": {"type": "integer", "minimum": 0},
+                    "stock": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "required": ["color", "brand", "quantity"],
+                            "properties": {
+                                "color": {"type": "string"},
+                                "size": {"type": "string"},
+                                "brand": {"type": "string"},
+                                "quantity": {"type": "integer", "minimum": 0},
+                            },
+                        },
+                    },
+                },
+            },
+        },
+    },
+}
+
+# Data file name (without extension) -> schema.
+DATA_FILE_SCHEMAS = {
+    "opening_hours": OPENING_HOURS_SCHEMA,
+    "pricing": PRICING_SCHEMA,
+    "rules": RULES_SCHEMA,
+    "courses": COURSES_SCHEMA,
+    "shop_inventory": SHOP_INVENTORY_SCHEMA,
+}
+
+
+def load_data_file(path: Path) -> dict[str, Any]:
+    """Load a JSON or YAML data file."""
+    with open(path, encoding="utf-8") as file:
+        if path.suffix in (".yaml", ".yml"):
+            import yaml
+
+            return yaml.safe_load(file)
+
+        return json.load(file)
+
+
+def find_data_file(data_dir: Path, name: str) -> Path:
+    for extension in DATA_FILE_EXTENSIONS:
+        path = data_dir / f"{name}{extension}"
+        if path.exists():
+            return path
+
+    raise FileNotFoundError(f"No data file for '{name}' in {data_dir}")
+
+
+class StaticData:
+    """One immutable version of the facility tables together with the indexes derived from them."""
+
+    def __init__(self, raw: dict[str, dict[str, Any]]) -> None:
+        self.versions = {name: content["version"] for name, content in raw.items()}
+
+        opening_hours = raw["opening_hours"]
+        self.facility_notes = opening_hours.get("facility_notes", {})
+        self.weekly_opening_hours = opening_hours["weekly"]
+        self.date_exceptions = opening_hours.get("date_exceptions", {})
+        self.seasonal_openings = {facility: tuple(season) for facility, season in opening_hours.get("seasonal_openings", {}).items()}
+        self.time_ranges = {name: tuple(bounds) for name, bounds in opening_hours.get("time_ranges", {}).items()}
+        self.opening_hours_engine = OpeningHoursEngine(
+            self.weekly_opening_hours, exceptions=self.date_exceptions, seasons=self.seasonal_openings)
+        self.opening_hours = self.opening_hours_engine.summary()
+        self.detailed_opening_hours = self.opening_hours_engine.detailed()
+
+        pricing = raw["pricing"]
+        self.pricing = pricing["pricing"]
+        self.discounts = pricing["discounts"]
+        self.restricted_categories = pricing.get("restricted_categories", {})
+        self.price_matrix = PriceMatrix(self.pricing, self.discounts, restricted_categories=self.restricted_categories)
+
+        self.rules_db = raw["rules"]["rules"]
+        self.rule_matcher = KeywordMatcher(self.rules_db)
+
+        self.courses_db = raw["courses"]["courses"]
+        self.course_index = CourseIndex(self.courses_db)
+
+        self.shop_inventory = raw["shop_inventory"]["items"]
+
+
+class StaticDataRegistry:
+    """
+    Holds the current StaticData and replaces it when the data files change.
+
+    A reload validates every file and builds all derived indexes before swapping a single
+    reference, so readers that already took `current` finish their turn on the old version
+    and never wait. Invalid files are logged and the previous version stays active.
+    """
+
+    def __init__(self, data_dir: str | Path) -> None:
+        self.data_dir = Path(data_dir)
+        self._listeners = []
+        self._mtimes: dict[str, float] = {}
+        self._reload_lock = threading.Lock()
+        self._watcher: threading.Thread | None = None
+        self._stop_watching = threading.Event()
+
+        # Unlike a reload, there is no previous version to keep: fail with the file at fault.
+        try:
+            self._mtimes = self._file_mtimes()
+            self.current = self._load()
+        except Exception as exc:
+            raise ValueError(f"Static data in {self.data_dir} could not be loaded: {exc}") from exc
+
+    def add_listener(self, listener) -> None:
+        """Register a callback run after a new version has been swapped in."""
+        self._listeners.append(listener)
+
+    def _file_mtimes(self) -> dict[str, float]:
+        return {name: os.path.getmtime(find_data_file(self.data_dir, name)) for name in DATA_FILE_SCHEMAS}
+
+    def _load(self) -> StaticData:
+        raw = {}
+
+        for name, schema in DATA_FILE_SCHEMAS.items():
+            path = find_data_file(self.data_dir, name)
+            content = load_data_file(path)
+
+            try:
+                jsonschema.validate(content, schema)
+            except jsonschema.ValidationError as exc:
+                raise ValueError(f"{path.name}: {exc.message}") from exc
+
+            raw[name] = content
+
+        return StaticData(raw)
+
+    def has_changed(self) -> bool:
+        try:
+            return self._file_mtimes() != self._mtimes
+        except FileNotFoundError:
+            return False
+
+    def reload(self) -> bool:
+        """Load, validate and swap in the data files. Returns False when the files are invalid."""
+        with self._reload_lock:
+            try:
+                # Failed versions are not retried until the files change again.
+                self._mtimes = self._file_mtimes()
+                static_data = self._load()
+            except Exception as exc:
+                logger.error("Static data reload failed, keeping versions %s: %s", self.current.versions, exc)
+                return False
+
+            previous_versions = self.current.versions
+            self.current = static_data
+
+        logger.info("Static data reloaded: %s -> %s", previous_versions, static_data.versions)
+
+        for listener in self._listeners:
+            listener()
+
+        return True
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop_watching.wait(interval):
+            if self.has_changed():
+                self.reload()
+
+    def start_watching(self, interval: float = 5.0) -> None:
+        """Poll the data files from a daemon thread and reload them when they change."""
+        if self._watcher is not None:
+            return
+
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="static-data-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        self._stop_watching.set()
+
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
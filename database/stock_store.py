@@ -0,0 +1,245 @@
+import threading
+import time
+import uuid
+from typing import Any
+
+
+ONE_SIZE = "one_size"
+ANY_VALUE = "(any)"
+DEFAULT_HOLD_SECONDS = 15 * 60
+
+VARIANT_SLOTS = ("color", "size", "brand")
+# Slots relaxed first when a fully specified variant is out of stock.
+RELAXATION_ORDER = ["brand", "size", "color"]
+
+Variant = tuple[str, str, str, str]
+
+
+def make_variant(item: str, color: str, size: str | None, brand: str) -> Variant:
+    return item, color, size or ONE_SIZE, brand
+
+
+class StockStore:
+    """
+    Per-variant stock of the shop, keyed by (item, color, size, brand).
+
+    A unit is held while the customer confirms the purchase, then committed on
+    confirmation or released on abort. Holds expire after hold_seconds so abandoned
+    conversations do not lock stock. One lock guards every read and write, so the
+    check-and-hold is atomic across concurrent sessions.
+    """
+
+    def __init__(self, inventory: dict[str, dict[str, Any]], hold_seconds: float = DEFAULT_HOLD_SECONDS) -> None:
+        self.hold_seconds = hold_seconds
+        self._lock = threading.Lock()
+        self._variants: dict[str, list[Variant]] = {}
+        self._configured: dict[Variant, int] = {}
+        self._on_hand: dict[Variant, int] = {}
+        self._held: dict[Variant, int] = {}
+        self._reservations: dict[str, dict[str, Any]] = {}
+
+        self.sync(inventory)
+
+    # ===================
+    #    CATALOG
+    # ===================
+    def _configured_stock(self, inventory: dict[str, dict[str, Any]]) -> tuple[dict[str, list[Variant]], dict[Variant, int]]:
+        variants = {}
+        configured = {}
+
+        for item, item_data in inventory.items():
+            default_quantity = item_data.get("default_stock", 0)
+            item_variants = [
+                make_variant(item, color, size, brand)
+                for color in item_data["colors"]
+                for size in item_data.get("sizes", [ONE_SIZE])
+                for brand in item_data["brands"]
+            ]
+
+            for variant in item_variants:
+                configured[variant] = default_quantity
+
+            for entry in item_data.get("stock", []):
+                configured[make_variant(item, entry["color"], entry.get("size"), entry["brand"])] = entry["quantity"]
+
+            variants[item] = item_variants
+
+        return variants, configured
+
+    def sync(self, inventory: dict[str, dict[str, Any]]) -> None:
+        """Apply a (re)loaded inventory. Variants whose configured quantity changed are restocked."""
+        variants, configured = self._configured_stock(inventory)
+
+        with self._lock:
+            for variant, quantity in configured.items():
+                if self._configured.get(variant) != quantity:
+                    self._on_hand[variant] = quantity
+
+            for variant in set(self._on_hand) - set(configured):
+                self._on_hand.pop(variant)
+
+            self._variants = variants
+            self._configured = configured
+
+    def reset(self) -> None:
+        """Restore the configured quantities and drop every hold."""
+        with self._lock:
+            self._on_hand = dict(self._configured)
+            self._held = {}
+            self._reservations = {}
+
+    # ===================
+    #    QUERIES
+    # ===================
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+
+        for reservation_id in [key for key, reservation in self._reservations.items() if reservation["expires_at"] <= now]:
+            self._drop_reservation(reservation_id)
+
+    def _available(self, variant: Variant, reservation_id: str | None = None) -> int:
+        """Units that can be sold, counting the units of reservation_id as available to its owner."""
+        available = self._on_hand.get(variant, 0) - self._held.get(variant, 0)
+        own = self._reservations.get(reservation_id) if reservation_id else None
+
+        if own is not None and own["variant"] == variant:
+            available += own["quantity"]
+
+        return available
+
+    def available(self, variant: Variant, reservation_id: str | None = None) -> int:
+        with self._lock:
+            self._purge_expired()
+            return self._available(variant, reservation_id)
+
+    @staticmethod
+    def _matches(variant: Variant, filters: dict[str, str | None]) -> bool:
+        return all(not value or value == ANY_VALUE or variant[index + 1] == value
+                   for index, value in enumerate(filters.get(slot) for slot in VARIANT_SLOTS))
+
+    def _matching_variants(self, item: str, filters: dict[str, str | None], reservation_id: str | None = None, quantity: int = 1) -> list[Variant]:
+        return [
+            variant for variant in self._variants.get(item, [])
+            if self._matches(variant, filters) and self._available(variant, reservation_id) >= quantity
+        ]
+
+    def available_values(self, item: str, slot: str, color: str | None = None, size: str | None = None, brand: str | None = None,
+                         reservation_id: str | None = None) -> list[str]:
+        """Return the in-stock values of one slot, in catalog order, given the other slot values."""
+        filters = {"color": color, "size": size, "brand": brand, slot: None}
+        slot_index = VARIANT_SLOTS.index(slot) + 1
+
+        with self._lock:
+            self._purge_expired()
+            values = [variant[slot_index] for variant in self._matching_variants(item, filters, reservation_id)]
+
+        return list(dict.fromkeys(values))
+
+    def in_stock_items(self) -> list[str]:
+        with self._lock:
+            self._purge_expired()
+            return [item for item in self._variants if self._matching_variants(item, {})]
+
+    def find_blocking_slot(self, item: str, color: str | None = None, size: str | None = None, brand: str | None = None,
+                           reservation_id: str | None = None) -> tuple[str, list[str]] | None:
+        """
+        Return (slot, in-stock options) for the single slot to change when no variant matching
+        the given values is in stock, or None when one is available (the caller's own hold included).
+        """
+        filters = {"color": color, "size": size, "brand": brand}
+
+        with self._lock:
+            self._purge_expired()
+
+            if self._matching_variants(item, filters, reservation_id):
+                return None
+
+            if not self._matching_variants(item, {}):
+                return "item", [name for name in self._variants if self._matching_variants(name, {})]
+
+            for slot in RELAXATION_ORDER:
+                if not filters[slot] or filters[slot] == ANY_VALUE:
+                    continue
+
+                relaxed = {**filters, slot: None}
+                slot_index = VARIANT_SLOTS.index(slot) + 1
+                options = list(dict.fromkeys(variant[slot_index] for variant in self._matching_variants(item, relaxed)))
+
+                if options:
+                    return slot, options
+
+            # Several values conflict at once: restart from the colors in stock.
+            return "color", list(dict.fromkeys(variant[1] for variant in self._matching_variants(item, {})))
+
+    # ===================
+    #    RESERVATIONS
+    # ===================
+    def _drop_reservation(self, reservation_id: str) -> dict[str, Any] | None:
+        reservation = self._reservations.pop(reservation_id, None)
+
+        if reservation is not None:
+            variant = reservation["variant"]
+            self._held[variant] -= reservation["quantity"]
+            if not self._held[variant]:
+                self._held.pop(variant)
+
+        return reservation
+
+    def get_reservation(self, reservation_id: str | None) -> dict[str, Any] | None:
+        with self._lock:
+            self._purge_expired()
+            reservation = self._reservations.get(reservation_id)
+            return dict(reservation) if reservation else None
+
+    def hold(self, item: str, color: str | None = None, size: str | None = None, brand: str | None = None,
+             quantity: int = 1, reservation_id: str | None = None) -> tuple[str, Variant] | None:
+        """
+        Atomically pick the first in-stock variant matching the given values (None or ANY_VALUE
+        match anything, in catalog order) and hold units of it. An existing hold with the same id
+        is kept if it still matches, or replaced, e.g. when the customer changes color.
+        Returns (reservation id, held variant), or None if nothing matching is in stock.
+        """
+        filters = {"color": color, "size": size, "brand": brand}
+
+        with self._lock:
+            self._purge_expired()
+            previous = self._reservations.get(reservation_id) if reservation_id else None
+
+            if previous is not None and previous["quantity"] == quantity and previous["variant"][0] == item and self._matches(previous["variant"], filters):
+                previous["expires_at"] = time.monotonic() + self.hold_seconds
+                return reservation_id, previous["variant"]
+
+            if previous is not None:
+                self._drop_reservation(reservation_id)
+
+            candidates = self._matching_variants(item, filters, quantity=quantity)
+
+            if not candidates:
+                return None
+
+            variant = candidates[0]
+            reservation_id = reservation_id or uuid.uuid4().hex[:12]
+            self._reservations[reservation_id] = {
+                "variant": variant,
+                "quantity": quantity,
+                "expires_at": time.monotonic() + self.hold_seconds,
+            }
+            self._held[variant] = self._held.get(variant, 0) + quantity
+            return reservation_id, variant
+
+    def commit(self, reservation_id: str | None) -> bool:
+        """Turn a hold into a sale. Returns False if the hold does not exist or has expired."""
+        with self._lock:
+            self._purge_expired()
+            reservation = self._drop_reservation(reservation_id)
+
+            if reservation is None:
+                return False
+
+            variant = reservation["variant"]
+            self._on_hand[variant] = self._on_hand.get(variant, 0) - reservation["quantity"]
+            return True
+
+    def release(self, reservation_id: str | None) -> None:
+        with self._lock:
+            self._drop_reservation(reservation_id)
@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+from typing import Any
+
+from database.db_backends import RemoteBackend, call_database_method
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class StubDatabaseServer:
+    """
+    Local JSON-lines TCP server around the MockDatabase, used to exercise RemoteBackend
+    without an external service. An optional artificial latency simulates a remote database.
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, latency_ms: float = 0.0) -> None:
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self._server: asyncio.AbstractServer | None = None
+        self._connections: dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    async def _handle_request(self, request: dict[str, Any]) -> dict[str, Any]:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+        try:
+            db_result, slot_updates = await asyncio.to_thread(
+                call_database_method, request.get("method"), request.get("kwargs") or {})
+        except Exception as exc:
+            logger.exception("Database request failed: %s", request.get("method"))
+            return {"id": request.get("id"), "error": str(exc)}
+
+        return {"id": request.get("id"), "result": db_result, "slot_updates": slot_updates}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections[task] = writer
+
+        try:
+            while line := await reader.readline():
+                response = await self._handle_request(json.loads(line))
+                writer.write(json.dumps(response, default=str).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        logger.info("Stub database server listening on %s:%s", self.host, self.port)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+
+            # Closing the open connections ends their handlers at the next read.
+            for writer in list(self._connections.values()):
+                writer.close()
+
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+
+async def load_test(host: str, port: int, requests: int, concurrency: int, pool_size: int) -> dict[str, float]:
+    """Send read-only requests through a pooled RemoteBackend and report the latency percentiles."""
+    backend = RemoteBackend(host, port, pool_size=pool_size)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_request(index: int) -> None:
+        kwargs = {"facility_type": ["swimming_pool", "gym", "spa"][index % 3], "lenient": False}
+
+        async with semaphore:
+            start = time.perf_counter()
+            await backend.call("get_opening_hours", kwargs)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request(index) for index in range(requests)))
+    elapsed = time.perf_counter() - start
+    await backend.close()
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 2),
+        "max_ms": round(latencies[-1], 2),
+    }
+
+
+async def _serve_and_load_test(args: argparse.Namespace) -> dict[str, float]:
+    server = StubDatabaseServer(args.host, args.port, latency_ms=args.latency_ms)
+    await server.start()
+
+    try:
+        return await load_test(args.host, args.port, args.requests, args.concurrency, args.pool_size)
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stub database server for the async database backend.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency_ms", type=float, default=0.0, help="Artificial latency added to every request.")
+    parser.add_argument("--load_test", action="store_true", help="Start the server, run a load test against it, and exit.")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--pool_size", type=int, default=4)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.load_test:
+        print(json.dumps(asyncio.run(_serve_and_load_test(args)), indent=2))
+    else:
+        asyncio.run(StubDatabaseServer(args.host, args.port, latency_ms=args.latency_ms).serve_forever())
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ from typing import Any, Dict, List
 
 from evaluation.utils import (
     MAX_NEW_TOKENS,
+    PromptTokenCounter,
     basic_values_equal,
     ensure_project_root,
     get_eval_paths,
@@ -14,6 +15,7 @@ from evaluation.utils import (
     iter_batches,
     load_json_list,
     parse_json_object,
+    payload_variant,
     print_batch_done,
     print_final_paths,
     save_json,
@@ -21,6 +23,9 @@ from evaluation.utils import (
 
 ensure_project_root(__file__)
 
+from utils.serialization import PAYLOAD_FORMATS, serialize_payload
+from utils.settings import PAYLOAD_FORMAT
+
 PATHS = get_eval_paths(__file__, "dm")
 GROUND_TRUTH_PATH = PATHS["ground_truth"]
 
@@ -29,11 +34,12 @@ def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Evaluate DM with one deterministic accuracy metric.")
     parser.add_argument("-m", "--model", type=str, default="qwen3_4b", help="Model name defined in llm/config.py.")
     parser.add_argument("-b", "--batch-size", type=int, default=4, help="Number of samples processed in each generation batch.")
+    parser.add_argument("--payload-format", choices=PAYLOAD_FORMATS, default=PAYLOAD_FORMAT, help="Serialization of the JSON payloads in the prompts.")
     return parser.parse_args()
 
 
-def build_messages(sample: Dict[str, Any]) -> List[Dict[str, str]]:
-    payload_str = json.dumps(sample["input"], indent=2)
+def build_messages(sample: Dict[str, Any], payload_format: str = "indented") -> List[Dict[str, str]]:
+    payload_str = serialize_payload(sample["input"], payload_format)
     return [
         {"role": "system", "content": DM_SYSTEM_PROMPT.strip()},
         {"role": "user", "content": f"CURRENT INPUT:\n{payload_str}"},
@@ -136,8 +142,8 @@ def build_error_report(predictions: List[Dict[str, Any]], samples: List[Dict[str
     return wrong_examples
 
 
-def run_evaluation(model_name: str, batch_size: int, llm: Any = None) -> Dict[str, Any]:
-    paths = get_eval_paths(__file__, "dm", model_name=model_name)
+def run_evaluation(model_name: str, batch_size: int, llm: Any = None, payload_format: str = PAYLOAD_FORMAT) -> Dict[str, Any]:
+    paths = get_eval_paths(__file__, "dm", model_name=model_name, variant=payload_variant(payload_format))
     ground_truth_path = paths["ground_truth"]
 
     print(f"Loading ground truth from: {ground_truth_path}", flush=True)
@@ -156,16 +162,19 @@ def run_evaluation(model_name: str, batch_size: int, llm: Any = None) -> Dict[st
     else:
         print(f"Using already loaded model: {model_name}", flush=True)
 
+    llm = PromptTokenCounter(llm)
     predictions = []
     eval_start = time.time()
 
     for batch_idx, _, batch_samples, batch_start in iter_batches(samples, batch_size, "Evaluating DM"):
-        messages_batch = [build_messages(sample) for sample in batch_samples]
+        messages_batch = [build_messages(sample, payload_format) for sample in batch_samples]
         raw_outputs = llm.generate_batch(messages_batch=messages_batch, max_new_tokens=MAX_NEW_TOKENS)
         predictions.extend(parse_llm_json(raw_output) for raw_output in raw_outputs)
         print_batch_done(batch_idx, total_batches, batch_start, eval_start, len(predictions), total_samples)
 
     metrics = compute_metrics(predictions, samples)
+    metrics["payload_format"] = payload_format
+    metrics["mean_prompt_tokens"] = llm.mean_tokens()
     wrong_examples = build_error_report(predictions, samples)
 
     results = {"model": model_name, "ground_truth_path": str(ground_truth_path), "metrics": metrics}
@@ -177,7 +186,7 @@ def run_evaluation(model_name: str, batch_size: int, llm: Any = None) -> Dict[st
 
 def main() -> None:
     args = parse_args()
-    output = run_evaluation(model_name=args.model, batch_size=args.batch_size)
+    output = run_evaluation(model_name=args.model, batch_size=args.batch_size, payload_format=args.payload_format)
     print(json.dumps(output["results"]["metrics"], indent=2, ensure_ascii=False), flush=True)
 
 
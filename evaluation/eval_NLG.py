@@ -8,11 +8,13 @@ from pathlib import Path
 from typing import Any, Dict, List, Tuple
 
 from evaluation.utils import (
+    PromptTokenCounter,
     ensure_project_root,
     get_eval_paths,
     get_total_batches,
     iter_batches,
     load_json_list,
+    payload_variant,
     print_batch_done,
     print_final_paths,
     save_json,
@@ -20,6 +22,9 @@ from evaluation.utils import (
 
 ensure_project_root(__file__)
 
+from utils.serialization import PAYLOAD_FORMATS
+from utils.settings import PAYLOAD_FORMAT
+
 PATHS = get_eval_paths(__file__, "nlg")
 DEFAULT_GROUND_TRUTH_PATH = PATHS["ground_truth"]
 MAX_NEW_TOKENS = 256
@@ -104,9 +109,12 @@ class EvalHistory:
     def __init__(self, messages: List[Dict[str, str]] | None = None):
         self.messages = messages or []
 
-    def get_last_n_messages(self, n: int) -> List[Dict[str, str]]:
+    def get_last_n_messages(self, n: int, max_tokens: int | None = None) -> List[Dict[str, str]]:
         return self.messages[-n:]
 
+    def get_summary(self) -> str:
+        return ""
+
     def add_message(self, role: str, content: str) -> None:
         self.messages.append({"role": role, "content": content})
 
@@ -120,6 +128,7 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--predictions-path", type=Path, default=None, help="Optional path with pre-generated outputs to evaluate.")
     parser.add_argument("--max-samples", type=int, default=None, help="Optional limit for quick tests.")
     parser.add_argument("--manual-review", action="store_true", help="Kept for compatibility. Manual review file is always created.")
+    parser.add_argument("--payload-format", choices=PAYLOAD_FORMATS, default=PAYLOAD_FORMAT, help="Serialization of the JSON payloads in the prompts.")
     return parser.parse_args()
 
 
@@ -637,8 +646,9 @@ def run_evaluation(
     predictions_path: Path | None = None,
     max_samples: int | None = None,
     manual_review: bool = True,
+    payload_format: str = PAYLOAD_FORMAT,
 ) -> Dict[str, Any]:
-    paths = get_eval_paths(__file__, "nlg", model_name=model_name)
+    paths = get_eval_paths(__file__, "nlg", model_name=model_name, variant=payload_variant(payload_format))
 
     if results_dir is not None:
         results_dir = Path(results_dir)
@@ -676,7 +686,8 @@ def run_evaluation(
         else:
             print(f"Using already loaded model: {model_name}", flush=True)
         NLG = load_nlg_class()
-        nlg = NLG(llm)
+        llm = PromptTokenCounter(llm)
+        nlg = NLG(llm, payload_format=payload_format)
         print(f"NLG ready in {time.time() - load_start:.1f}s.", flush=True)
 
     prediction_records = []
@@ -694,6 +705,9 @@ def run_evaluation(
         print_batch_done(batch_idx, total_batches, batch_start, eval_start, len(prediction_records), total_samples)
 
     metrics = compute_metrics(evaluations, samples)
+    metrics["payload_format"] = payload_format
+    if nlg is not None:
+        metrics["mean_prompt_tokens"] = llm.mean_tokens()
     error_report = build_error_report(prediction_records, evaluations, samples)
     manual_review_report = build_manual_review_report(prediction_records, evaluations, samples)
 
@@ -733,6 +747,7 @@ def main() -> None:
         predictions_path=args.predictions_path,
         max_samples=args.max_samples,
         manual_review=True,
+        payload_format=args.payload_format,
     )
     print(json.dumps(output["results"]["metrics"], indent=2, ensure_ascii=False), flush=True)
 
@@ -9,12 +9,14 @@ from typing import Any, Dict, List
 
 from evaluation.utils import (
     MAX_NEW_TOKENS,
+    PromptTokenCounter,
     ensure_project_root,
     get_eval_paths,
     get_total_batches,
     iter_batches,
     load_json_list,
     parse_json_object,
+    payload_variant,
     print_batch_done,
     print_final_paths,
     save_json,
@@ -22,6 +24,10 @@ from evaluation.utils import (
 
 ensure_project_root(__file__)
 
+from components.NLU import ExampleSelector
+from utils.serialization import PAYLOAD_FORMATS, serialize_payload
+from utils.settings import NLU_FEW_SHOT_K, NLU_FEW_SHOT_TOKENS, PAYLOAD_FORMAT
+
 PATHS = get_eval_paths(__file__, "nlu")
 GROUND_TRUTH_PATH = PATHS["ground_truth"]
 FREE_TEXT_SLOTS = {"specific_inquiry", "last_seen_location", "lost_item"}
@@ -32,23 +38,34 @@ def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Evaluate NLU with one slot-level correctness metric.")
     parser.add_argument("-m", "--model", type=str, default="qwen3_4b", help="Model name defined in llm/config.py.")
     parser.add_argument("-b", "--batch-size", type=int, default=4, help="Number of samples processed in each generation batch.")
+    parser.add_argument("-k", "--few-shot-k", type=int, default=NLU_FEW_SHOT_K, help="Most similar examples kept per prompt (0 = every schema example).")
+    parser.add_argument("--few-shot-tokens", type=int, default=NLU_FEW_SHOT_TOKENS, help="Token budget of the kept examples.")
+    parser.add_argument("--payload-format", choices=PAYLOAD_FORMATS, default=PAYLOAD_FORMAT, help="Serialization of the JSON payloads in the prompts.")
     return parser.parse_args()
 
 
-def build_messages(sample: Dict[str, Any]) -> List[Dict[str, str]]:
+def build_messages(
+    sample: Dict[str, Any],
+    selector: ExampleSelector | None = None,
+    payload_format: str = "indented",
+) -> List[Dict[str, str]]:
     target_intent = sample["target_intent"]
     target_segment = sample["target_segment"]
-    schema = INTENT_SCHEMAS_PROMPTS.get(target_intent, INTENT_SCHEMAS_PROMPTS["out_of_scope"])
-    system_prompt = f"{NLU_BASE_CONTEXT}\n\n{schema}"
     payload = {
         "conversation_history": sample.get("conversation_history", []),
         "full_user_message": sample.get("full_user_message", target_segment),
         "target_intent": target_intent,
         "target_segment": target_segment,
     }
+    if selector is None:
+        schema = INTENT_SCHEMAS_PROMPTS.get(target_intent, INTENT_SCHEMAS_PROMPTS["out_of_scope"])
+        return [
+            {"role": "system", "content": f"{NLU_BASE_CONTEXT}\n\n{schema}".strip()},
+            {"role": "user", "content": serialize_payload(payload, payload_format)},
+        ]
     return [
-        {"role": "system", "content": system_prompt.strip()},
-        {"role": "user", "content": json.dumps(payload, indent=2)},
+        {"role": "system", "content": selector.system_prompt(target_intent)},
+        {"role": "user", "content": selector.user_prompt(target_intent, payload, payload_format)},
     ]
 
 
@@ -203,6 +220,22 @@ def compare_slots(prediction: Dict[str, Any], sample: Dict[str, Any]) -> tuple[b
     return ok, details
 
 
+def count_prompt_tokens(llm: Any, messages: List[Dict[str, str]]) -> int:
+    return sum(llm.count_tokens(message["content"]) for message in messages)
+
+
+def compute_prompt_token_metrics(llm: Any, samples: List[Dict[str, Any]], selector: ExampleSelector, payload_format: str, selected_mean: float) -> Dict[str, Any]:
+    """Mean prompt tokens of the full intent schemas, against the measured mean with the selected examples."""
+    full = [count_prompt_tokens(llm, build_messages(sample, payload_format=payload_format)) for sample in samples]
+    full_mean = sum(full) / len(full) if full else 0.0
+    return {
+        "few_shot_k": selector.k,
+        "few_shot_tokens": selector.max_tokens,
+        "full_schema_mean_prompt_tokens": round(full_mean, 1),
+        "prompt_token_reduction": round(1 - selected_mean / full_mean, 3) if full_mean else 0.0,
+    }
+
+
 def compute_metrics(predictions: List[Dict[str, Any]], samples: List[Dict[str, Any]]) -> Dict[str, Any]:
     total = len(samples)
     correct = 0
@@ -242,8 +275,15 @@ def build_error_report(predictions: List[Dict[str, Any]], samples: List[Dict[str
     return wrong_examples
 
 
-def run_evaluation(model_name: str, batch_size: int, llm: Any = None) -> Dict[str, Any]:
-    paths = get_eval_paths(__file__, "nlu", model_name=model_name)
+def run_evaluation(
+    model_name: str,
+    batch_size: int,
+    llm: Any = None,
+    few_shot_k: int = NLU_FEW_SHOT_K,
+    few_shot_tokens: int = NLU_FEW_SHOT_TOKENS,
+    payload_format: str = PAYLOAD_FORMAT,
+) -> Dict[str, Any]:
+    paths = get_eval_paths(__file__, "nlu", model_name=model_name, variant=payload_variant(payload_format))
     ground_truth_path = paths["ground_truth"]
 
     print(f"Loading ground truth from: {ground_truth_path}", flush=True)
@@ -262,11 +302,13 @@ def run_evaluation(model_name: str, batch_size: int, llm: Any = None) -> Dict[st
     else:
         print(f"Using already loaded model: {model_name}", flush=True)
 
+    llm = PromptTokenCounter(llm)
+    selector = ExampleSelector(llm.count_tokens, k=few_shot_k, max_tokens=few_shot_tokens)
     predictions = []
     eval_start = time.time()
 
     for batch_idx, _, batch_samples, batch_start in iter_batches(samples, batch_size, "Evaluating NLU"):
-        messages_batch = [build_messages(sample) for sample in batch_samples]
+        messages_batch = [build_messages(sample, selector, payload_format) for sample in batch_samples]
         outputs = llm.generate_batch(messages_batch=messages_batch, max_new_tokens=MAX_NEW_TOKENS)
         for output, sample in zip(outputs, batch_samples):
             fallback_intent = sample["target_intent"]
@@ -276,6 +318,9 @@ def run_evaluation(model_name: str, batch_size: int, llm: Any = None) -> Dict[st
         print_batch_done(batch_idx, total_batches, batch_start, eval_start, len(predictions), total_samples)
 
     metrics = compute_metrics(predictions, samples)
+    metrics["payload_format"] = payload_format
+    metrics["mean_prompt_tokens"] = llm.mean_tokens()
+    metrics["prompt_tokens"] = compute_prompt_token_metrics(llm, samples, selector, payload_format, metrics["mean_prompt_tokens"])
     wrong_examples = build_error_report(predictions, samples)
 
     results = {"model": model_name, "ground_truth_path": str(ground_truth_path), "metrics": metrics}
@@ -287,7 +332,13 @@ def run_evaluation(model_name: str, batch_size: int, llm: Any = None) -> Dict[st
 
 def main() -> None:
     args = parse_args()
-    output = run_evaluation(model_name=args.model, batch_size=args.batch_size)
+    output = run_evaluation(
+        model_name=args.model,
+        batch_size=args.batch_size,
+        few_shot_k=args.few_shot_k,
+        few_shot_tokens=args.few_shot_tokens,
+        payload_format=args.payload_format,
+    )
     print(json.dumps(output["results"]["metrics"], indent=2, ensure_ascii=False), flush=True)
 
 
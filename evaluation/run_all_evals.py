@@ -11,6 +11,8 @@ from evaluation.eval_router import run_evaluation as run_router
 from evaluation.eval_NLU import run_evaluation as run_nlu
 from evaluation.eval_DM import run_evaluation as run_dm
 from evaluation.eval_NLG import run_evaluation as run_nlg
+from utils.serialization import PAYLOAD_FORMATS
+from utils.settings import PAYLOAD_FORMAT
 
 
 def parse_args() -> argparse.Namespace:
@@ -18,6 +20,7 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("-m", "--models", nargs="+", default=["qwen3_4b"], help="Model names defined in llm/config.py.")
     parser.add_argument("-b", "--batch-size", type=int, default=4, help="Batch size for all evaluations.")
     parser.add_argument("--components", nargs="+", default=["router", "nlu", "dm", "nlg"], choices=["router", "nlu", "dm", "nlg"], help="Components to evaluate.")
+    parser.add_argument("--payload-formats", nargs="+", default=[PAYLOAD_FORMAT], choices=PAYLOAD_FORMATS, help="Prompt payload formats to evaluate, each with the same loaded model.")
     parser.add_argument("--summary-path", type=Path, default=Path("evaluation/results/leaderboard_summary.json"), help="Where to save the compact leaderboard summary.")
     return parser.parse_args()
 
@@ -35,9 +38,9 @@ def extract_main_metric(result: dict) -> float:
     return float(metrics.get("main_metric", 0.0))
 
 
-def run_component(component_name: str, run_fn, model_name: str, batch_size: int, llm) -> dict:
-    print(f"\nRunning {component_name.upper()} evaluation...", flush=True)
-    output = run_fn(model_name=model_name, batch_size=batch_size, llm=llm)
+def run_component(component_name: str, run_fn, model_name: str, batch_size: int, llm, payload_format: str) -> dict:
+    print(f"\nRunning {component_name.upper()} evaluation ({payload_format} payloads)...", flush=True)
+    output = run_fn(model_name=model_name, batch_size=batch_size, llm=llm, payload_format=payload_format)
     main_metric = extract_main_metric(output)
     print(f"{component_name.upper()} main_metric: {main_metric:.4f}", flush=True)
     return {
@@ -50,26 +53,31 @@ def run_component(component_name: str, run_fn, model_name: str, batch_size: int,
     }
 
 
-def run_for_model(model_name: str, batch_size: int, components: list[str]) -> dict:
+def run_for_model(model_name: str, batch_size: int, components: list[str], payload_formats: list[str]) -> list[dict]:
     print("=" * 80, flush=True)
     print(f"Loading model once: {model_name}", flush=True)
     llm = load_llm(model_name)
-    model_summary = {"model": model_name, "components": {}}
+    model_summaries = []
 
     try:
-        if "router" in components:
-            model_summary["components"]["router"] = run_component("router", run_router, model_name, batch_size, llm)
-        if "nlu" in components:
-            model_summary["components"]["nlu"] = run_component("nlu", run_nlu, model_name, batch_size, llm)
-        if "dm" in components:
-            model_summary["components"]["dm"] = run_component("dm", run_dm, model_name, batch_size, llm)
-        if "nlg" in components:
-            model_summary["components"]["nlg"] = run_component("nlg", run_nlg, model_name, batch_size, llm)
+        for payload_format in payload_formats:
+            model_summary = {"model": model_name, "payload_format": payload_format, "components": {}}
+
+            if "router" in components:
+                model_summary["components"]["router"] = run_component("router", run_router, model_name, batch_size, llm, payload_format)
+            if "nlu" in components:
+                model_summary["components"]["nlu"] = run_component("nlu", run_nlu, model_name, batch_size, llm, payload_format)
+            if "dm" in components:
+                model_summary["components"]["dm"] = run_component("dm", run_dm, model_name, batch_size, llm, payload_format)
+            if "nlg" in components:
+                model_summary["components"]["nlg"] = run_component("nlg", run_nlg, model_name, batch_size, llm, payload_format)
+
+            model_summaries.append(model_summary)
     finally:
         clear_model(llm)
         print(f"\nReleased model from memory: {model_name}", flush=True)
 
-    return model_summary
+    return model_summaries
 
 
 def main() -> None:
@@ -78,7 +86,12 @@ def main() -> None:
 
     for model_name in args.models:
         try:
-            leaderboard.append(run_for_model(model_name=model_name, batch_size=args.batch_size, components=args.components))
+            leaderboard.extend(run_for_model(
+                model_name=model_name,
+                batch_size=args.batch_size,
+                components=args.components,
+                payload_formats=args.payload_formats,
+            ))
         except Exception:
             print(f"\nEvaluation failed for model: {model_name}", flush=True)
             traceback.print_exc()
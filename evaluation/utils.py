@@ -7,6 +7,8 @@ from typing import Any, Callable, Dict, Iterator, List, Tuple
 
 from tqdm.auto import tqdm
 
+from llm.loader import LLMWrapper
+
 
 MAX_NEW_TOKENS = 256
 
@@ -24,13 +26,13 @@ def safe_folder_name(name: str) -> str:
     return name or "unknown_model"
 
 
-def get_eval_paths(file_path: str, component_name: str, model_name: str | None = None) -> Dict[str, Path]:
+def get_eval_paths(file_path: str, component_name: str, model_name: str | None = None, variant: str | None = None) -> Dict[str, Path]:
     base_dir = Path(file_path).resolve().parent
     name = component_name.lower()
     results_dir = base_dir / "results"
 
     if model_name is not None:
-        results_dir = results_dir / safe_folder_name(model_name)
+        results_dir = results_dir / safe_folder_name(model_name if variant is None else f"{model_name}_{variant}")
 
     return {
         "ground_truth": base_dir / "ground_truth_data" / f"{name}_ground_truth.json",
@@ -42,6 +44,35 @@ def get_eval_paths(file_path: str, component_name: str, model_name: str | None =
     }
 
 
+def payload_variant(payload_format: str) -> str | None:
+    """Results of a non-default payload format go to their own folder, e.g. results/qwen3_4b_compact."""
+    return None if payload_format == "indented" else payload_format
+
+
+class PromptTokenCounter(LLMWrapper):
+    """Wraps an LLM and counts the tokens of the message contents of every prompt it receives."""
+
+    def __init__(self, llm: Any) -> None:
+        super().__init__(llm)
+        self.prompts = 0
+        self.tokens = 0
+
+    def _count(self, messages_batch: List[List[Dict[str, str]]]) -> None:
+        self.prompts += len(messages_batch)
+        self.tokens += sum(self.llm.count_tokens(message["content"]) for messages in messages_batch for message in messages)
+
+    def generate(self, messages: List[Dict[str, str]], max_new_tokens: int = 128) -> str:
+        self._count([messages])
+        return super().generate(messages, max_new_tokens=max_new_tokens)
+
+    def generate_batch(self, messages_batch: List[List[Dict[str, str]]], max_new_tokens: int = 128) -> List[str]:
+        self._count(messages_batch)
+        return super().generate_batch(messages_batch, max_new_tokens=max_new_tokens)
+
+    def mean_tokens(self) -> float:
+        return round(self.tokens / self.prompts, 1) if self.prompts else 0.0
+
+
 def load_json_list(path: Path, label: str = "Ground truth") -> List[Dict[str, Any]]:
     with open(path, "r", encoding="utf-8") as file:
         data = json.load(file)
@@ -0,0 +1,94 @@
+import argparse
+import gc
+import json
+import statistics
+import time
+from pathlib import Path
+
+from llm.config import CPU_DEVICE_MAP, MODELS
+from llm.loader import load_llm
+from prompts.router_prompt import ROUTER_SYSTEM_PROMPT
+
+
+BENCHMARK_UTTERANCES = [
+    "Hi, I'm Anna Verdi and I want to book the spa for two people next Friday at 6 PM.",
+    "How much is the annual pass? Do I need a swimming cap in the pool?",
+    "I lost my red towel yesterday in the changing room.",
+    "I want to buy some blue goggles, size M, from Arena.",
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure CPU generation throughput (tokens/sec) per model.")
+    parser.add_argument("-m", "--models", nargs="+", default=["qwen25_3b"], choices=list(MODELS), help="Model names defined in llm/config.py.")
+    parser.add_argument("--dtype", choices=["bf16", "fp32"], default=None, help="Weights dtype (defaults to CPU_DTYPE).")
+    parser.add_argument("--int8", action="store_true", help="Also benchmark each model with dynamic int8 linear layers.")
+    parser.add_argument("--threads", type=int, default=None, help="Intra-op threads (defaults to CPU_THREADS, 0 = all usable cores).")
+    parser.add_argument("--runs", type=int, default=3, help="Timed generations per model, after one warm-up.")
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--output", type=Path, default=Path("evaluation/results/cpu_benchmark.json"))
+    return parser.parse_args()
+
+
+def benchmark_model(model_name: str, runs: int, max_new_tokens: int, **cpu_options) -> dict:
+    load_start = time.perf_counter()
+    llm = load_llm(model_name, device_map=CPU_DEVICE_MAP, **cpu_options)
+    load_s = time.perf_counter() - load_start
+
+    prompts = [
+        [
+            {"role": "system", "content": ROUTER_SYSTEM_PROMPT},
+            {"role": "user", "content": json.dumps({"conversation_history": [], "last_user_utterance": utterance}, indent=2)},
+        ]
+        for utterance in BENCHMARK_UTTERANCES
+    ]
+
+    llm.generate(prompts[0], max_new_tokens=8)
+
+    latencies = []
+    tokens_per_s = []
+
+    for run in range(runs):
+        messages = prompts[run % len(prompts)]
+        start = time.perf_counter()
+        output = llm.generate(messages, max_new_tokens=max_new_tokens)
+        elapsed = time.perf_counter() - start
+
+        latencies.append(elapsed)
+        tokens_per_s.append(llm.count_tokens(output) / elapsed)
+
+    del llm
+    gc.collect()
+
+    return {
+        "model": model_name,
+        **cpu_options,
+        "load_s": round(load_s, 1),
+        "latency_s": round(statistics.median(latencies), 2),
+        "tokens_per_s": round(statistics.median(tokens_per_s), 2),
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    cpu_options = {"threads": args.threads} if args.threads is not None else {}
+
+    if args.dtype:
+        cpu_options["dtype"] = args.dtype
+
+    results = []
+
+    for int8 in [False, True] if args.int8 else [False]:
+        for model_name in args.models:
+            print(f"Benchmarking {model_name} on CPU{' (int8)' if int8 else ''}...", flush=True)
+            result = benchmark_model(model_name, args.runs, args.max_new_tokens, int8=int8, **cpu_options)
+            results.append(result)
+            print(json.dumps(result), flush=True)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"Saved CPU benchmark to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+from components.NLG import NLG
+from evaluation.eval_NLG import DEFAULT_GROUND_TRUTH_PATH, EvalHistory
+from llm.config import DRAFT_MODELS
+from llm.loader import ComponentLLM, load_llm
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare plain and speculative NLG decoding on the NLG ground truth.")
+    parser.add_argument("-m", "--model", default="qwen3_4b", choices=list(DRAFT_MODELS), help="Model with a draft in DRAFT_MODELS.")
+    parser.add_argument("--ground-truth", type=Path, default=DEFAULT_GROUND_TRUTH_PATH)
+    parser.add_argument("--max-samples", type=int, default=None)
+    parser.add_argument("--output", type=Path, default=Path("evaluation/results/speculative_benchmark.json"))
+    return parser.parse_args()
+
+
+def time_predictions(nlg: NLG, samples: list[dict]) -> tuple[list[str], float]:
+    outputs = []
+    start = time.perf_counter()
+
+    for sample in samples:
+        input_data = sample["input"]
+        outputs.append(nlg.predict(
+            dm_action_data=input_data["dm_action"],
+            dialogue_state=input_data["dialogue_state"],
+            history=EvalHistory(input_data.get("history", [])),
+        ))
+
+    return outputs, time.perf_counter() - start
+
+
+def main() -> None:
+    args = parse_args()
+
+    # Multi-response samples go through generate_multi_response and are not needed here.
+    samples = [sample for sample in json.loads(args.ground_truth.read_text(encoding="utf-8")) if "dm_action" in sample["input"]]
+    samples = samples[:args.max_samples] if args.max_samples else samples
+
+    llm = load_llm(args.model, draft=True)
+    plain_nlg = NLG(ComponentLLM(llm))
+    speculative_nlg = NLG(ComponentLLM(llm, speculative=True))
+
+    # Warm-up, so neither run pays for the first CUDA kernels.
+    time_predictions(plain_nlg, samples[:1])
+    time_predictions(speculative_nlg, samples[:1])
+    llm.decoding_stats = {}
+
+    plain_outputs, plain_s = time_predictions(plain_nlg, samples)
+    speculative_outputs, speculative_s = time_predictions(speculative_nlg, samples)
+
+    summary = {
+        "model": args.model,
+        "draft": DRAFT_MODELS[args.model],
+        "samples": len(samples),
+        "plain_s": round(plain_s, 2),
+        "speculative_s": round(speculative_s, 2),
+        "speedup": round(plain_s / speculative_s, 2) if speculative_s else 0.0,
+        "identical_outputs": sum(plain == speculative for plain, speculative in zip(plain_outputs, speculative_outputs)),
+        **llm.decoding_report().get("speculative", {"calls": 0}),
+    }
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import logging
+import os
 from typing import Any, Callable, Dict, Tuple
 from functools import partial
 
@@ -10,30 +12,107 @@ from llm.generation import (
     generate_response_gemma3,
     generate_response_batch_gemma3,
 )
+from llm.stub import (
+    STUB_MODEL_NAME,
+    generate_response_stub,
+    generate_response_batch_stub,
+    load_stub_model,
+)
+from utils.settings import CPU_DTYPE, CPU_INT8, CPU_INTEROP_THREADS, CPU_THREADS, STUB_LLM_RECORDINGS
 
 
-quantization_config = BitsAndBytesConfig(
-    load_in_4bit=True,
-    bnb_4bit_compute_dtype=torch.float16,
-    bnb_4bit_quant_type="nf4",
-    bnb_4bit_use_double_quant=True,
-)
+logger = logging.getLogger(__name__)
+
+CPU_DEVICE_MAP = "cpu"
+CPU_DTYPES = {"bf16": torch.bfloat16, "fp32": torch.float32}
+
+
+def get_quantization_config() -> BitsAndBytesConfig:
+    # Built on demand, so models that do not use bitsandbytes (e.g. the stub) load without it.
+    return BitsAndBytesConfig(
+        load_in_4bit=True,
+        bnb_4bit_compute_dtype=torch.float16,
+        bnb_4bit_quant_type="nf4",
+        bnb_4bit_use_double_quant=True,
+    )
+
+
+# ===================
+#    CPU BACKEND
+# ===================
+# Thread counts set by the first configure_cpu_threads call of the process.
+CPU_THREAD_COUNTS: dict[str, int] = {}
+
+
+def configure_cpu_threads(threads: int = CPU_THREADS, interop_threads: int = CPU_INTEROP_THREADS) -> tuple[int, int]:
+    """
+    Set the torch intra-op and inter-op thread counts, deriving them from the usable cores when 0.
+    Only the first call sets them: torch accepts the inter-op count once, before any parallel work,
+    so later models (e.g. a draft model or another component model) keep the same counts.
+    """
+    if CPU_THREAD_COUNTS:
+        return CPU_THREAD_COUNTS["threads"], CPU_THREAD_COUNTS["interop_threads"]
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    threads = threads or cores
+    # Decoding is one sequential stream of matmuls: a couple of inter-op threads is enough.
+    interop_threads = interop_threads or min(2, max(1, cores // 8))
+
+    torch.set_num_threads(threads)
+
+    if torch.get_num_interop_threads() != interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # Parallel work already ran in this process, e.g. before the model was loaded.
+            logger.warning("Inter-op threads already fixed at %s, could not set %s.", torch.get_num_interop_threads(), interop_threads)
+            interop_threads = torch.get_num_interop_threads()
+
+    CPU_THREAD_COUNTS.update(threads=threads, interop_threads=interop_threads)
+    return threads, interop_threads
+
+
+def load_cpu_model(model_class, model_id: str, dtype: str = CPU_DTYPE, int8: bool = CPU_INT8, threads: int = CPU_THREADS, **kwargs: Any):
+    """
+    Load a model on CPU without bitsandbytes, in bf16 or fp32. With int8, the linear layers are
+    dynamically quantized to int8 (weights stored in int8, activations quantized per batch),
+    which requires fp32 weights.
+    """
+    threads, interop_threads = configure_cpu_threads(threads)
+    model_dtype = torch.float32 if int8 else CPU_DTYPES[dtype]
+
+    logger.info("Loading %s on CPU (%s%s, %s threads, %s inter-op)",
+                model_id, "fp32" if int8 else dtype, " + int8 linear" if int8 else "", threads, interop_threads)
+
+    model = model_class.from_pretrained(model_id, dtype=model_dtype, device_map=CPU_DEVICE_MAP, **kwargs)
+    model.eval()
+
+    if int8:
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    return model
 
 
 def load_causal_model(model_id: str, device_map: str = "auto", **kwargs: Any):
+    if device_map == CPU_DEVICE_MAP:
+        return load_cpu_model(AutoModelForCausalLM, model_id, **kwargs)
+
     return AutoModelForCausalLM.from_pretrained(
         model_id,
-        torch_dtype=torch.float16,
+        dtype=torch.float16,
         device_map=device_map,
-        quantization_config=quantization_config,
+        quantization_config=get_quantization_config(),
         **kwargs,
     )
 
 
 def load_gemma3_model(model_id: str, device_map: str = "auto", **kwargs: Any):
+    if device_map == CPU_DEVICE_MAP:
+        return load_cpu_model(Gemma3ForConditionalGeneration, model_id, **kwargs)
+
     return Gemma3ForConditionalGeneration.from_pretrained(
         model_id,
-        torch_dtype=torch.bfloat16,
+        dtype=torch.bfloat16,
         device_map=device_map,
         quantization_config=BitsAndBytesConfig(
             load_in_4bit=True,
@@ -86,4 +165,19 @@ MODELS: Dict[str, Tuple[str, Callable[..., Any], Callable[..., Any], Callable[..
         generate_response,
         generate_response_batch,
     ),
-}
\ No newline at end of file
+    # Deterministic CPU-only model for benchmarking the pipeline: its id is the recordings file.
+    STUB_MODEL_NAME: (
+        STUB_LLM_RECORDINGS,
+        load_stub_model,
+        generate_response_stub,
+        generate_response_batch_stub,
+    ),
+}
+
+# Draft model id per model for speculative decoding. A draft must share the tokenizer of its
+# model and is loaded with the same loader.
+DRAFT_MODELS: Dict[str, str] = {
+    "qwen3_4b": "Qwen/Qwen3-0.6B",
+    "qwen25_3b": "Qwen/Qwen2.5-0.5B-Instruct",
+    "llama32_3b": "meta-llama/Llama-3.2-1B-Instruct",
+}
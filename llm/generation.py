@@ -5,6 +5,7 @@ from datetime import datetime
 import torch
 from transformers import PreTrainedTokenizer
 
+from llm.prompt_prefix import encode_prompts
 from utils.settings import APP_DEBUG
 
 
@@ -91,16 +92,39 @@ def _generation_kwargs(tokenizer, max_new_tokens: int) -> Dict[str, Any]:
     }
 
 
-def generate_response(model, tokenizer, messages, max_new_tokens=128):
+def _assisted_kwargs(assistant_model, prompt_lookup_num_tokens: int = 0) -> Dict[str, Any]:
+    # Assisted decoding: the draft model (speculative decoding) or the n-grams of the prompt
+    # (prompt-lookup decoding) propose tokens that the model verifies in one forward pass.
+    # With greedy decoding the output is the same as without the candidates.
+    if assistant_model is not None:
+        return {"assistant_model": assistant_model}
+
+    if prompt_lookup_num_tokens > 0:
+        return {"prompt_lookup_num_tokens": prompt_lookup_num_tokens}
+
+    return {}
+
+
+def _record_new_tokens(new_token_counts: Optional[List[int]], output_ids) -> None:
+    # Only assisted generations ask for counts, and they decode a single unpadded sequence.
+    if new_token_counts is not None:
+        new_token_counts.append(len(output_ids))
+
+
+def _batch_assisted_kwargs(batch_size: int, prompt_lookup_num_tokens: int) -> Dict[str, Any]:
+    # Assisted generation only supports one sequence, larger batches are decoded plainly.
+    # It can overshoot max_new_tokens by one token, so outputs are trimmed to the budget.
+    return _assisted_kwargs(None, prompt_lookup_num_tokens) if batch_size == 1 else {}
+
+
+def generate_response(model, tokenizer, messages, max_new_tokens=128, assistant_model=None, prompt_lookup_num_tokens=0,
+                      new_token_counts=None):
     _prepare_tokenizer(tokenizer)
 
     text_input = prepare_text(tokenizer, messages)
     _save_debug_prompt("prompt_debug", text_input)
 
-    model_inputs = tokenizer(
-        [text_input],
-        return_tensors="pt",
-    ).to(_get_input_device(model))
+    model_inputs = encode_prompts(tokenizer, [text_input], [messages]).to(_get_input_device(model))
 
     input_len = model_inputs["input_ids"].shape[-1]
 
@@ -108,9 +132,11 @@ def generate_response(model, tokenizer, messages, max_new_tokens=128):
         generated_ids = model.generate(
             **model_inputs,
             **_generation_kwargs(tokenizer, max_new_tokens),
+            **_assisted_kwargs(assistant_model, prompt_lookup_num_tokens),
         ).cpu()
 
-    output_ids = generated_ids[0][input_len:]
+    output_ids = generated_ids[0][input_len:input_len + max_new_tokens]
+    _record_new_tokens(new_token_counts, output_ids)
 
     response = tokenizer.decode(
         output_ids,
@@ -124,7 +150,8 @@ def generate_response(model, tokenizer, messages, max_new_tokens=128):
     return response
 
 
-def generate_response_batch(model, tokenizer, messages_batch, max_new_tokens=128):
+def generate_response_batch(model, tokenizer, messages_batch, max_new_tokens=128, prompt_lookup_num_tokens=0,
+                            new_token_counts=None):
     _prepare_tokenizer(tokenizer)
 
     text_inputs = [
@@ -145,11 +172,7 @@ def generate_response_batch(model, tokenizer, messages_batch, max_new_tokens=128
         except Exception as error:
             logger.warning("Failed to save debug batch prompt: %s", error)
 
-    model_inputs = tokenizer(
-        text_inputs,
-        return_tensors="pt",
-        padding=True,
-    ).to(_get_input_device(model))
+    model_inputs = encode_prompts(tokenizer, text_inputs, messages_batch).to(_get_input_device(model))
 
     input_len = model_inputs["input_ids"].shape[-1]
 
@@ -157,12 +180,14 @@ def generate_response_batch(model, tokenizer, messages_batch, max_new_tokens=128
         generated_ids = model.generate(
             **model_inputs,
             **_generation_kwargs(tokenizer, max_new_tokens),
+            **_batch_assisted_kwargs(len(text_inputs), prompt_lookup_num_tokens),
         ).cpu()
 
     responses = []
 
     for output_id in generated_ids:
-        trimmed_id = output_id[input_len:]
+        trimmed_id = output_id[input_len:input_len + max_new_tokens]
+        _record_new_tokens(new_token_counts, trimmed_id)
 
         response = tokenizer.decode(
             trimmed_id,
@@ -295,16 +320,30 @@ def _gemma_generation_kwargs(processor, max_new_tokens: int) -> Dict[str, Any]:
     }
 
 
-def generate_response_gemma3(model, tokenizer, messages, max_new_tokens=128):
+def _gemma_add_special_tokens(processor, text: str) -> bool:
+    # As in processor.apply_chat_template, a rendered prompt that already starts with BOS
+    # is tokenized without special tokens.
+    bos_token = processor.tokenizer.bos_token
+    return not (bos_token is not None and text.startswith(bos_token))
+
+
+def generate_response_gemma3(model, tokenizer, messages, max_new_tokens=128, assistant_model=None, prompt_lookup_num_tokens=0,
+                             new_token_counts=None):
     processor = tokenizer
     _prepare_gemma_processor(processor)
 
-    model_inputs = processor.apply_chat_template(
+    text_input = processor.apply_chat_template(
         _normalize_gemma_messages(messages),
-        tokenize=True,
+        tokenize=False,
         add_generation_prompt=True,
-        return_dict=True,
-        return_tensors="pt",
+    )
+
+    model_inputs = encode_prompts(
+        processor.tokenizer,
+        [text_input],
+        [messages],
+        add_special_tokens=_gemma_add_special_tokens(processor, text_input),
+        token_type_ids=True,
     ).to(_get_input_device(model))
 
     input_len = model_inputs["input_ids"].shape[-1]
@@ -313,9 +352,11 @@ def generate_response_gemma3(model, tokenizer, messages, max_new_tokens=128):
         generated_ids = model.generate(
             **model_inputs,
             **_gemma_generation_kwargs(processor, max_new_tokens),
+            **_assisted_kwargs(assistant_model, prompt_lookup_num_tokens),
         ).cpu()
 
-    output_ids = generated_ids[0][input_len:]
+    output_ids = generated_ids[0][input_len:input_len + max_new_tokens]
+    _record_new_tokens(new_token_counts, output_ids)
 
     if hasattr(processor, "decode"):
         response = processor.decode(
@@ -335,7 +376,8 @@ def generate_response_gemma3(model, tokenizer, messages, max_new_tokens=128):
     return response
 
 
-def generate_response_batch_gemma3(model, tokenizer, messages_batch, max_new_tokens=128):
+def generate_response_batch_gemma3(model, tokenizer, messages_batch, max_new_tokens=128, prompt_lookup_num_tokens=0,
+                                   new_token_counts=None):
     processor = tokenizer
     _prepare_gemma_processor(processor)
 
@@ -361,10 +403,11 @@ def generate_response_batch_gemma3(model, tokenizer, messages_batch, max_new_tok
         except Exception as error:
             logger.warning("Failed to save Gemma debug batch prompt: %s", error)
 
-    model_inputs = processor(
-        text=text_inputs,
-        return_tensors="pt",
-        padding=True,
+    model_inputs = encode_prompts(
+        processor.tokenizer,
+        text_inputs,
+        messages_batch,
+        token_type_ids=True,
     ).to(_get_input_device(model))
 
     input_len = model_inputs["input_ids"].shape[-1]
@@ -373,12 +416,14 @@ def generate_response_batch_gemma3(model, tokenizer, messages_batch, max_new_tok
         generated_ids = model.generate(
             **model_inputs,
             **_gemma_generation_kwargs(processor, max_new_tokens),
+            **_batch_assisted_kwargs(len(text_inputs), prompt_lookup_num_tokens),
         ).cpu()
 
     responses = []
 
     for output_id in generated_ids:
-        trimmed_id = output_id[input_len:]
+        trimmed_id = output_id[input_len:input_len + max_new_tokens]
+        _record_new_tokens(new_token_counts, trimmed_id)
         response = _decode_gemma_output(processor, trimmed_id)
         responses.append(response)
 
@@ -1,13 +1,22 @@
+import logging
 import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any
 
 from dotenv import load_dotenv
 from huggingface_hub import login
 from transformers import AutoProcessor, AutoTokenizer
 
-from llm.config import MODELS
+from llm.config import DRAFT_MODELS, MODELS
+from llm.stub import STUB_MODEL_NAME, StubTokenizer, record_outputs
+from utils.settings import LLM_DEVICE_MAP, LLM_RECORD_PATH, PROMPT_LOOKUP_TOKENS
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 def login_to_huggingface() -> None:
     token = os.getenv("HF_TOKEN")
@@ -23,9 +32,28 @@ def login_to_huggingface() -> None:
         print(f"Hugging Face login failed: {error}")
 
 
+def load_tokenizer(model_name: str, model_id: str):
+    """The tokenizer, or the processor for Gemma, that the generation functions of a model expect."""
+    if model_name == STUB_MODEL_NAME:
+        return StubTokenizer()
+
+    if model_name == "gemma3_4b":
+        return AutoProcessor.from_pretrained(
+            model_id,
+            trust_remote_code=True,
+        )
+
+    return AutoTokenizer.from_pretrained(
+        model_id,
+        trust_remote_code=True,
+    )
+
+
 class LLMService:
-    def __init__(self, model_name: str, device_map: str = "auto") -> None:
-        login_to_huggingface()
+    def __init__(self, model_name: str, device_map: str = LLM_DEVICE_MAP, tokenizer=None,
+                 adapters: dict[str, str] | None = None, draft: bool = False, **model_kwargs) -> None:
+        if model_name != STUB_MODEL_NAME:
+            login_to_huggingface()
 
         if model_name not in MODELS:
             available_models = ", ".join(MODELS.keys())
@@ -37,47 +65,269 @@ class LLMService:
 
         self.model_name = model_name
         self.model_id = model_id
-        self.model = init_model(model_id, device_map=device_map)
+        self.model = init_model(model_id, device_map=device_map, **model_kwargs)
 
-        if model_name == "gemma3_4b":
-            self.tokenizer = AutoProcessor.from_pretrained(
-                model_id,
-                trust_remote_code=True,
-            )
-        elif model_name == "phi4_mini":
-            self.tokenizer = AutoTokenizer.from_pretrained(
-                model_id,
-                trust_remote_code=True,
-            )
-        else:
-            self.tokenizer = AutoTokenizer.from_pretrained(
-                model_id,
-                trust_remote_code=True,
-            )
+        # A tokenizer can be shared with another loaded model that has the same model_id.
+        self.tokenizer = tokenizer if tokenizer is not None else load_tokenizer(model_name, model_id)
 
         self._generate_response = generate_response
         self._generate_response_batch = generate_response_batch
+        # Background work (e.g. the history summarizer) shares the model with the main pipeline.
+        self._generation_lock = threading.Lock()
+        self.record_path = LLM_RECORD_PATH if model_name != STUB_MODEL_NAME else None
 
-    def generate(self, messages: list[dict[str, str]], max_new_tokens: int = 128) -> str:
-        return self._generate_response(
-            model=self.model,
-            tokenizer=self.tokenizer,
-            messages=messages,
-            max_new_tokens=max_new_tokens,
-        )
+        # LoRA adapter name -> path or hub id. Adapters are loaded on first use and stay resident.
+        self.adapters = dict(adapters or {})
+        self._loaded_adapters: set[str] = set()
+
+        self.draft_model = None
+        # Decoding mode ("speculative" or "prompt_lookup") -> accumulated counters.
+        self.decoding_stats: dict[str, dict[str, float]] = {}
+        self._forward_counts = {"target": 0, "draft": 0}
+
+        # Forward passes are counted to derive the tokens accepted per step of assisted decoding.
+        # The hook stays on the base model, whose forward a PeftModel wrapper still calls, with
+        # or without an active adapter.
+        if hasattr(self.model, "register_forward_hook"):
+            self.model.register_forward_hook(self._count_forward("target"))
+
+        if draft:
+            self._load_draft_model(init_model, device_map, **model_kwargs)
+
+    # ===================
+    #    ASSISTED DECODING
+    # ===================
+    def _count_forward(self, name: str):
+        def hook(module, inputs, output) -> None:
+            self._forward_counts[name] += 1
+        return hook
+
+    def _load_draft_model(self, init_model, device_map: str, **model_kwargs) -> None:
+        draft_id = DRAFT_MODELS.get(self.model_name)
+
+        if draft_id is None:
+            logger.warning("No draft model configured for %s, speculative decoding disabled.", self.model_name)
+            return
+
+        self.draft_model = init_model(draft_id, device_map=device_map, **model_kwargs)
+        self.draft_model.register_forward_hook(self._count_forward("draft"))
+
+    def _assisted_generate(self, mode: str, generate_fn, **kwargs) -> str | list[str]:
+        """Run one assisted generation (single or batch of one) and add its forward pass counts to the stats of the mode."""
+        self._forward_counts = {"target": 0, "draft": 0}
+        new_token_counts: list[int] = []
+        start = time.perf_counter()
+        response = generate_fn(model=self.model, tokenizer=self.tokenizer, new_token_counts=new_token_counts, **kwargs)
+        seconds = time.perf_counter() - start
+
+        stats = self.decoding_stats.setdefault(
+            mode, {"calls": 0, "new_tokens": 0, "target_steps": 0, "draft_steps": 0, "seconds": 0.0})
+        stats["calls"] += 1
+        # The generated ids, including a final EOS that decoding removes from the text.
+        stats["new_tokens"] += sum(new_token_counts)
+        # Assisted decoding has no separate prefill pass: its first verification step also
+        # encodes the prompt and emits tokens, so every target forward pass is a step.
+        stats["target_steps"] += self._forward_counts["target"]
+        stats["draft_steps"] += self._forward_counts["draft"]
+        stats["seconds"] += seconds
+
+        return response
+
+    def decoding_report(self) -> dict[str, dict[str, float]]:
+        """
+        Per assisted decoding mode: tokens produced per forward pass of the model (which bounds the
+        speedup over plain greedy decoding), candidate tokens accepted per step, and for the draft
+        model its acceptance rate (accepted draft tokens / drafted tokens).
+        """
+        report = {}
+
+        for mode, stats in self.decoding_stats.items():
+            report[mode] = {
+                "calls": stats["calls"],
+                "tokens_per_s": round(stats["new_tokens"] / stats["seconds"], 2) if stats["seconds"] else 0.0,
+            }
+
+            # Models without forward hooks (e.g. the stub) have no step counts.
+            if not stats["target_steps"]:
+                continue
+
+            # Every verification step emits one token of the model on top of the accepted candidates.
+            accepted = max(stats["new_tokens"] - stats["target_steps"], 0)
+            report[mode]["tokens_per_step"] = round(stats["new_tokens"] / stats["target_steps"], 2)
+            report[mode]["accepted_per_step"] = round(accepted / stats["target_steps"], 2)
+
+            if stats["draft_steps"]:
+                report[mode]["acceptance_rate"] = round(accepted / stats["draft_steps"], 3)
+
+        return report
+
+    # ===================
+    #    LORA ADAPTERS
+    # ===================
+    def _load_adapter(self, adapter: str) -> None:
+        if adapter not in self.adapters:
+            raise ValueError(f"Unknown adapter '{adapter}'. Available adapters: {', '.join(self.adapters) or 'none'}")
+
+        try:
+            from peft import PeftModel
+        except ImportError as exc:
+            raise ImportError("LoRA adapters require the 'peft' package.") from exc
+
+        if self._loaded_adapters:
+            self.model.load_adapter(self.adapters[adapter], adapter_name=adapter)
+        else:
+            self.model = PeftModel.from_pretrained(self.model, self.adapters[adapter], adapter_name=adapter)
+
+        self.model.eval()
+        self._loaded_adapters.add(adapter)
+
+    def _use_adapter(self, adapter: str | None):
+        """Activate an adapter, or the plain base model for None. Must be called under the generation lock."""
+        if self.model_name == STUB_MODEL_NAME:
+            return nullcontext()
+
+        if adapter is None:
+            return self.model.disable_adapter() if self._loaded_adapters else nullcontext()
+
+        if adapter not in self._loaded_adapters:
+            self._load_adapter(adapter)
+
+        self.model.set_adapter(adapter)
+        return nullcontext()
+
+    def count_tokens(self, text: str) -> int:
+        """Count the tokens of a text with the model tokenizer, without special tokens."""
+        # Multimodal processors (e.g. Gemma 3) wrap the text tokenizer.
+        text_tokenizer = getattr(self.tokenizer, "tokenizer", self.tokenizer)
+        return len(text_tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def generate(self, messages: list[dict[str, str]], max_new_tokens: int = 128, adapter: str | None = None,
+                 speculative: bool = False, prompt_lookup: bool = False) -> str:
+        """
+        Generate one response. With speculative, the draft model (if loaded) proposes the tokens;
+        with prompt_lookup, they are proposed by matching n-grams of the prompt. Greedy outputs
+        are the same either way.
+        """
+        with self._generation_lock, self._use_adapter(adapter):
+            if speculative and self.draft_model is not None:
+                response = self._assisted_generate(
+                    "speculative", self._generate_response,
+                    messages=messages, max_new_tokens=max_new_tokens, assistant_model=self.draft_model)
+            elif prompt_lookup and PROMPT_LOOKUP_TOKENS:
+                response = self._assisted_generate(
+                    "prompt_lookup", self._generate_response,
+                    messages=messages, max_new_tokens=max_new_tokens, prompt_lookup_num_tokens=PROMPT_LOOKUP_TOKENS)
+            else:
+                response = self._generate_response(
+                    model=self.model,
+                    tokenizer=self.tokenizer,
+                    messages=messages,
+                    max_new_tokens=max_new_tokens,
+                )
+
+        if self.record_path:
+            record_outputs(self.record_path, [messages], [response], model_name=self.model_name)
+
+        return response
 
     def generate_batch(
         self,
         messages_batch: list[list[dict[str, str]]],
         max_new_tokens: int = 128,
+        adapter: str | list[str | None] | None = None,
+        prompt_lookup: bool = False,
     ) -> list[str]:
-        return self._generate_response_batch(
-            model=self.model,
-            tokenizer=self.tokenizer,
-            messages_batch=messages_batch,
-            max_new_tokens=max_new_tokens,
-        )
+        """
+        Generate a batch of responses. `adapter` is one adapter for the whole batch or one per prompt.
+        With prompt_lookup, single-prompt groups use prompt-lookup decoding.
+        """
+        adapters = adapter if isinstance(adapter, list) else [adapter] * len(messages_batch)
+        groups: dict[str | None, list[int]] = {}
+
+        for index, name in enumerate(adapters):
+            groups.setdefault(name, []).append(index)
+
+        responses = [""] * len(messages_batch)
+
+        # One batched generation per adapter, since an adapter applies to the whole forward pass.
+        with self._generation_lock:
+            for name, indexes in groups.items():
+                with self._use_adapter(name):
+                    if prompt_lookup and PROMPT_LOOKUP_TOKENS and len(indexes) == 1:
+                        group_responses = [self._assisted_generate(
+                            "prompt_lookup", self._generate_response_batch,
+                            messages_batch=[messages_batch[indexes[0]]], max_new_tokens=max_new_tokens,
+                            prompt_lookup_num_tokens=PROMPT_LOOKUP_TOKENS)[0]]
+                    else:
+                        group_responses = self._generate_response_batch(
+                            model=self.model,
+                            tokenizer=self.tokenizer,
+                            messages_batch=[messages_batch[index] for index in indexes],
+                            max_new_tokens=max_new_tokens,
+                        )
+
+                for index, response in zip(indexes, group_responses):
+                    responses[index] = response
+
+        if self.record_path:
+            record_outputs(self.record_path, messages_batch, responses, model_name=self.model_name)
+
+        return responses
+
+
+class LLMWrapper:
+    """
+    Base of the LLM wrappers. Attributes it does not define (model_name, count_tokens, ...)
+    come from the wrapped LLM, and both generate calls pass through unless overridden.
+    """
+
+    def __init__(self, llm) -> None:
+        self.llm = llm
+
+    def __getattr__(self, name: str) -> Any:
+        # Guards against recursion when llm is not set yet, e.g. while copying.
+        if name == "llm":
+            raise AttributeError(name)
+
+        return getattr(self.llm, name)
+
+    def generate(self, messages: list[dict[str, str]], max_new_tokens: int = 128) -> str:
+        return self.llm.generate(messages=messages, max_new_tokens=max_new_tokens)
+
+    def generate_batch(self, messages_batch: list[list[dict[str, str]]], max_new_tokens: int = 128) -> list[str]:
+        return self.llm.generate_batch(messages_batch=messages_batch, max_new_tokens=max_new_tokens)
+
+
+class ComponentLLM(LLMWrapper):
+    """View of an LLM that applies the options of one pipeline component to every call."""
+
+    def __init__(self, llm, adapter: str | None = None, speculative: bool = False, prompt_lookup: bool = False) -> None:
+        super().__init__(llm)
+        self.adapter = adapter
+        self.speculative = speculative
+        self.prompt_lookup = prompt_lookup
+
+    def _options(self) -> dict[str, Any]:
+        options = {"adapter": self.adapter} if self.adapter is not None else {}
+
+        if self.prompt_lookup:
+            options["prompt_lookup"] = True
+
+        return options
+
+    def generate(self, messages: list[dict[str, str]], max_new_tokens: int = 128) -> str:
+        options = self._options()
+        if self.speculative:
+            options["speculative"] = True
+
+        return self.llm.generate(messages=messages, max_new_tokens=max_new_tokens, **options)
+
+    def generate_batch(self, messages_batch: list[list[dict[str, str]]], max_new_tokens: int = 128) -> list[str]:
+        # Assisted generation decodes one sequence at a time: batches never use the draft, and
+        # prompt lookup only applies to single-prompt batches.
+        return self.llm.generate_batch(messages_batch=messages_batch, max_new_tokens=max_new_tokens, **self._options())
 
 
-def load_llm(model_name: str, device_map: str = "auto") -> LLMService:
-    return LLMService(model_name=model_name, device_map=device_map)
\ No newline at end of file
+def load_llm(model_name: str, device_map: str = LLM_DEVICE_MAP, **model_kwargs) -> LLMService:
+    """Load a model from MODELS. Extra keyword arguments go to its loader, e.g. dtype or int8 on CPU."""
+    return LLMService(model_name=model_name, device_map=device_map, **model_kwargs)
\ No newline at end of file
@@ -0,0 +1,152 @@
+import math
+import statistics
+import threading
+import time
+from typing import Any
+
+from llm.config import MODELS
+from llm.loader import LLMService, LLMWrapper
+from utils.settings import LLM_DEVICE_MAP
+
+
+PIPELINE_COMPONENTS = ("router", "nlu", "dm", "nlg")
+# Components with a prompt of their own: the pipeline plus the history summarizer.
+PROMPT_COMPONENTS = (*PIPELINE_COMPONENTS, "summary")
+
+
+def _parse_component_mapping(spec: str | None, value_name: str,
+                             components: tuple[str, ...] = PIPELINE_COMPONENTS) -> dict[str, str]:
+    mapping = {}
+
+    for entry in (spec or "").split(","):
+        if not entry.strip():
+            continue
+
+        component, _, value = entry.partition("=")
+        component, value = component.strip().lower(), value.strip()
+
+        if component not in components or not value:
+            raise ValueError(f"Invalid pipeline {value_name} entry '{entry}'. Expected <component>=<{value_name}> with component in {', '.join(components)}.")
+
+        mapping[component] = value
+
+    return mapping
+
+
+def parse_component_models(spec: str | None) -> dict[str, str]:
+    """Parse a "component=model,component=model" mapping, e.g. "router=qwen25_3b,dm=qwen25_3b"."""
+    return _parse_component_mapping(spec, "model")
+
+
+def parse_component_adapters(spec: str | None) -> dict[str, str]:
+    """Parse a "component=adapter path,..." mapping of LoRA adapters, e.g. "router=adapters/router"."""
+    return _parse_component_mapping(spec, "adapter")
+
+
+def parse_component_budgets(spec: str | None) -> dict[str, int]:
+    """Parse a "component=tokens,..." mapping of prompt token budgets, e.g. "router=2500,summary=400"."""
+    budgets = _parse_component_mapping(spec, "budget", components=PROMPT_COMPONENTS)
+
+    for component, value in budgets.items():
+        if not value.isdigit():
+            raise ValueError(f"Invalid prompt token budget '{value}' for {component}, expected a number of tokens.")
+
+    return {component: int(value) for component, value in budgets.items()}
+
+
+def parse_components(spec: str | None) -> list[str]:
+    """Parse a comma-separated list of pipeline components, e.g. "router,nlg"."""
+    components = [component.strip().lower() for component in (spec or "").split(",") if component.strip()]
+
+    for component in components:
+        if component not in PIPELINE_COMPONENTS:
+            raise ValueError(f"Unknown pipeline component '{component}'. Expected one of {', '.join(PIPELINE_COMPONENTS)}.")
+
+    return components
+
+
+def load_component_llms(default_model: str, component_models: dict[str, str] | None = None,
+                        device_map: str = LLM_DEVICE_MAP, adapters: dict[str, str] | None = None,
+                        speculative_components: list[str] | None = None) -> dict[str, LLMService]:
+    """
+    Return the LLMService of every pipeline component. Components without an entry use the
+    default model. Each distinct model is loaded once, and models with the same model_id
+    share one tokenizer. Each model registers the LoRA adapters of its own components, loaded on
+    first use.
+    Models serving a speculative component also load their draft model.
+    """
+    component_models = component_models or {}
+    adapters = adapters or {}
+    speculative_components = speculative_components or []
+    loaded: dict[str, LLMService] = {}
+    tokenizers: dict[str, Any] = {}
+
+    for component in PIPELINE_COMPONENTS:
+        model_name = component_models.get(component, default_model)
+
+        if model_name not in loaded:
+            model_id = MODELS[model_name][0] if model_name in MODELS else None
+            draft = any(component_models.get(name, default_model) == model_name for name in speculative_components)
+            # An adapter is trained for one base model, so it is only registered on the model of its component.
+            model_adapters = {name: path for name, path in adapters.items() if component_models.get(name, default_model) == model_name}
+            llm = LLMService(model_name, device_map=device_map, tokenizer=tokenizers.get(model_id), adapters=model_adapters, draft=draft)
+            tokenizers.setdefault(llm.model_id, llm.tokenizer)
+            loaded[model_name] = llm
+
+    return {component: loaded[component_models.get(component, default_model)] for component in PIPELINE_COMPONENTS}
+
+
+class LatencyTracker:
+    """Collects the wall-clock time of each LLM call, by pipeline component, and of each turn."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._samples: dict[str, list[float]] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(name, []).append(seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples = {}
+
+    def report(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+
+        return {
+            name: {
+                "calls": len(values),
+                "total_s": round(sum(values), 3),
+                "mean_ms": round(1000 * statistics.fmean(values), 1),
+                "p50_ms": round(1000 * statistics.median(values), 1),
+                "p95_ms": round(1000 * values[math.ceil(0.95 * len(values)) - 1], 1),
+            }
+            for name, values in samples.items()
+        }
+
+
+class TimedLLM(LLMWrapper):
+    """LLM wrapper that records the latency of every generate call under a component name."""
+
+    def __init__(self, llm, component: str, tracker: LatencyTracker) -> None:
+        super().__init__(llm)
+        self.component = component
+        self.tracker = tracker
+
+    def generate(self, messages: list[dict[str, str]], max_new_tokens: int = 128) -> str:
+        start = time.perf_counter()
+
+        try:
+            return super().generate(messages, max_new_tokens=max_new_tokens)
+        finally:
+            self.tracker.record(self.component, time.perf_counter() - start)
+
+    def generate_batch(self, messages_batch: list[list[dict[str, str]]], max_new_tokens: int = 128) -> list[str]:
+        start = time.perf_counter()
+
+        try:
+            return super().generate_batch(messages_batch, max_new_tokens=max_new_tokens)
+        finally:
+            self.tracker.record(self.component, time.perf_counter() - start)
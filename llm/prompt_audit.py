@@ -0,0 +1,219 @@
+import argparse
+import copy
+import itertools
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+from components.DM import DM
+from components.NLG import NLG
+from components.NLU import NLU
+from components.router import Router
+from llm.config import MODELS
+from llm.generation import _gemma_add_special_tokens, _normalize_gemma_messages, _prepare_tokenizer, prepare_text
+from llm.loader import LLMWrapper, load_tokenizer, login_to_huggingface
+from llm.pipeline import PROMPT_COMPONENTS, parse_component_budgets
+from llm.prompt_prefix import static_prefix
+from llm.stub import STUB_MODEL_NAME
+from prompts.nlg_prompt import FLAG_RULES, INTENT_PROMPTS
+from prompts.nlu_prompt import INTENT_SCHEMAS_PROMPTS
+from state.history import History
+from state.summarizer import HistorySummarizer
+from utils.settings import PROMPT_TOKEN_BUDGETS
+
+
+GROUND_TRUTH_DIR = Path(__file__).resolve().parents[1] / "evaluation" / "ground_truth_data"
+
+
+class PromptRecorder(LLMWrapper):
+    """LLM stand-in that records the prompts a component builds instead of generating. It wraps no model."""
+
+    def __init__(self, model_name: str, count_tokens) -> None:
+        super().__init__(None)
+        self.model_name = model_name
+        self.count_tokens = count_tokens
+        self.prompts: list[list[dict[str, str]]] = []
+
+    def generate(self, messages: list[dict[str, str]], max_new_tokens: int = 128) -> str:
+        self.prompts.append(messages)
+        return "{}"
+
+    def generate_batch(self, messages_batch: list[list[dict[str, str]]], max_new_tokens: int = 128) -> list[str]:
+        self.prompts.extend(messages_batch)
+        return ["{}"] * len(messages_batch)
+
+    def pop(self) -> list[dict[str, str]]:
+        return self.prompts.pop()
+
+
+def _load_samples(component: str) -> list[dict[str, Any]]:
+    return json.loads((GROUND_TRUTH_DIR / f"{component}_ground_truth.json").read_text(encoding="utf-8"))
+
+
+def _history(count_tokens, messages: list[dict[str, str]]) -> History:
+    history = History(archive_dir=None, token_counter=count_tokens)
+
+    for message in messages:
+        history.add_message(message["role"], message.get("content", message.get("text", "")))
+
+    return history
+
+
+# ===================
+#    PROMPT RENDERING
+# ===================
+def component_prompts(recorder: PromptRecorder) -> dict[str, dict[str, list[dict[str, str]]]]:
+    """
+    Build every component prompt with the components themselves: the Router, DM and Summary
+    prompts once, the NLU prompt per intent, and the NLG prompt per intent and per combination
+    of response flags. Dynamic parts come from the first ground-truth sample of each intent.
+    """
+    count_tokens = recorder.count_tokens
+    prompts: dict[str, dict[str, list[dict[str, str]]]] = {component: {} for component in PROMPT_COMPONENTS}
+
+    router_sample = _load_samples("router")[0]
+    Router(recorder).predict(_history(count_tokens, [
+        *router_sample["conversation_history"], {"role": "user", "text": router_sample["last_user_utterance"]},
+    ]))
+    prompts["router"]["default"] = recorder.pop()
+
+    nlu = NLU(recorder)
+    nlu_samples = _load_samples("nlu")
+
+    for intent in INTENT_SCHEMAS_PROMPTS:
+        sample = next((sample for sample in nlu_samples if sample["target_intent"] == intent), nlu_samples[0])
+        history = _history(count_tokens, [*sample["conversation_history"], {"role": "user", "text": sample["full_user_message"]}])
+        prompts["nlu"][intent] = nlu._build_messages({"intent": intent, "segment": sample["target_segment"]}, history)
+
+    DM(recorder).predict_batch([_load_samples("dm")[0]["input"]])
+    prompts["dm"]["default"] = recorder.pop()
+
+    nlg = NLG(recorder)
+    nlg_samples = [sample for sample in _load_samples("nlg") if "dm_action" in sample["input"]]
+
+    for intent in INTENT_PROMPTS:
+        sample = next((sample for sample in nlg_samples if sample["input"]["dialogue_state"].get("intent") == intent), nlg_samples[0])
+        dialogue_state = {**sample["input"]["dialogue_state"], "intent": intent}
+
+        for count in range(len(FLAG_RULES) + 1):
+            for flags in itertools.combinations(FLAG_RULES, count):
+                dm_action = copy.deepcopy(sample["input"]["dm_action"])
+                dm_action.update({flag: True for flag in flags})
+                if "queue_recovery" in flags:
+                    dm_action["recovered_intent"] = "book_spa"
+
+                nlg.predict(dm_action, dialogue_state, _history(count_tokens, sample["input"].get("history", [])))
+                prompts["nlg"]["+".join([intent, *flags])] = recorder.pop()
+
+    history = _history(count_tokens, _load_samples("nlg")[0]["input"].get("history", []) * 4)
+    HistorySummarizer(recorder, keep_messages=1, min_new_messages=1).refresh(history)
+    prompts["summary"]["default"] = recorder.pop()
+
+    return prompts
+
+
+def prompt_cost(model_name: str, tokenizer, messages: list[dict[str, str]]) -> dict[str, int]:
+    """
+    Tokens of a prompt rendered through the chat template, split at the end of its system prompt.
+    The stub has no chat template: its count covers the message contents joined by blank lines.
+    """
+    if model_name == STUB_MODEL_NAME:
+        text = "\n\n".join(message["content"] for message in messages)
+        text_tokenizer, add_special_tokens = tokenizer, False
+    elif model_name == "gemma3_4b":
+        text = tokenizer.apply_chat_template(_normalize_gemma_messages(messages), tokenize=False, add_generation_prompt=True)
+        text_tokenizer, add_special_tokens = tokenizer.tokenizer, _gemma_add_special_tokens(tokenizer, text)
+    else:
+        text = prepare_text(tokenizer, messages)
+        text_tokenizer, add_special_tokens = tokenizer, True
+
+    def count(value: str) -> int:
+        return len(text_tokenizer(value, add_special_tokens=add_special_tokens)["input_ids"])
+
+    prefix = static_prefix(text, messages)
+    tokens = count(text)
+    static_tokens = count(prefix) if prefix else 0
+
+    return {"tokens": tokens, "static_tokens": static_tokens, "dynamic_tokens": tokens - static_tokens}
+
+
+def audit_model(model_name: str, budgets: dict[str, int]) -> dict[str, Any]:
+    tokenizer = load_tokenizer(model_name, MODELS[model_name][0])
+
+    if model_name != STUB_MODEL_NAME and model_name != "gemma3_4b":
+        _prepare_tokenizer(tokenizer)
+
+    text_tokenizer = getattr(tokenizer, "tokenizer", tokenizer)
+    recorder = PromptRecorder(model_name, lambda text: len(text_tokenizer(text, add_special_tokens=False)["input_ids"]))
+    report = {}
+
+    for component, prompts in component_prompts(recorder).items():
+        costs = {name: prompt_cost(model_name, tokenizer, messages) for name, messages in prompts.items()}
+        budget = budgets.get(component)
+        report[component] = {
+            "budget": budget,
+            "max_tokens": max(cost["tokens"] for cost in costs.values()),
+            "over_budget": sorted(name for name, cost in costs.items() if budget is not None and cost["tokens"] > budget),
+            "prompts": costs,
+        }
+
+    return report
+
+
+def compare_reports(baseline: dict[str, Any], report: dict[str, Any]) -> list[str]:
+    """One line per prompt whose token count changed since the baseline report."""
+    lines = []
+
+    for model_name, components in report["models"].items():
+        for component, entry in components.items():
+            old_prompts = baseline.get("models", {}).get(model_name, {}).get(component, {}).get("prompts", {})
+
+            for name, cost in entry["prompts"].items():
+                old = old_prompts.get(name, {}).get("tokens")
+                if old != cost["tokens"]:
+                    delta = f"{cost['tokens'] - old:+d}" if old is not None else "new"
+                    lines.append(f"{model_name} {component} {name}: {old} -> {cost['tokens']} ({delta})")
+
+    return lines
+
+
+def main() -> None:
+    default_models = [name for name in MODELS if name != STUB_MODEL_NAME]
+
+    parser = argparse.ArgumentParser(description="Report the token cost of every component prompt per model and check it against budgets.")
+    parser.add_argument("-m", "--models", nargs="+", default=default_models, choices=list(MODELS), help="Model names defined in llm/config.py.")
+    parser.add_argument("--budgets", default=PROMPT_TOKEN_BUDGETS, help='Token budgets per component, e.g. "router=2500,nlu=3000" (defaults to PROMPT_TOKEN_BUDGETS).')
+    parser.add_argument("--baseline", type=Path, default=None, help="Previous report to print the token changes against.")
+    parser.add_argument("-o", "--output", type=Path, default=Path("evaluation/results/prompt_audit.json"))
+    args = parser.parse_args()
+
+    budgets = parse_component_budgets(args.budgets)
+
+    if any(name != STUB_MODEL_NAME for name in args.models):
+        login_to_huggingface()
+
+    report = {"budgets": budgets, "models": {model_name: audit_model(model_name, budgets) for model_name in args.models}}
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+    if STUB_MODEL_NAME in report["models"]:
+        print(f"{STUB_MODEL_NAME}: counts cover the joined message contents, without a chat template.")
+
+    for model_name, components in report["models"].items():
+        for component, entry in components.items():
+            print(f"{model_name:<12} {component:<8} max {entry['max_tokens']:>6} tokens (budget {entry['budget']}) over budget: {len(entry['over_budget'])}")
+
+    if args.baseline is not None and args.baseline.exists():
+        for line in compare_reports(json.loads(args.baseline.read_text(encoding="utf-8")), report):
+            print(line)
+
+    print(f"Saved prompt audit to {args.output}")
+
+    if any(entry["over_budget"] for components in report["models"].values() for entry in components.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
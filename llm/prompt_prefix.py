@@ -0,0 +1,234 @@
+import argparse
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any
+from weakref import WeakKeyDictionary
+
+from transformers import BatchEncoding
+
+
+logger = logging.getLogger(__name__)
+
+# Cached prefixes per tokenizer. System prompts that embed a conversation summary change
+# from turn to turn, so the least recently used prefixes are evicted.
+MAX_CACHED_PREFIXES = 256
+
+
+def static_prefix(text: str, messages: list[dict[str, Any]]) -> str | None:
+    """
+    The part of a rendered chat prompt up to the end of its leading system prompt, or None.
+
+    Templates that fold the system prompt into the first user turn (Gemma) are covered too,
+    since the split is made where the system content ends in the rendered text.
+    """
+    if not messages or messages[0].get("role") != "system":
+        return None
+
+    content = str(messages[0].get("content", messages[0].get("text", "")))
+    start = text.find(content) if content else -1
+
+    return text[:start + len(content)] if start >= 0 else None
+
+
+class PromptPrefixRegistry:
+    """
+    Token ids of static prompt prefixes (rendered chat template up to the end of the system
+    prompt), tokenized once per tokenizer.
+
+    A prompt is encoded as the cached prefix ids followed by its dynamic suffix tokenized on
+    its own. That is only exact when nothing merges across the boundary, which holds when the
+    suffix starts with an added token (e.g. <|im_end|>): tokenizers split the text around
+    added tokens before anything else. Other boundaries are never split. Each added token at
+    a boundary is still checked once against the tokenization of the whole text, since some
+    strip the whitespace next to them.
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHED_PREFIXES) -> None:
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "unsafe": 0}
+        self._lock = threading.Lock()
+        # Tokenizer -> (add_special_tokens, prefix) -> [prefix ids, {boundary token: split is exact}].
+        # Keyed by the tokenizer object, so a new tokenizer never reuses the ids of a collected one.
+        self._entries: WeakKeyDictionary[Any, OrderedDict[tuple[bool, str], list]] = WeakKeyDictionary()
+        self._added_tokens: WeakKeyDictionary[Any, list[str]] = WeakKeyDictionary()
+
+    def _boundary_token(self, tokenizer, suffix: str) -> str | None:
+        """The added token the suffix starts with, or None."""
+        with self._lock:
+            added_tokens = self._added_tokens.get(tokenizer)
+
+            if added_tokens is None:
+                vocab = tokenizer.get_added_vocab() if hasattr(tokenizer, "get_added_vocab") else {}
+                # Longest first, so a token is not mistaken for one of its prefixes.
+                added_tokens = sorted((token for token in vocab if token), key=len, reverse=True)
+                self._added_tokens[tokenizer] = added_tokens
+
+        return next((token for token in added_tokens if suffix.startswith(token)), None)
+
+    def _lookup(self, tokenizer, key: tuple[bool, str]) -> list | None:
+        with self._lock:
+            entries = self._entries.get(tokenizer)
+
+            if entries is None or key not in entries:
+                return None
+
+            entries.move_to_end(key)
+            return entries[key]
+
+    def _store(self, tokenizer, key: tuple[bool, str], entry: list) -> None:
+        with self._lock:
+            entries = self._entries.setdefault(tokenizer, OrderedDict())
+            entries[key] = entry
+
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def encode(self, tokenizer, text: str, prefix: str | None, add_special_tokens: bool = True) -> list[int]:
+        """Token ids of text, the same as tokenizer(text, add_special_tokens=...)["input_ids"]."""
+        if not prefix or not text.startswith(prefix):
+            return tokenizer(text, add_special_tokens=add_special_tokens)["input_ids"]
+
+        suffix = text[len(prefix):]
+        boundary = self._boundary_token(tokenizer, suffix)
+
+        if boundary is None:
+            return tokenizer(text, add_special_tokens=add_special_tokens)["input_ids"]
+
+        key = (add_special_tokens, prefix)
+        entry = self._lookup(tokenizer, key)
+
+        if entry is not None and boundary in entry[1]:
+            if not entry[1][boundary]:
+                return tokenizer(text, add_special_tokens=add_special_tokens)["input_ids"]
+
+            self.stats["hits"] += 1
+            return entry[0] + tokenizer(suffix, add_special_tokens=False)["input_ids"]
+
+        self.stats["misses"] += 1
+        ids = tokenizer(text, add_special_tokens=add_special_tokens)["input_ids"]
+
+        if entry is None:
+            entry = [tokenizer(prefix, add_special_tokens=add_special_tokens)["input_ids"], {}]
+
+        entry[1][boundary] = entry[0] + tokenizer(suffix, add_special_tokens=False)["input_ids"] == ids
+
+        if not entry[1][boundary]:
+            self.stats["unsafe"] += 1
+            logger.warning("Prompt prefix of %s chars does not tokenize on its own before %s, it will not be split there.",
+                           len(prefix), boundary)
+
+        self._store(tokenizer, key, entry)
+        return ids
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.stats = {"hits": 0, "misses": 0, "unsafe": 0}
+
+
+PROMPT_PREFIXES = PromptPrefixRegistry()
+
+
+def encode_prompts(
+    tokenizer,
+    texts: list[str],
+    messages_batch: list[list[dict[str, Any]]],
+    add_special_tokens: bool = True,
+    token_type_ids: bool = False,
+) -> BatchEncoding:
+    """
+    Same tensors as tokenizer(texts, return_tensors="pt", padding=True) with left padding,
+    reusing the cached token ids of the system prompts.
+    """
+    ids_batch = [
+        PROMPT_PREFIXES.encode(tokenizer, text, static_prefix(text, messages), add_special_tokens)
+        for text, messages in zip(texts, messages_batch)
+    ]
+    length = max(len(ids) for ids in ids_batch)
+
+    encoding = {
+        "input_ids": [[tokenizer.pad_token_id] * (length - len(ids)) + ids for ids in ids_batch],
+        "attention_mask": [[0] * (length - len(ids)) + [1] * len(ids) for ids in ids_batch],
+    }
+
+    # Text-only prompts carry no image tokens, as the Gemma processor would mark them.
+    if token_type_ids:
+        encoding["token_type_ids"] = [[0] * length for _ in ids_batch]
+
+    return BatchEncoding(encoding, tensor_type="pt")
+
+
+# ===================
+#    VERIFICATION
+# ===================
+def sample_prompts() -> list[list[dict[str, str]]]:
+    """One prompt per component system prompt (every NLU intent schema), with a short payload."""
+    from prompts.dm_prompt import DM_SYSTEM_PROMPT
+    from prompts.nlu_prompt import INTENT_SCHEMAS_PROMPTS, NLU_BASE_CONTEXT
+    from prompts.router_prompt import ROUTER_SYSTEM_PROMPT
+    from prompts.summary_prompt import SUMMARY_SYSTEM_PROMPT
+
+    payload = json.dumps({"conversation_history": [], "last_user_utterance": "How much is the annual pass?"}, indent=2)
+    system_prompts = [ROUTER_SYSTEM_PROMPT, DM_SYSTEM_PROMPT, SUMMARY_SYSTEM_PROMPT.strip()]
+    system_prompts += [f"{NLU_BASE_CONTEXT}\n\n{schema}".strip() for schema in INTENT_SCHEMAS_PROMPTS.values()]
+
+    return [[{"role": "system", "content": prompt}, {"role": "user", "content": payload}] for prompt in system_prompts]
+
+
+def verify_model(model_name: str) -> dict[str, Any]:
+    """Compare the cached-prefix encodings with the plain tokenization paths of generation.py."""
+    from llm.config import MODELS
+    from llm.generation import _gemma_add_special_tokens, _normalize_gemma_messages, _prepare_gemma_processor, _prepare_tokenizer, prepare_text
+    from llm.loader import load_tokenizer
+
+    tokenizer = load_tokenizer(model_name, MODELS[model_name][0])
+    prompts = sample_prompts()
+    PROMPT_PREFIXES.clear()
+
+    if model_name == "gemma3_4b":
+        _prepare_gemma_processor(tokenizer)
+        texts = [tokenizer.apply_chat_template(_normalize_gemma_messages(messages), tokenize=False, add_generation_prompt=True) for messages in prompts]
+        expected = [
+            tokenizer.apply_chat_template(_normalize_gemma_messages(messages), tokenize=True, add_generation_prompt=True, return_dict=True)["input_ids"]
+            for messages in prompts
+        ]
+        expected_batch = tokenizer(text=texts, padding=True)["input_ids"]
+        encode = lambda texts, batch, single: encode_prompts(
+            tokenizer.tokenizer, texts, batch, add_special_tokens=not single or _gemma_add_special_tokens(tokenizer, texts[0]), token_type_ids=True)
+    else:
+        _prepare_tokenizer(tokenizer)
+        texts = [prepare_text(tokenizer, messages) for messages in prompts]
+        expected = [tokenizer([text])["input_ids"] for text in texts]
+        expected_batch = tokenizer(texts, padding=True)["input_ids"]
+        encode = lambda texts, batch, single: encode_prompts(tokenizer, texts, batch)
+
+    mismatches = 0
+
+    # Twice, so the second pass goes through the cached prefixes.
+    for _ in range(2):
+        for text, messages, ids in zip(texts, prompts, expected):
+            mismatches += encode([text], [messages], True)["input_ids"].tolist() != [list(row) for row in ids]
+
+        mismatches += encode(texts, prompts, False)["input_ids"].tolist() != [list(row) for row in expected_batch]
+
+    return {"model": model_name, "prompts": len(prompts), "mismatches": mismatches, **PROMPT_PREFIXES.stats}
+
+
+def main() -> None:
+    from llm.config import MODELS
+    from llm.loader import login_to_huggingface
+    from llm.stub import STUB_MODEL_NAME
+
+    parser = argparse.ArgumentParser(description="Check that cached prompt prefixes encode exactly like the full chat template.")
+    parser.add_argument("-m", "--models", nargs="+", default=[name for name in MODELS if name != STUB_MODEL_NAME], choices=list(MODELS))
+    args = parser.parse_args()
+    login_to_huggingface()
+
+    for model_name in args.models:
+        print(json.dumps(verify_model(model_name)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from utils.serialization import INPUT_PAYLOAD_HEADER
+from utils.settings import STUB_LLM_TOKEN_LATENCY_MS
+
+
+logger = logging.getLogger(__name__)
+
+STUB_MODEL_NAME = "stub"
+
+# Keyword -> intent, checked in order, for the rule-based Router responses.
+ROUTER_KEYWORDS = [
+    (("my name is", "i'm ", "i am "), "user_identification"),
+    (("cancel",), "cancel_booked_spa"),
+    (("lost", "forgot"), "report_lost_item"),
+    (("buy", "goggles", "cap", "swimsuit", "towel"), "buy_equipment"),
+    (("course", "lesson", "class"), "book_course"),
+    (("spa", "sauna", "massage"), "book_spa"),
+    (("open", "close", "hours"), "ask_opening_hours"),
+    (("price", "cost", "how much", "pass"), "ask_pricing"),
+    (("rule", "allowed", "need to bring", "mandatory"), "ask_rules"),
+    (("hello", "hi ", "bye", "thank"), "greeting_closing"),
+]
+
+# Object keyword -> intent of a cancellation, which is a spa cancellation otherwise.
+CANCEL_KEYWORDS = [
+    (("course", "lesson", "class"), "cancel_booked_course"),
+]
+
+# db_result status -> DM next best action, as in the DM prompt policies.
+DM_ACTIONS = {
+    "INFORM": "provide_information",
+    "MISSING_SLOT": "request_slot",
+    "INVALID_VALUE": "clarify_invalid_value",
+    "OVERLAP": "resolve_conflict",
+    "CONFIRMED": "notify_success",
+    "ABORTED": "notify_aborted",
+}
+
+
+def prompt_hash(messages: List[Dict[str, Any]]) -> str:
+    """Stable key of a chat prompt, shared by the recorder and the stub replay."""
+    normalized = [{"role": str(message.get("role", "user")), "content": str(message.get("content", ""))} for message in messages]
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+class StubTokenizer:
+    """Whitespace and punctuation tokenizer, close enough to a subword tokenizer for budgets and latency."""
+
+    def __call__(self, text: str, add_special_tokens: bool = False) -> Dict[str, List[int]]:
+        return {"input_ids": list(range(len(re.findall(r"\w+|[^\w\s]", text))))}
+
+
+class StubModel:
+    """
+    Deterministic stand-in for a Hugging Face model.
+
+    Prompts found in the recordings (JSONL lines with "prompt_hash" and "output", as written
+    by LLMService when LLM_RECORD_PATH is set) replay the recorded output. Any other prompt
+    gets a rule-based response in the format of the component that sent it.
+    """
+
+    def __init__(self, recordings_path: str | None = None, token_latency_ms: float = STUB_LLM_TOKEN_LATENCY_MS) -> None:
+        self.token_latency_ms = token_latency_ms
+        self.tokenizer = StubTokenizer()
+        self.recordings: Dict[str, str] = {}
+        self.replayed = 0
+        self.generated = 0
+
+        if recordings_path and os.path.exists(recordings_path):
+            with open(recordings_path, encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.recordings[record["prompt_hash"]] = record["output"]
+
+            logger.info("Stub model loaded %s recorded outputs from %s", len(self.recordings), recordings_path)
+
+    # ===================
+    #    RULE-BASED RESPONSES
+    # ===================
+    @staticmethod
+    def _match_keywords(rules: List[tuple], text: str, default: str) -> str:
+        return next((intent for keywords, intent in rules if any(keyword in text for keyword in keywords)), default)
+
+    def _router_response(self, payload: Dict[str, Any]) -> str:
+        utterance = payload.get("last_user_utterance", "")
+        text = f" {utterance.lower()} "
+        intent = self._match_keywords(ROUTER_KEYWORDS, text, "out_of_scope")
+
+        if intent == "cancel_booked_spa":
+            intent = self._match_keywords(CANCEL_KEYWORDS, text, intent)
+
+        return json.dumps({"segments": [{"segment": utterance, "intent": intent}]})
+
+    def _nlu_response(self, payload: Dict[str, Any]) -> str:
+        slots = {}
+        segment = payload.get("target_segment", "")
+
+        if date := re.search(r"\d{4}-\d{2}-\d{2}", segment):
+            slots["date"] = date.group()
+
+        if hour := re.search(r"\b\d{1,2}:\d{2}\b", segment):
+            slots["time"] = hour.group()
+
+        return json.dumps({"intent": payload.get("target_intent", "out_of_scope"), "slots": slots})
+
+    def _dm_response(self, payload: Dict[str, Any]) -> str:
+        db_result = payload.get("db_result") or {}
+        return json.dumps({
+            "nba": DM_ACTIONS.get(db_result.get("status"), "fallback"),
+            "slot": db_result.get("violating_slot"),
+            "options": db_result.get("options", []),
+            "blacklist": db_result.get("blacklist", []),
+            "enriched_data": db_result.get("enriched_data", {}),
+        })
+
+    def _nlg_response(self, messages: List[Dict[str, Any]]) -> str:
+        command = messages[-1]["content"]
+        nba = re.search(r'"nba":\s*"(\w+)"', command)
+        slot = re.search(r'"slot":\s*"(\w+)"', command)
+        response = f"[{nba.group(1) if nba else 'respond'}]"
+        return f"{response} {slot.group(1)}?" if slot else response
+
+    def _rule_based_response(self, messages: List[Dict[str, Any]]) -> str:
+        system_prompt = str(messages[0].get("content", ""))
+        user_content = str(messages[-1].get("content", ""))
+
+        def payload() -> Dict[str, Any]:
+            # NLU few-shot examples come before the payload, after their own header.
+            header = user_content.find(INPUT_PAYLOAD_HEADER)
+            start = user_content.find("{", header if header >= 0 else 0)
+            return json.loads(user_content[start:]) if start >= 0 else {}
+
+        if "Router module" in system_prompt:
+            return self._router_response(payload())
+        if "NLU (Natural Language Understanding)" in system_prompt:
+            return self._nlu_response(payload())
+        if "Dialogue Manager (DM)" in system_prompt:
+            return self._dm_response(payload())
+        if "Summary module" in system_prompt:
+            return " ".join(message["text"] for message in payload().get("new_messages", []))[:400]
+
+        return self._nlg_response(messages)
+
+    # ===================
+    #    GENERATION
+    # ===================
+    def respond(self, messages: List[Dict[str, Any]], max_new_tokens: int) -> str:
+        recorded = self.recordings.get(prompt_hash(messages))
+
+        if recorded is not None:
+            self.replayed += 1
+            return recorded
+
+        self.generated += 1
+        return self._rule_based_response(messages)
+
+    def simulate_latency(self, outputs: List[str], max_new_tokens: int) -> None:
+        """Sleep as if the outputs were decoded together, one step per token of the longest one."""
+        if not self.token_latency_ms or not outputs:
+            return
+
+        steps = min(max(len(self.tokenizer(output)["input_ids"]) for output in outputs), max_new_tokens)
+        time.sleep(steps * self.token_latency_ms / 1000)
+
+
+def load_stub_model(recordings_path: str, device_map: str = "auto", **kwargs: Any) -> StubModel:
+    return StubModel(recordings_path or None)
+
+
+def generate_response_stub(model: StubModel, tokenizer, messages, max_new_tokens=128, assistant_model=None,
+                           prompt_lookup_num_tokens=0, new_token_counts=None) -> str:
+    return generate_response_batch_stub(
+        model, tokenizer, [messages], max_new_tokens=max_new_tokens, new_token_counts=new_token_counts)[0]
+
+
+def generate_response_batch_stub(model: StubModel, tokenizer, messages_batch, max_new_tokens=128,
+                                 prompt_lookup_num_tokens=0, new_token_counts=None) -> List[str]:
+    outputs = [model.respond(messages, max_new_tokens) for messages in messages_batch]
+    model.simulate_latency(outputs, max_new_tokens)
+
+    if new_token_counts is not None:
+        new_token_counts.extend(min(len(model.tokenizer(output)["input_ids"]), max_new_tokens) for output in outputs)
+
+    return outputs
+
+
+def record_outputs(path: str, messages_batch: List[List[Dict[str, Any]]], outputs: List[str], model_name: Optional[str] = None) -> None:
+    """Append prompt hash -> output pairs that a StubModel can replay."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(path, "a", encoding="utf-8") as file:
+        for messages, output in zip(messages_batch, outputs):
+            file.write(json.dumps({"prompt_hash": prompt_hash(messages), "model": model_name, "output": output}) + "\n")
@@ -1,12 +1,14 @@
 import argparse
 
 from app.chatbot import Chatbot
+from llm.pipeline import parse_component_models
 from utils.logger import setup_logging
 
 
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("--model", default="qwen3_4b", help="The name of the model to use: qwen3, qwen2, or gpt4o")
+    parser.add_argument("--pipeline", default=None, help="Per-component models, e.g. router=qwen25_3b,dm=qwen25_3b,nlg=qwen3_4b (defaults to PIPELINE_MODELS).")
     return parser.parse_args()
 
 
@@ -14,7 +16,8 @@ def main() -> None:
     setup_logging()
     args = parse_args()
 
-    chatbot = Chatbot(args.model)
+    component_models = parse_component_models(args.pipeline) if args.pipeline else None
+    chatbot = Chatbot(args.model, component_models=component_models)
     chatbot.chat_loop()
 
 
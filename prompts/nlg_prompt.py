@@ -107,6 +107,7 @@ SPECIFIC RULES FOR this context:
 The user is interested in the pricing of a service.
 - If nba is 'request_slot', ask only for the missing information in 'slot'. Mention the service only if it makes the question clearer. Use the available 'options' when provided.
 - If nba is 'provide_information', state the price from 'enriched_data' clearly and briefly.
+- If 'enriched_data' contains a 'quote', list each line briefly (quantity, category, pass and subtotal), then give the total. Mention any 'unavailable' combination in one short sentence.
 - If nba is 'clarify_invalid_value', briefly explain the issue and offer the valid 'options'.
     """,
     "examples": {
@@ -484,7 +485,7 @@ The user wants to buy equipment.
 - If nba is 'request_slot', ask for the missing information in 'slot'. Briefly anchor the question to the item being purchased to maintain context. Use the available 'options' when provided.
 - If the missing slot is 'brand', use 'brand_prices' from 'enriched_data' when available and ask the user to choose a brand.
 - If the missing slot is 'confirmation', include the price from 'enriched_data' and ask the user to confirm the purchase.
-- If nba is 'clarify_invalid_value', explain that the requested value is not available and offer the valid 'options'.
+- If nba is 'clarify_invalid_value', explain that the requested value is not available and offer the valid 'options'. If 'out_of_stock' is true in 'enriched_data', say that it is currently out of stock.
 - If nba is 'notify_success', confirm the item is available and tell the user to pay and pick it up at reception. Include the price from 'enriched_data' when available.
 - If nba is 'notify_aborted', confirm that the equipment purchase has been cancelled.
     """,
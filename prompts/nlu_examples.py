@@ -0,0 +1,45 @@
+import json
+import re
+from typing import Any
+
+from prompts.nlu_prompt import INTENT_SCHEMAS_PROMPTS
+
+
+EXAMPLES_HEADER = "EXAMPLES:"
+EXAMPLE_PATTERN = re.compile(r"- input:\s*(\{.*\})\s*output:\s*(\{.*\})\s*$", re.DOTALL)
+
+
+def split_schema(schema: str) -> tuple[str, list[dict[str, Any]]]:
+    """
+    Split an intent schema into its slot definitions and its examples.
+
+    Each example keeps its block as written in the schema ("text") next to the parsed
+    input payload and expected output.
+    """
+    header, _, examples_text = schema.partition(EXAMPLES_HEADER)
+    examples = []
+
+    for block in re.split(r"\n\s*\n(?=- input:)", examples_text.strip()):
+        match = EXAMPLE_PATTERN.match(block.strip())
+
+        if match:
+            examples.append({
+                "text": block.strip(),
+                "input": json.loads(match.group(1)),
+                "output": json.loads(match.group(2)),
+            })
+
+    return header.strip(), examples
+
+
+def example_search_text(payload: dict[str, Any]) -> str:
+    """Text matched between a NLU payload and the examples: segment, full message and history."""
+    history = [str(message.get("text", message.get("content", ""))) for message in payload.get("conversation_history", [])]
+    return " ".join([payload.get("target_segment", ""), payload.get("full_user_message", ""), *history])
+
+
+_SPLIT_SCHEMAS = {intent: split_schema(schema) for intent, schema in INTENT_SCHEMAS_PROMPTS.items()}
+
+# Intent -> slot definitions, and intent -> structured examples.
+NLU_SCHEMA_HEADERS = {intent: header for intent, (header, _) in _SPLIT_SCHEMAS.items()}
+NLU_EXAMPLE_BANK = {intent: examples for intent, (_, examples) in _SPLIT_SCHEMAS.items()}
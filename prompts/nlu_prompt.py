@@ -8,6 +8,7 @@ The user will send a JSON containing:
 - 'full_user_message': the complete latest message written by the user.
 - 'target_intent': the intent assigned to the target segment.
 - 'target_segment': the specific part of the latest user message that must be analyzed.
+- 'conversation_summary' (optional): a short summary of the turns before 'conversation_history'. Use it only to recall earlier facts, such as the user's name.
 
 HOW TO PROCESS THE INPUT:
 1. Copy 'target_intent' exactly into the output 'intent' field.
@@ -124,6 +125,8 @@ SLOTS:
 - service_type: [public_swim, gym, spa, course, lido]. Use course for course prices, swimming lessons, swimming school, aquagym, hydrobike, or newborn swimming.
 - sub_type: [day_pass, monthly_pass, annual_pass, 10_entry_pass].
 - user_category: [adult, child, senior, student].
+- head_counts: number of people per user_category when the user asks a price for several people, such as {"adult": 2, "child": 1}. null for a single person.
+- If the user asks the same pass for several services at once, service_type is a list, such as ["public_swim", "gym"].
 
 EXAMPLES:
 - input:
@@ -133,7 +136,16 @@ EXAMPLES:
     "target_intent": "ask_pricing",
     "target_segment": "How much does a course cost per month for students?"
   }
-  output: {"intent": "ask_pricing", "slots": {"service_type": "course", "sub_type": "monthly_pass", "user_category": "student"}}
+  output: {"intent": "ask_pricing", "slots": {"service_type": "course", "sub_type": "monthly_pass", "user_category": "student", "head_counts": null}}
+
+- input:
+  {
+    "conversation_history": [],
+    "full_user_message": "How much would monthly passes for swimming and the gym cost for 2 adults and 1 senior?",
+    "target_intent": "ask_pricing",
+    "target_segment": "How much would monthly passes for swimming and the gym cost for 2 adults and 1 senior?"
+  }
+  output: {"intent": "ask_pricing", "slots": {"service_type": ["public_swim", "gym"], "sub_type": "monthly_pass", "user_category": null, "head_counts": {"adult": 2, "senior": 1}}}
 
 - input:
   {
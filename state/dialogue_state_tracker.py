@@ -6,6 +6,8 @@ from typing import Any
 
 import dateparser
 
+from database.mock_database import STATIC_DATA, add_static_data_listener
+
 
 logger = logging.getLogger(__name__)
 
@@ -21,9 +23,21 @@ VALID_DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday"
 VALID_EQUIPMENT = ["swimming_cap", "goggles", "towel", "slippers", "swimsuit"]
 VALID_CONFIRMATION = ["agree", "deny"]
 
+# Predicted by the database for buy_equipment, stored outside the slots.
+RESERVATION_KEY = "reservation_id"
+
+USER_CATEGORY_ALIASES = {
+    "adults": "adult",
+    "children": "child",
+    "kids": "child",
+    "kid": "child",
+    "seniors": "senior",
+    "students": "student",
+}
+
 INTENT_SCHEMAS = {
     "ask_opening_hours": ["facility_type", "date", "time"],
-    "ask_pricing": ["service_type", "sub_type", "user_category"],
+    "ask_pricing": ["service_type", "sub_type", "user_category", "head_counts"],
     "ask_rules": ["topic", "specific_inquiry"],
     "book_course": ["course_activity", "target_age", "level", "day_preference", "name", "surname", "confirmation"],
     "book_spa": ["date", "time", "people_count", "name", "surname", "confirmation"],
@@ -53,6 +67,29 @@ VALIDATION_MAP = {
 }
 
 
+def sync_valid_values(static_data) -> None:
+    """
+    Refresh the value lists backed by the facility tables, e.g. after a static data reload.
+    The lists are updated in place, so VALIDATION_MAP follows.
+    """
+    courses = static_data.courses_db.values()
+
+    VALID_FACILITIES[:] = list(static_data.opening_hours)
+    VALID_SERVICES[:] = list(static_data.pricing)
+    VALID_SUB_TYPES[:] = list(static_data.price_matrix.sub_types)
+    VALID_USER_CATEGORIES[:] = list(static_data.discounts)
+    VALID_TOPICS[:] = list(static_data.rules_db)
+    VALID_COURSES[:] = list(static_data.courses_db)
+    VALID_TARGET_AGES[:] = list(dict.fromkeys(age for course in courses for age in course["ages"]))
+    VALID_LEVELS[:] = list(dict.fromkeys(level for course in courses for level in course["levels"]))
+    VALID_EQUIPMENT[:] = list(static_data.shop_inventory)
+
+
+# The value lists follow the facility tables across static data reloads.
+sync_valid_values(STATIC_DATA.current)
+add_static_data_listener(lambda: sync_valid_values(STATIC_DATA.current))
+
+
 class StateTracker:
     """Maintains the current dialogue state and normalizes NLU slot updates."""
 
@@ -62,6 +99,8 @@ class StateTracker:
         self.user_profile: dict[str, str | None] = {"name": None, "surname": None}
         self.reference_datetime = self._build_reference_datetime(reference_date, reference_time)
         self.has_ds_changed = False
+        # Stock hold of the purchase in progress, kept out of the slots so it never reaches the prompts.
+        self._reservation_id: str | None = None
 
     def _build_reference_datetime(self, reference_date: str | None, reference_time: str | None) -> datetime:
         if not reference_date:
@@ -79,6 +118,7 @@ class StateTracker:
         self.ds = {"intent": None, "slots": {}}
         self.last_completed_ds = {"intent": None, "slots": {}}
         self.user_profile = {"name": None, "surname": None}
+        self._reservation_id = None
         self.has_ds_changed = False
 
     def _normalize_string(self, text: str) -> str:
@@ -214,7 +254,40 @@ class StateTracker:
             return slot_name[:-4]
         return slot_name
 
+    def _clean_head_counts(self, value: Any) -> dict[str, int] | None:
+        """Normalize group sizes such as {"adults": 2, "kid": 1} or "2 adults and 1 child"."""
+        if isinstance(value, dict):
+            pairs = [(str(category), count) for category, count in value.items()]
+        else:
+            pairs = [(category, count) for count, category in re.findall(r"(\d+)\s*([a-z]+)", str(value).lower())]
+
+        head_counts: dict[str, int] = {}
+
+        for category, count in pairs:
+            category = category.strip().lower()
+            category = USER_CATEGORY_ALIASES.get(category, category)
+            matches = difflib.get_close_matches(category, VALID_USER_CATEGORIES, n=1, cutoff=0.7)
+
+            try:
+                count = int(count)
+            except (ValueError, TypeError):
+                continue
+
+            if matches and count > 0:
+                head_counts[matches[0]] = head_counts.get(matches[0], 0) + count
+
+        return head_counts or None
+
     def _clean_slot_value(self, slot_name: str, value: Any) -> Any:
+        if slot_name == "head_counts":
+            return self._clean_head_counts(value)
+
+        if slot_name == "service_type" and isinstance(value, list):
+            # Several services can be priced together in a group quote.
+            services = [self._clean_slot_value(slot_name, item) for item in value]
+            services = list(dict.fromkeys(service for service in services if service))
+            return services if len(services) > 1 else (services[0] if services else None)
+
         val_str = str(value).strip().lower()
         val_underscored = val_str.replace(" ", "_")
 
@@ -257,9 +330,17 @@ class StateTracker:
 
         if new_intent != self.ds["intent"] or not self.ds.get("slots"):
             self.ds["intent"] = new_intent
+            self._reservation_id = None
 
             if new_intent == self.last_completed_ds.get("intent") and new_intent.startswith("ask_"):
                 self.ds["slots"] = self.last_completed_ds["slots"].copy()
+
+                # A group quote is specific to the last question: a follow-up about one
+                # service or category should not be priced for the previous group.
+                if "head_counts" in self.ds["slots"]:
+                    self.ds["slots"]["head_counts"] = None
+                if isinstance(self.ds["slots"].get("service_type"), list):
+                    self.ds["slots"]["service_type"] = None
             else:
                 self.ds["slots"] = {slot: None for slot in INTENT_SCHEMAS.get(new_intent, [])}
 
@@ -288,6 +369,11 @@ class StateTracker:
 
         return actual_changes
 
+    def _clear_stale_head_counts(self, validated_updates: dict[str, Any]) -> None:
+        if validated_updates.get("user_category") is not None and validated_updates.get("head_counts") is None and self.ds["slots"].get("head_counts"):
+            logger.debug("Clearing head counts because a single user category was given.")
+            self.ds["slots"]["head_counts"] = None
+
     def _clear_unsafe_confirmation(self, validated_updates: dict[str, Any], actual_changes: list[str]) -> None:
         if "confirmation" in actual_changes and len(actual_changes) > 1:
             logger.debug("Clearing confirmation because other slot changes were detected in the same turn.")
@@ -309,6 +395,9 @@ class StateTracker:
     def get_has_ds_changed(self) -> bool:
         return self.has_ds_changed
 
+    def get_reservation_id(self) -> str | None:
+        return self._reservation_id
+
     def update(self, nlu_result: dict[str, Any]) -> dict[str, Any]:
         """Apply a new NLU result to the dialogue state."""
         self.has_ds_changed = False
@@ -326,6 +415,7 @@ class StateTracker:
 
         self._clear_unsafe_confirmation(validated_updates, actual_changes)
         self._update_user_profile(validated_updates)
+        self._clear_stale_head_counts(validated_updates)
         self._update_dialogue_state_slots(validated_updates)
         self._remove_confirmation_if_state_incomplete()
 
@@ -340,7 +430,12 @@ class StateTracker:
     def update_predicted_slots(self, db_slots: dict[str, Any]) -> None:
         """Fill slots predicted by the database layer."""
         for key, value in (db_slots or {}).items():
-            if value is not None:
+            if value is None:
+                continue
+
+            if key == RESERVATION_KEY:
+                self._reservation_id = value
+            else:
                 self.ds["slots"][key] = value
 
     def clean_invalid_slots(self, violating_slots: str) -> None:
@@ -363,3 +458,4 @@ class StateTracker:
 
         self.ds["intent"] = None
         self.ds["slots"] = {}
+        self._reservation_id = None
@@ -1,27 +1,170 @@
+import json
+import math
+import os
+import threading
+import uuid
+from collections import deque
+from typing import Callable
+
+from utils.settings import HISTORY_ARCHIVE_DIR, HISTORY_MAX_MESSAGES
+
+
+# Older messages are elided rather than truncated below this many tokens.
+MIN_TRUNCATED_TOKENS = 16
+TRUNCATION_MARKER = " [...]"
+
+
+def approximate_token_count(text: str) -> int:
+    """Rough token count (about four characters per token) used when no tokenizer is available."""
+    return max(1, math.ceil(len(text) / 4))
+
+
+def truncate_to_tokens(text: str, tokens: int, budget: int) -> str:
+    """Shorten a text counted as `tokens` tokens to roughly `budget` tokens, keeping its beginning."""
+    keep = int(len(text) * budget / tokens) - len(TRUNCATION_MARKER)
+    return text[:max(keep, 0)].rstrip() + TRUNCATION_MARKER
+
+
 class History:
-    """Stores the conversation turns and exposes formatted history views."""
+    """
+    Stores the conversation turns and exposes formatted history views.
+
+    Only the most recent max_messages turns are kept in memory. Older turns are appended
+    to an optional JSON-lines archive on disk. The JSON and text form of every turn is
+    built once when it is added, and each view is cached until the next turn, so the
+    Router and NLU calls of a turn share the same windows. A lock guards the turns and the
+    cache, since the history summarizer reads them from a background thread, and views
+    return copies of the cached messages.
+    """
 
-    def __init__(self) -> None:
-        self.messages: list[dict[str, str]] = []
+    def __init__(self, max_messages: int = HISTORY_MAX_MESSAGES, archive_dir: str | None = HISTORY_ARCHIVE_DIR,
+                 token_counter: Callable[[str], int] | None = None) -> None:
+        self.max_messages = max_messages
+        self.token_counter = token_counter or approximate_token_count
+        self.messages: deque[dict[str, str]] = deque(maxlen=max_messages)
+        self.total_messages = 0
         self.last_system_action = None
         self.active_task = None
         self.flag = None
 
+        # Running summary of the turns before summarized_until (an absolute message count).
+        self.summary = ""
+        self.summarized_until = 0
+
+        # Per-turn formatted forms, aligned with self.messages.
+        self._json_entries: deque[dict[str, str]] = deque(maxlen=max_messages)
+        self._transcript_lines: deque[str] = deque(maxlen=max_messages)
+        # Filled lazily, so a message is measured at most once.
+        self._token_counts: deque[int | None] = deque(maxlen=max_messages)
+        self._view_cache: dict[tuple, object] = {}
+        self._lock = threading.RLock()
+
+        self.archive_path = os.path.join(archive_dir, f"history-{uuid.uuid4().hex}.jsonl") if archive_dir else None
+
+    def _archive(self, message: dict[str, str]) -> None:
+        os.makedirs(os.path.dirname(self.archive_path), exist_ok=True)
+
+        with open(self.archive_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(message) + "\n")
+
+    def _archived_messages(self) -> list[dict[str, str]]:
+        if not self.archive_path or not os.path.exists(self.archive_path):
+            return []
+
+        with open(self.archive_path, encoding="utf-8") as file:
+            return [json.loads(line) for line in file if line.strip()]
+
     def add_message(self, role: str, content: str) -> None:
-        self.messages.append({"role": role, "content": content})
+        with self._lock:
+            if len(self.messages) == self.max_messages and self.archive_path:
+                self._archive(self.messages[0])
+
+            self.messages.append({"role": role, "content": content})
+            self._json_entries.append({"role": role, "text": content})
+            self._transcript_lines.append(f"{role.capitalize()}: {content}")
+            self._token_counts.append(None)
+            self.total_messages += 1
+            self._view_cache.clear()
+
+    def set_token_counter(self, token_counter: Callable[[str], int]) -> None:
+        with self._lock:
+            self.token_counter = token_counter
+            self._token_counts = deque([None] * len(self.messages), maxlen=self.max_messages)
+            self._view_cache.clear()
+
+    def count_tokens(self, text: str) -> int:
+        return self.token_counter(text)
+
+    def _token_count(self, index: int) -> int:
+        count = self._token_counts[index]
+
+        if count is None:
+            count = self.token_counter(self.messages[index]["content"])
+            self._token_counts[index] = count
+
+        return count
+
+    def _window(self, n: int, skip_last: int = 0, max_tokens: int | None = None) -> list[tuple[int, str | None]]:
+        """
+        Select the last n messages before the final skip_last ones, as (index, truncated content or None).
+        With max_tokens, the newest message is always kept whole, then older messages are added
+        while they fit; the first one that does not fit is truncated and all older ones are elided.
+        """
+        end = len(self.messages) - skip_last
+        indexes = range(max(end - n, 0), end) if n > 0 and end > 0 else range(0)
+
+        if max_tokens is None:
+            return [(index, None) for index in indexes]
+
+        window = []
+        remaining = max_tokens
+
+        for position, index in enumerate(reversed(indexes)):
+            tokens = self._token_count(index)
+
+            if position == 0 or tokens <= remaining:
+                window.append((index, None))
+                remaining -= tokens
+                continue
+
+            if remaining >= MIN_TRUNCATED_TOKENS:
+                window.append((index, truncate_to_tokens(self.messages[index]["content"], tokens, remaining)))
+
+            break
+
+        return window[::-1]
 
     def get_last_user_message(self) -> str | None:
-        for message in reversed(self.messages):
-            if message["role"] == "user":
-                return message["content"]
+        with self._lock:
+            for message in reversed(self.messages):
+                if message["role"] == "user":
+                    return message["content"]
         return None
 
     def get_last_bot_message(self) -> str | None:
-        for message in reversed(self.messages):
-            if message["role"] == "assistant":
-                return message["content"]
+        with self._lock:
+            for message in reversed(self.messages):
+                if message["role"] == "assistant":
+                    return message["content"]
         return None
 
+    def get_summary(self) -> str:
+        return self.summary
+
+    def set_summary(self, summary: str, summarized_until: int) -> None:
+        with self._lock:
+            self.summary, self.summarized_until = summary, summarized_until
+            self._view_cache.clear()
+
+    def get_messages_between(self, start: int, end: int) -> list[dict[str, str]]:
+        """Return copies of the in-memory messages with absolute positions in [start, end)."""
+        with self._lock:
+            first_in_memory = self.total_messages - len(self.messages)
+            return [
+                dict(self.messages[position - first_in_memory])
+                for position in range(max(start, first_in_memory), min(end, self.total_messages))
+            ]
+
     def set_last_system_action(self, action) -> None:
         self.last_system_action = action
 
@@ -37,54 +180,90 @@ class History:
     def get_flag(self):
         return self.flag
 
-    def get_last_n_messages(self, n: int = 4) -> list[dict[str, str]]:
+    def get_last_n_messages(self, n: int = 4, max_tokens: int | None = None) -> list[dict[str, str]]:
         if n <= 0:
             return []
-        return self.messages[-n:]
+
+        with self._lock:
+            return [
+                dict(self.messages[index]) if content is None else {"role": self.messages[index]["role"], "content": content}
+                for index, content in self._window(n, max_tokens=max_tokens)
+            ]
 
     def get_prompt_formatted_history(self, n: int = 4) -> str:
         """Return the latest turns as plain text for prompt injection-safe contexts."""
-        history_messages = self.get_last_n_messages(n)
+        key = ("prompt_text", n)
 
-        if not history_messages:
-            return "No previous history."
+        with self._lock:
+            text = self._view_cache.get(key)
 
-        lines = []
-        for message in history_messages:
-            role_name = "ASSISTANT" if message["role"] == "assistant" else "USER"
-            lines.append(f"{role_name}: {message['content']}")
+            if text is None:
+                history_messages = self.get_last_n_messages(n)
 
-        return "\n".join(lines)
+                if not history_messages:
+                    text = "No previous history."
+                else:
+                    text = "\n".join(
+                        f"{'ASSISTANT' if message['role'] == 'assistant' else 'USER'}: {message['content']}"
+                        for message in history_messages
+                    )
+
+                self._view_cache[key] = text
+
+        return text
 
     def get_full_conversation(self) -> str:
-        """Return the full conversation as a readable transcript."""
-        if not self.messages:
-            return "No messages in the conversation history."
+        """Return the full conversation, including archived turns, as a readable transcript."""
+        with self._lock:
+            archived = [f"{message['role'].capitalize()}: {message['content']}" for message in self._archived_messages()]
+            transcript = archived + list(self._transcript_lines)
 
-        transcript = []
-        for message in self.messages:
-            role = message["role"].capitalize()
-            transcript.append(f"{role}: {message['content']}")
+        if not transcript:
+            return "No messages in the conversation history."
 
         return "\n".join(transcript)
 
-    def get_json_history_and_last_utterance(self, n: int = 4) -> tuple[list[dict[str, str]], str]:
+    def get_json_history_and_last_utterance(self, n: int = 4, max_tokens: int | None = None) -> tuple[list[dict[str, str]], str]:
         """Split the current user message from the previous structured history."""
-        if not self.messages:
-            return [], ""
+        key = ("json", n, max_tokens)
 
-        last_utterance = self.messages[-1]["content"] if self.messages[-1]["role"] == "user" else ""
-        past_messages = self.messages[:-1]
-        past_messages = past_messages[-n:] if n > 0 else []
+        with self._lock:
+            if not self.messages:
+                return [], ""
 
-        formatted_history = [{"role": message["role"], "text": message["content"]} for message in past_messages]
+            view = self._view_cache.get(key)
 
-        return formatted_history, last_utterance
+            if view is None:
+                last_utterance = self.messages[-1]["content"] if self.messages[-1]["role"] == "user" else ""
+                formatted_history = [
+                    self._json_entries[index] if content is None else {"role": self._json_entries[index]["role"], "text": content}
+                    for index, content in self._window(n, skip_last=1, max_tokens=max_tokens)
+                ]
+                view = (formatted_history, last_utterance)
+                self._view_cache[key] = view
 
-    def get_json_history_and_last_utterance_filtered(self, n: int = 6, excluded_segments: list[str] | None = None) -> tuple[list[dict[str, str]], str]:
+        formatted_history, last_utterance = view
+        # Callers may edit the messages, which must not reach the cache or the stored turns.
+        return [dict(message) for message in formatted_history], last_utterance
+
+    def get_json_history_and_last_utterance_filtered(self, n: int = 6, excluded_segments: list[str] | None = None,
+                                                     max_tokens: int | None = None) -> tuple[list[dict[str, str]], str]:
         """Return structured history while removing segments that belong to queued tasks."""
         excluded_segments = excluded_segments or []
-        conversation_history, last_utterance = self.get_json_history_and_last_utterance(n=n)
+        key = ("json_filtered", n, tuple(excluded_segments), max_tokens)
+
+        with self._lock:
+            view = self._view_cache.get(key)
+
+            if view is None:
+                view = self._filtered_view(n, excluded_segments, max_tokens)
+                self._view_cache[key] = view
+
+        filtered_history, last_utterance = view
+        return [dict(message) for message in filtered_history], last_utterance
+
+    def _filtered_view(self, n: int, excluded_segments: list[str], max_tokens: int | None) -> tuple[list[dict[str, str]], str]:
+        conversation_history, last_utterance = self.get_json_history_and_last_utterance(n=n, max_tokens=max_tokens)
 
         filtered_history = []
         for message in conversation_history:
@@ -107,3 +286,42 @@ class History:
         print("=" * 50)
         print(self.get_full_conversation())
         print("=" * 50 + "\n")
+
+
+class MaskedHistoryView:
+    """
+    Read-only view of a History that replaces the content of its last message and appends
+    extra messages, without copying the underlying turns. Exposes get_last_n_messages.
+    """
+
+    def __init__(self, history, last_message_content: str | None = None, appended_messages: list[dict[str, str]] | None = None) -> None:
+        self.history = history
+        self.last_message_content = last_message_content
+        self.appended_messages = appended_messages or []
+
+    def get_summary(self) -> str:
+        return self.history.get_summary()
+
+    def get_last_n_messages(self, n: int = 4, max_tokens: int | None = None) -> list[dict[str, str]]:
+        if n <= 0:
+            return []
+
+        base_count = n - len(self.appended_messages)
+        base_budget = max_tokens
+
+        if max_tokens is not None and self.appended_messages:
+            count_tokens = getattr(self.history, "count_tokens", approximate_token_count)
+            base_budget = max_tokens - sum(count_tokens(message["content"]) for message in self.appended_messages)
+
+        if base_count <= 0:
+            base_messages = []
+        elif base_budget is None:
+            base_messages = self.history.get_last_n_messages(base_count)
+        else:
+            base_messages = self.history.get_last_n_messages(base_count, max_tokens=max(base_budget, 0))
+
+        if base_messages and self.last_message_content is not None:
+            last_message = base_messages[-1]
+            base_messages = base_messages[:-1] + [{"role": last_message["role"], "content": self.last_message_content}]
+
+        return (base_messages + self.appended_messages)[-n:]
@@ -0,0 +1,89 @@
+import json
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from prompts.summary_prompt import SUMMARY_SYSTEM_PROMPT
+from state.history import History, truncate_to_tokens
+
+
+logger = logging.getLogger(__name__)
+
+
+def window_keep_messages(windows: list[int], min_new_messages: int = 2) -> int:
+    """
+    Recent messages to leave out of the summary so that no turn falls between the summary
+    and the smallest prompt window. Windows count the messages a prompt shows, the next user
+    message included, and the summary may trail the window by min_new_messages - 1 messages.
+    """
+    return max(min(windows) - 1 - (min_new_messages - 1), 0)
+
+
+class HistorySummarizer:
+    """
+    Folds the turns that have left the recent message window into History.summary.
+
+    Runs on a single background worker after each turn, and only when the window has
+    shifted by at least min_new_messages, so each message is summarized once. The
+    summary is capped at max_tokens, which keeps its cost in every prompt fixed.
+    """
+
+    def __init__(self, llm, keep_messages: int = 8, max_tokens: int = 128, min_new_messages: int = 2) -> None:
+        self.llm = llm
+        self.keep_messages = keep_messages
+        self.max_tokens = max_tokens
+        self.min_new_messages = min_new_messages
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-summarizer")
+        self._pending: Future | None = None
+
+    def _fold_end(self, history: History) -> int:
+        return history.total_messages - self.keep_messages
+
+    def needs_refresh(self, history: History) -> bool:
+        return self._fold_end(history) - history.summarized_until >= self.min_new_messages
+
+    def schedule(self, history: History) -> None:
+        """Refresh the summary in the background if the window has shifted enough."""
+        if self._pending is not None and not self._pending.done():
+            # The next call picks up the messages added in the meantime.
+            return
+
+        if self.needs_refresh(history):
+            self._pending = self._executor.submit(self.refresh, history)
+
+    def wait(self) -> None:
+        if self._pending is not None:
+            self._pending.result()
+
+    def close(self) -> None:
+        """Finish the pending refresh and stop the background worker."""
+        self._executor.shutdown(wait=True)
+
+    def refresh(self, history: History) -> None:
+        fold_end = self._fold_end(history)
+        new_messages = history.get_messages_between(history.summarized_until, fold_end)
+
+        if not new_messages:
+            history.set_summary(history.get_summary(), max(fold_end, history.summarized_until))
+            return
+
+        payload = {
+            "current_summary": history.get_summary(),
+            "new_messages": [{"role": message["role"], "text": message["content"]} for message in new_messages],
+        }
+        messages = [
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT.strip()},
+            {"role": "user", "content": json.dumps(payload, indent=2)},
+        ]
+
+        try:
+            summary = self.llm.generate(messages=messages, max_new_tokens=self.max_tokens).strip()
+        except Exception:
+            logger.exception("History summary refresh failed.")
+            return
+
+        tokens = history.count_tokens(summary)
+        if tokens > self.max_tokens:
+            summary = truncate_to_tokens(summary, tokens, self.max_tokens)
+
+        history.set_summary(summary, fold_end)
+        logger.debug("History summary updated up to message %s: %s", fold_end, summary)
@@ -0,0 +1,43 @@
+import json
+from typing import Any
+
+
+# "indented": json.dumps(indent=2), the original prompt format.
+# "compact": no whitespace between tokens.
+# "pruned": compact, without the null values of objects (e.g. unfilled slots).
+PAYLOAD_FORMATS = ("indented", "compact", "pruned")
+
+# Separates the text placed before a payload (e.g. NLU few-shot examples) from the payload.
+INPUT_PAYLOAD_HEADER = "INPUT PAYLOAD:"
+
+
+def prune_nulls(value: Any) -> Any:
+    """Drop null values from every object, recursively. Lists keep their items."""
+    if isinstance(value, dict):
+        return {key: prune_nulls(item) for key, item in value.items() if item is not None}
+
+    if isinstance(value, list):
+        return [prune_nulls(item) for item in value]
+
+    return value
+
+
+def check_payload_format(payload_format: str) -> str:
+    """Return payload_format, or raise a ValueError if it is not one of PAYLOAD_FORMATS."""
+    if payload_format not in PAYLOAD_FORMATS:
+        raise ValueError(f"Unknown payload format '{payload_format}'. Expected one of {', '.join(PAYLOAD_FORMATS)}.")
+
+    return payload_format
+
+
+def serialize_payload(payload: Any, payload_format: str = "indented") -> str:
+    """Serialize a prompt payload in one of PAYLOAD_FORMATS."""
+    check_payload_format(payload_format)
+
+    if payload_format == "indented":
+        return json.dumps(payload, indent=2)
+
+    if payload_format == "compact":
+        return json.dumps(payload, separators=(",", ":"))
+
+    return json.dumps(prune_nulls(payload), separators=(",", ":"))
@@ -15,4 +15,56 @@ def get_bool_env(name: str, default: bool = False) -> bool:
     return value.strip().lower() in {"1", "true", "yes", "y", "on"}
 
 
-APP_DEBUG = get_bool_env("APP_DEBUG", default=False)
\ No newline at end of file
+APP_DEBUG = get_bool_env("APP_DEBUG", default=False)
+BOOKING_LOG_DIR = os.getenv("BOOKING_LOG_DIR") or None
+BOOKING_SNAPSHOT_EVERY = int(os.getenv("BOOKING_SNAPSHOT_EVERY", "200"))
+DB_BACKEND = os.getenv("DB_BACKEND") or None
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+# Per-call timeout of the async database reads; bookings, cancellations and purchases are always awaited.
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "5.0"))
+STATIC_DATA_DIR = os.getenv("STATIC_DATA_DIR") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "database", "data")
+# Seconds between checks of the facility data files by the running chatbot (0 disables reloads).
+STATIC_DATA_WATCH_INTERVAL = float(os.getenv("STATIC_DATA_WATCH_INTERVAL", "0"))
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "50"))
+HISTORY_ARCHIVE_DIR = os.getenv("HISTORY_ARCHIVE_DIR") or None
+# Messages in the history window of each component prompt. The Router and NLU also show the current user message.
+ROUTER_HISTORY_MESSAGES = int(os.getenv("ROUTER_HISTORY_MESSAGES", "6"))
+NLU_HISTORY_MESSAGES = int(os.getenv("NLU_HISTORY_MESSAGES", "4"))
+NLG_HISTORY_MESSAGES = int(os.getenv("NLG_HISTORY_MESSAGES", "4"))
+# Token budgets of the history windows in each component prompt, on top of their message counts.
+ROUTER_HISTORY_TOKENS = int(os.getenv("ROUTER_HISTORY_TOKENS", "512"))
+NLU_HISTORY_TOKENS = int(os.getenv("NLU_HISTORY_TOKENS", "384"))
+NLG_HISTORY_TOKENS = int(os.getenv("NLG_HISTORY_TOKENS", "384"))
+# Optional running summary of the turns older than the smallest component window, capped at SUMMARY_MAX_TOKENS.
+# SUMMARY_KEEP_MESSAGES can only lower the number of recent messages left out of the summary (0 derives it from the windows).
+HISTORY_SUMMARY = get_bool_env("HISTORY_SUMMARY", default=False)
+SUMMARY_KEEP_MESSAGES = int(os.getenv("SUMMARY_KEEP_MESSAGES", "0"))
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "128"))
+# Stub model: recorded outputs to replay (JSONL written through LLM_RECORD_PATH) and simulated decoding latency.
+STUB_LLM_RECORDINGS = os.getenv("STUB_LLM_RECORDINGS") or ""
+STUB_LLM_TOKEN_LATENCY_MS = float(os.getenv("STUB_LLM_TOKEN_LATENCY_MS", "0"))
+LLM_RECORD_PATH = os.getenv("LLM_RECORD_PATH") or None
+# "cpu" loads the models without bitsandbytes, in CPU_DTYPE ("bf16" or "fp32"), optionally with int8 linear layers.
+LLM_DEVICE_MAP = os.getenv("LLM_DEVICE_MAP") or "auto"
+CPU_DTYPE = os.getenv("CPU_DTYPE", "bf16")
+CPU_INT8 = get_bool_env("CPU_INT8", default=False)
+# 0 derives the thread counts from the usable cores.
+CPU_THREADS = int(os.getenv("CPU_THREADS", "0"))
+CPU_INTEROP_THREADS = int(os.getenv("CPU_INTEROP_THREADS", "0"))
+# Optional per-component models, e.g. "router=qwen25_3b,dm=qwen25_3b,nlg=qwen3_4b" (others use the chatbot model).
+PIPELINE_MODELS = os.getenv("PIPELINE_MODELS") or None
+# Optional LoRA adapters per component, e.g. "router=adapters/router,nlu=adapters/nlu" (requires peft).
+LORA_ADAPTERS = os.getenv("LORA_ADAPTERS") or None
+# Components whose single-response calls use speculative decoding with the DRAFT_MODELS draft, e.g. "nlg,router".
+SPECULATIVE_COMPONENTS = os.getenv("SPECULATIVE_COMPONENTS") or None
+# Components whose single-prompt calls use prompt-lookup decoding, e.g. "router,nlu", proposing up to PROMPT_LOOKUP_TOKENS per step.
+PROMPT_LOOKUP_COMPONENTS = os.getenv("PROMPT_LOOKUP_COMPONENTS") or None
+PROMPT_LOOKUP_TOKENS = int(os.getenv("PROMPT_LOOKUP_TOKENS", "10"))
+# NLU few-shot examples: the NLU_FEW_SHOT_K most similar (BM25) examples of the intent within NLU_FEW_SHOT_TOKENS.
+# 0 keeps every schema example in the system prompt, until eval_NLU accuracy with -k is measured on a real model.
+NLU_FEW_SHOT_K = int(os.getenv("NLU_FEW_SHOT_K", "0"))
+NLU_FEW_SHOT_TOKENS = int(os.getenv("NLU_FEW_SHOT_TOKENS", "600"))
+# Prompt token budgets per component checked by llm/prompt_audit.py, e.g. "router=2500,nlu=3000,dm=3000,nlg=3000,summary=400".
+PROMPT_TOKEN_BUDGETS = os.getenv("PROMPT_TOKEN_BUDGETS") or None
+# Serialization of the JSON payloads in the Router, NLU, DM and NLG prompts: "indented", "compact" or "pruned" (compact without nulls).
+PAYLOAD_FORMAT = os.getenv("PAYLOAD_FORMAT", "indented")